@@ -0,0 +1,128 @@
+import json
+
+from flask import Blueprint, Response, jsonify, request, stream_with_context
+from sqlalchemy.orm import selectinload
+
+from models import db, Venue, Artist, Show
+from streaming import iter_results
+
+api = Blueprint('api', __name__, url_prefix='/api/v1')
+
+
+#----------------------------------------------------------------------------#
+# Serializers.
+#----------------------------------------------------------------------------#
+
+def venue_json(venue):
+    return {
+        'id': venue.id,
+        'name': venue.name,
+        'city': venue.city,
+        'state': venue.state,
+        'address': venue.address,
+        'phone': venue.phone,
+        'website': venue.website,
+        'facebook_link': venue.facebook_link,
+        'image_link': venue.image_link,
+        'seeking_talent': venue.seeking_talent,
+        'seeking_description': venue.seeking_description,
+        'genres': [genre.name for genre in venue.genres],
+    }
+
+
+def artist_json(artist):
+    return {
+        'id': artist.id,
+        'name': artist.name,
+        'city': artist.city,
+        'state': artist.state,
+        'phone': artist.phone,
+        'website': artist.website,
+        'facebook_link': artist.facebook_link,
+        'image_link': artist.image_link,
+        'seeking_venue': artist.seeking_venue,
+        'seeking_description': artist.seeking_description,
+        'genres': [genre.name for genre in artist.genres],
+    }
+
+
+def show_json(show):
+    return {
+        'id': show.id,
+        'venue_id': show.venue_id,
+        'artist_id': show.artist_id,
+        'start_time': show.start_time.isoformat(),
+        'end_time': show.end_time.isoformat(),
+    }
+
+
+#----------------------------------------------------------------------------#
+# Collections.
+#----------------------------------------------------------------------------#
+
+# Collections are streamed as NDJSON, one object per line, ordered by id.
+# A client that loses its connection can resume with ?after_id=<last id>.
+
+def ndjson_response(query, model, serialize):
+    after_id = request.args.get('after_id', type=int)
+    if after_id is not None:
+        query = query.filter(model.id > after_id)
+    query = query.order_by(model.id)
+
+    def generate():
+        for row in iter_results(query):
+            yield json.dumps(serialize(row), separators=(',', ':')) + '\n'
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+
+@api.route('/venues')
+def venues():
+    return ndjson_response(Venue.query.options(selectinload(Venue.genres)), Venue, venue_json)
+
+
+@api.route('/artists')
+def artists():
+    return ndjson_response(Artist.query.options(selectinload(Artist.genres)), Artist, artist_json)
+
+
+@api.route('/shows')
+def shows():
+    # the join drops the shows of soft-deleted venues
+    query = db.session.query(Show.id, Show.venue_id, Show.artist_id, Show.start_time, Show.end_time) \
+        .join(Venue, Show.venue_id == Venue.id)
+    return ndjson_response(query, Show, show_json)
+
+
+#----------------------------------------------------------------------------#
+# Single resources.
+#----------------------------------------------------------------------------#
+
+@api.route('/venues/<int:venue_id>')
+def venue(venue_id):
+    venue = Venue.query.get_or_404(venue_id)
+    shows = venue.get_shows()
+    data = venue_json(venue)
+    data['upcoming_shows'] = [show_json(show) for show in shows['upcoming_shows']]
+    data['past_shows'] = [show_json(show) for show in shows['past_shows']]
+    return jsonify(data)
+
+
+@api.route('/artists/<int:artist_id>')
+def artist(artist_id):
+    artist = Artist.query.get_or_404(artist_id)
+    shows = artist.get_shows()
+    data = artist_json(artist)
+    data['upcoming_shows'] = [show_json(show) for show in shows['upcoming_shows']]
+    data['past_shows'] = [show_json(show) for show in shows['past_shows']]
+    return jsonify(data)
+
+
+@api.route('/shows/<int:show_id>')
+def show(show_id):
+    return jsonify(show_json(Show.query.join(Venue, Show.venue_id == Venue.id).filter(Show.id == show_id).first_or_404()))
+
+
+@api.errorhandler(404)
+def not_found_error(error):
+    return jsonify({ 'error': 'not found' }), 404
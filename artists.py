@@ -0,0 +1,245 @@
+from flask import Blueprint, render_template, request, flash, redirect, url_for
+
+from models import db, utcnow, Artist, Genre, ArtistShowSummary, artist_genres
+from pagination import paginate, page_size
+from cache import cache
+from search import search_entities
+from conditional import conditional, entity_etag, make_etag
+from invalidation import invalidate_artist, expire_matches
+from autocomplete import index_name
+from streaming import stream_page
+
+bp = Blueprint('artists', __name__)
+
+#----------------------------------------------------------------------------#
+# Controllers.
+#----------------------------------------------------------------------------#
+
+#  Artists
+#  ----------------------------------------------------------------
+@bp.route('/artists')
+def artists():
+  data = []
+  next_after = None
+  error = False
+  try:
+    def load():
+      query = Artist.query
+      if genre:
+        query = query.join(artist_genres, artist_genres.c.artist_id == Artist.id) \
+          .join(Genre, Genre.id == artist_genres.c.genre_id) \
+          .filter(Genre.name == genre)
+      artists, next_after = paginate(query, [Artist.name, Artist.id])
+      return [{ 'id': artist.id, 'name': artist.name } for artist in artists], next_after
+
+    genre = request.args.get('genre')
+    key = cache.versioned_key('artists', genre, request.args.get('after'), page_size())
+    data, next_after = cache.cached(key, load)
+  except:
+    error = True
+  if error:
+    flash('An error occurred. Artists cannot be listed.')
+
+  return stream_page('pages/artists.html', artists=data, next_after=next_after)
+
+@bp.route('/artists/search', methods=['POST'])
+def search_artists(): 
+  error = False  
+  response = {}
+  try:  
+    count, data = search_entities(Artist, request.form.get('search_term', ''))
+    if count > 0:
+      response = {
+        'count': count,
+        'data': data
+      }
+    else:
+      flash('Please refine your search...')
+  except: 
+    error = True 
+
+  if error:
+    flash('Error while filtering Artists with the search term -' + request.form['search_term'])
+
+  return render_template('pages/search_artists.html', results=response, search_term=request.form.get('search_term', ''))
+
+@bp.route('/artists/<int:artist_id>')
+def show_artist(artist_id):
+  def load():
+    artist = Artist.query.get_or_404(artist_id)
+    shows = artist.get_shows()
+    upcoming_shows = [{ 'venue_id': show.Venue.id, 'venue_name': show.Venue.name, 'venue_image_link': show.Venue.image_link, 'start_time': show.start_time } for show in shows['upcoming_shows']]
+    past_shows = [{ 'venue_id': show.Venue.id, 'venue_name': show.Venue.name, 'venue_image_link': show.Venue.image_link, 'start_time': show.start_time } for show in shows['past_shows']]
+
+    num_upcoming_shows = len(upcoming_shows)
+    num_past_shows = len(past_shows)
+    data = {
+      'id': artist.id,
+      'name': artist.name,
+      'city': artist.city,
+      'state': artist.state,
+      'phone': artist.phone,
+      'website': artist.website,
+      'facebook_link': artist.facebook_link,
+      'seeking_venue': artist.seeking_venue,
+      'seeking_description': artist.seeking_description,
+      'image_link': artist.image_link,
+      'genres' : [genre.name for genre in artist.genres],
+      'past_shows' : past_shows,
+      'upcoming_shows': upcoming_shows,
+      'past_shows_count' : num_past_shows,
+      'upcoming_shows_count' : num_upcoming_shows
+    }
+    return data
+
+  def render():
+    data = cache.cached('artist:%d' % artist_id, load)
+    return render_template('pages/show_artist.html', artist=data, suggested_venues=suggested)
+
+  try:
+    from matching import suggestions
+    suggested = suggestions('artist', artist_id)
+  except:
+    suggested = []
+  etag = entity_etag(Artist, ArtistShowSummary, ArtistShowSummary.artist_id, artist_id)
+  return conditional(etag and make_etag(etag, suggested), render)
+
+#  Update
+#  ----------------------------------------------------------------
+@bp.route('/artists/<int:artist_id>/edit', methods=['GET'])
+def edit_artist(artist_id):
+  from forms import ArtistForm
+  form = ArtistForm()
+  try:
+    artist = Artist.query.get(artist_id)
+    artist_details = {
+        "id": artist.id,
+        "name": artist.name,
+        "genres": [genre.name for genre in artist.genres],
+        "city": artist.city,
+        "state": artist.state,
+        "phone": artist.phone,
+        "website": artist.website,
+        "facebook_link": artist.facebook_link,
+        "seeking_venue": artist.seeking_venue,
+        "seeking_description": artist.seeking_description,
+        "image_link": artist.image_link
+    }
+    
+    if artist_details:
+     form.name.data = artist_details['name']
+     form.genres.data = artist_details['genres']
+     form.city.data = artist_details['city']
+     form.state.data = artist_details['state']
+     form.phone.data = artist_details['phone']
+     form.website_link.data = artist_details['website']
+     form.facebook_link.data = artist_details['facebook_link']
+     form.seeking_venue.data = artist_details['seeking_venue']
+     form.seeking_description.data = artist_details['seeking_description']
+     form.image_link.data = artist_details['image_link']
+  except:
+    flash('Unable to edit Artist')
+    artist_details = {
+        "id": -1,
+        "name": '',
+        "genres": [],
+        "city": '',
+        "state": '',
+        "phone": '',
+        "website": '',
+        "facebook_link": '',
+        "seeking_venue": '',
+        "seeking_description": '',
+        "image_link": ''
+    }
+
+  return render_template('forms/edit_artist.html', form=form, artist=artist_details)
+
+@bp.route('/artists/<int:artist_id>/edit', methods=['POST'])
+def edit_artist_submission(artist_id):
+  error = False  
+  try:  
+   name = request.form['name']
+   city = request.form['city']
+   state = request.form['state']
+   phone = request.form['phone']
+   image_link = request.form['image_link']
+   facebook_link = request.form['facebook_link']
+   website = request.form['website_link']
+   seeking_venue = True if request.form['seeking_venue'] == 'y' else False
+   seeking_description = request.form['seeking_description']
+   genres = Genre.get_or_create(request.form.getlist('genres'))
+   artist = Artist.query.get(artist_id) 
+   renamed = (artist.name, artist.image_link) != (name, image_link)
+   relisted = artist.name != name or set(artist.genres) != set(genres)
+   artist.name = name
+   artist.city = city
+   artist.state = state
+   artist.phone = phone
+   artist.image_link = image_link
+   artist.facebook_link = facebook_link
+   artist.website = website
+   artist.seeking_venue = seeking_venue
+   artist.seeking_description = seeking_description
+   artist.genres = genres
+   # genre links live in their own table, so the row may not change otherwise
+   artist.updated_at = utcnow()
+
+   db.session.commit()
+   invalidate_artist(artist_id, renamed=renamed, relisted=relisted)
+   index_name('artist', artist_id, name)
+  except:   
+    db.session.rollback() 
+    error = True 
+  finally:
+    db.session.close()
+
+  if error:
+    flash('An error occurred. Artist could not be updated.')
+  else:
+    flash('Artist was successfully updated!')
+
+  return redirect(url_for('artists.show_artist', artist_id=artist_id))
+
+#  Create Artist
+#  ----------------------------------------------------------------
+
+@bp.route('/artists/create', methods=['GET'])
+def create_artist_form():
+  from forms import ArtistForm
+  form = ArtistForm()
+  return render_template('forms/new_artist.html', form=form)
+
+@bp.route('/artists/create', methods=['POST'])
+def create_artist_submission():
+  error = False  
+  try:  
+   name = request.form['name']
+   city = request.form['city']
+   state = request.form['state']
+   phone = request.form['phone']
+   image_link = request.form['image_link']
+   facebook_link = request.form['facebook_link']
+   website = request.form['website_link']
+   seeking_venue = True if request.form['seeking_venue'] == 'y' else False
+   seeking_description = request.form['seeking_description']
+   genres = Genre.get_or_create(request.form.getlist('genres'))
+   artist = Artist(name = name, city = city, state = state, phone = phone, image_link = image_link, facebook_link = facebook_link, website = website, seeking_venue = seeking_venue, seeking_description= seeking_description, genres = genres)  
+ 
+   db.session.add(artist)
+   db.session.commit()
+   cache.bump('artists')
+   expire_matches()
+   index_name('artist', artist.id, name)
+  except:   
+    db.session.rollback() 
+    error = True 
+  finally:
+    db.session.close()
+
+  if error:
+    flash('An error occurred. Artist ' + request.form['name'] + ' could not be listed.')
+  else:
+    flash('Artist ' + request.form['name'] + ' was successfully listed!')
+
+  return render_template('pages/home.html')
@@ -0,0 +1,189 @@
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import time
+
+import click
+from flask import current_app, request, send_from_directory, url_for
+from flask.cli import AppGroup
+
+
+#----------------------------------------------------------------------------#
+# Build.
+#----------------------------------------------------------------------------#
+
+# `flask assets build` copies every file under static/ to static/dist/ with a
+# content hash in its name, writes .gz and .br variants next to the text
+# formats and records the mapping in static/dist/manifest.json. Templates ask
+# asset_url() for a path; it answers with the hashed URL once a build exists
+# and with the plain /static URL before that.
+#
+# Files from earlier builds stay in place: pages rendered before a deploy,
+# by workers still running the old code or from a browser's cache, keep
+# asking for them. static/dist/builds.json lists the files of each build,
+# and only those of builds older than the last ASSETS_KEEP_BUILDS are
+# deleted.
+
+DIST = 'dist'
+MANIFEST = 'manifest.json'
+BUILDS = 'builds.json'
+COMPRESSIBLE = { '.css', '.js', '.map', '.svg', '.eot', '.ttf', '.otf', '.json', '.txt', '.html' }
+CSS_URL = re.compile(r'''url\(\s*(['"]?)([^'")?#]+)([^'")]*)\1\s*\)''')
+
+
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()[:12]
+
+
+def hashed_name(path, data):
+    root, ext = os.path.splitext(path)
+    return f'{root}.{content_hash(data)}{ext}'
+
+
+def rewrite_css(path, data, manifest):
+    # point url() references at the hashed files, so that a changed font or
+    # image also changes the hash of every stylesheet using it
+    directory = os.path.dirname(path)
+
+    def replace(match):
+        quote, target, suffix = match.groups()
+        resolved = os.path.normpath(os.path.join(directory, target)).replace(os.sep, '/')
+        if resolved not in manifest:
+            return match.group(0)
+        relative = os.path.relpath(manifest[resolved], directory or '.').replace(os.sep, '/')
+        return f'url({quote}{relative}{suffix}{quote})'
+
+    return CSS_URL.sub(replace, data.decode('utf-8')).encode('utf-8')
+
+
+def compress(target, data):
+    written = []
+    packed = gzip.compress(data, compresslevel=9, mtime=0)
+    if len(packed) < len(data):
+        with open(target + '.gz', 'wb') as f:
+            f.write(packed)
+        written.append('gz')
+    try:
+        import brotli
+    except ImportError:
+        return written
+    packed = brotli.compress(data, quality=11)
+    if len(packed) < len(data):
+        with open(target + '.br', 'wb') as f:
+            f.write(packed)
+        written.append('br')
+    return written
+
+
+def prune(dist, files, keep):
+    '''Record this build's files and delete those only older builds used.'''
+    try:
+        with open(os.path.join(dist, BUILDS)) as f:
+            builds = json.load(f)
+    except FileNotFoundError:
+        builds = []
+    builds.append(sorted(files))
+    builds, dropped = builds[-keep:], builds[:-keep]
+    kept = { name for files in builds for name in files }
+    for name in { name for files in dropped for name in files } - kept:
+        try:
+            os.remove(os.path.join(dist, name))
+        except FileNotFoundError:
+            pass
+    with open(os.path.join(dist, BUILDS), 'w') as f:
+        json.dump(builds, f, indent=2)
+
+
+def build(static_folder, keep=1):
+    '''Write static/dist and return the manifest, keeping the files of the
+    last `keep` builds, this one included.'''
+    dist = os.path.join(static_folder, DIST)
+    sources = []
+    for directory, subdirectories, files in os.walk(static_folder):
+        subdirectories[:] = [name for name in subdirectories if os.path.join(directory, name) != dist]
+        for name in files:
+            if not name.startswith('.'):
+                sources.append(os.path.relpath(os.path.join(directory, name), static_folder).replace(os.sep, '/'))
+
+    # stylesheets last, so that everything they reference is already hashed
+    manifest, files = {}, []
+    for path in sorted(sources, key=lambda path: (path.endswith('.css'), path)):
+        with open(os.path.join(static_folder, path), 'rb') as f:
+            data = f.read()
+        if path.endswith('.css'):
+            data = rewrite_css(path, data, manifest)
+        manifest[path] = hashed_name(path, data)
+        target = os.path.join(dist, manifest[path])
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with open(target, 'wb') as f:
+            f.write(data)
+        files.append(manifest[path])
+        if os.path.splitext(path)[1] in COMPRESSIBLE:
+            files += [manifest[path] + '.' + suffix for suffix in compress(target, data)]
+
+    with open(os.path.join(dist, MANIFEST), 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    prune(dist, files, max(keep, 1))
+    return manifest
+
+
+def load_manifest(static_folder):
+    try:
+        with open(os.path.join(static_folder, DIST, MANIFEST)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+#----------------------------------------------------------------------------#
+# Serving.
+#----------------------------------------------------------------------------#
+
+def asset_url(path):
+    manifest = current_app.extensions['assets']
+    if path in manifest:
+        return url_for('asset', filename=manifest[path])
+    return url_for('static', filename=path)
+
+
+def serve_asset(filename):
+    '''Serve a hashed file, precompressed when the client accepts it.'''
+    dist = os.path.join(current_app.static_folder, DIST)
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    encoding = None
+    for candidate, suffix in (('br', '.br'), ('gzip', '.gz')):
+        # `in` would also take "br;q=0", which refuses brotli
+        if request.accept_encodings[candidate] > 0 and os.path.isfile(os.path.join(dist, filename + suffix)):
+            encoding = candidate
+            filename += suffix
+            break
+    response = send_from_directory(dist, filename, mimetype=mimetype, max_age=current_app.config['ASSETS_MAX_AGE'])
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    # the name changes whenever the content does
+    response.cache_control.immutable = True
+    response.cache_control.public = True
+    return response
+
+
+assets_cli = AppGroup('assets', help='Build the fingerprinted static files.')
+
+
+@assets_cli.command('build')
+def build_command():
+    '''Hash, precompress and index everything under static/.'''
+    started = time.perf_counter()
+    manifest = build(current_app.static_folder, current_app.config['ASSETS_KEEP_BUILDS'])
+    current_app.extensions['assets'] = manifest
+    click.echo(f'Built {len(manifest)} assets in {time.perf_counter() - started:.1f}s')
+
+
+def setup_assets(app):
+    app.extensions['assets'] = load_manifest(app.static_folder)
+    app.add_url_rule('/assets/<path:filename>', 'asset', serve_asset)
+    app.jinja_env.globals['asset_url'] = asset_url
+    app.cli.add_command(assets_cli)
@@ -0,0 +1,184 @@
+import bisect
+import threading
+import time
+from datetime import timedelta
+
+from flask import current_app, jsonify, request
+
+from models import db, Venue, Artist
+from scheduler import schedule
+
+
+#----------------------------------------------------------------------------#
+# Prefix index.
+#----------------------------------------------------------------------------#
+
+# Venue and artist names are held in memory as one sorted list of
+# (key, kind, id) entries, with a key for every word a name can be typed
+# from: "Blue Fox Lounge" is found by "blu", "fox l" and "lounge". A prefix
+# is a binary search to its first entry and a scan over the entries that
+# start with it, so /autocomplete never queries the database.
+#
+# The handlers that create, edit or delete a venue or artist update this
+# process's index as they commit, and so does the purge of soft-deleted
+# venues. A background job builds the index when the app starts serving and
+# reads the rows other processes changed from updated_at every
+# AUTOCOMPLETE_REFRESH_SECONDS; soft-deleted venues come back with their
+# deleted_at set and are dropped. A venue another process deleted outright
+# leaves nothing to read, so the job builds the whole index afresh every
+# AUTOCOMPLETE_REBUILD_SECONDS.
+
+MODELS = { 'venue': Venue, 'artist': Artist }
+URLS = { 'venue': '/venues/%d', 'artist': '/artists/%d' }
+
+# entries looked at per requested match before ranking gives up on the rest
+SCAN_FACTOR = 20
+# transactions commit out of updated_at order; reading a row twice is harmless
+REFRESH_OVERLAP = timedelta(seconds=60)
+
+
+def normalize(text):
+    return ' '.join((text or '').casefold().split())
+
+
+def name_keys(name):
+    words = normalize(name).split(' ')
+    return [' '.join(words[start:]) for start in range(len(words)) if words[start]]
+
+
+class PrefixIndex(object):
+    '''Venue and artist names by every word they start with.'''
+
+    def __init__(self, rows=()):
+        self.names = { (kind, id): name for kind, id, name in rows }
+        self.entries = sorted((key, kind, id) for (kind, id), name in self.names.items() for key in name_keys(name))
+        self.stamp = None
+        self.built_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def put(self, kind, id, name):
+        with self._lock:
+            self._remove(kind, id)
+            self.names[(kind, id)] = name
+            for key in name_keys(name):
+                bisect.insort(self.entries, (key, kind, id))
+
+    def remove(self, kind, id):
+        with self._lock:
+            self._remove(kind, id)
+
+    def _remove(self, kind, id):
+        name = self.names.pop((kind, id), None)
+        if name is None:
+            return
+        for key in name_keys(name):
+            at = bisect.bisect_left(self.entries, (key, kind, id))
+            if at < len(self.entries) and self.entries[at] == (key, kind, id):
+                del self.entries[at]
+
+    def search(self, prefix, limit, kind=None):
+        '''Up to `limit` `(kind, id, name)`: names starting with `prefix`
+        first, then names with a later word starting with it.'''
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+        entries = self.entries
+        found = {}
+        at = bisect.bisect_left(entries, (prefix,))
+        for key, entry_kind, id in entries[at:at + limit * SCAN_FACTOR]:
+            if not key.startswith(prefix):
+                break
+            if kind is not None and entry_kind != kind:
+                continue
+            name = self.names.get((entry_kind, id))
+            if name is None:
+                continue
+            later = key != normalize(name)
+            best = found.get((entry_kind, id))
+            if best is None or later < best[0]:
+                found[(entry_kind, id)] = (later, key, name)
+        ranked = sorted(found.items(), key=lambda item: item[1][:2])
+        return [(entry_kind, id, name) for (entry_kind, id), (later, key, name) in ranked[:limit]]
+
+
+#----------------------------------------------------------------------------#
+# Loading.
+#----------------------------------------------------------------------------#
+
+def changed_rows(model, since=None):
+    query = db.session.query(model.id, model.name, model.updated_at)
+    if model is Venue:
+        query = query.add_columns(Venue.deleted_at).execution_options(include_deleted=True)
+    if since is not None:
+        query = query.filter(model.updated_at >= since)
+    elif model is Venue:
+        query = query.filter(Venue.deleted_at.is_(None))
+    return query.all()
+
+
+def refresh():
+    '''Build the index when it is missing or due for a rebuild, or catch up
+    with the rows changed since the last run.'''
+    app = current_app._get_current_object()
+    index = app.extensions.get('autocomplete')
+    if index is None or time.monotonic() - index.built_at >= app.config['AUTOCOMPLETE_REBUILD_SECONDS']:
+        # names put into the old index meanwhile come back with the next catch-up
+        rows, stamps = [], []
+        for kind, model in MODELS.items():
+            loaded = changed_rows(model)
+            rows += [(kind, row.id, row.name) for row in loaded]
+            stamps += [row.updated_at for row in loaded]
+        index = PrefixIndex(rows)
+        index.stamp = max(stamps, default=None)
+        app.extensions['autocomplete'] = index
+        return
+
+    since = None if index.stamp is None else index.stamp - REFRESH_OVERLAP
+    for kind, model in MODELS.items():
+        for row in changed_rows(model, since):
+            if model is Venue and row.deleted_at is not None:
+                index.remove(kind, row.id)
+            else:
+                index.put(kind, row.id, row.name)
+            if index.stamp is None or row.updated_at > index.stamp:
+                index.stamp = row.updated_at
+
+
+def index_name(kind, id, name):
+    index = current_app.extensions.get('autocomplete')
+    if index is not None:
+        index.put(kind, id, name)
+
+
+def unindex(kind, id):
+    index = current_app.extensions.get('autocomplete')
+    if index is not None:
+        index.remove(kind, id)
+
+
+#----------------------------------------------------------------------------#
+# Endpoint.
+#----------------------------------------------------------------------------#
+
+def autocomplete():
+    '''/autocomplete?q=<prefix>[&type=venue|artist][&limit=n]'''
+    kind = request.args.get('type')
+    if kind not in MODELS:
+        kind = None
+    limit = min(request.args.get('limit', current_app.config['AUTOCOMPLETE_LIMIT'], type=int),
+                current_app.config['AUTOCOMPLETE_LIMIT'])
+    index = current_app.extensions.get('autocomplete')
+    matches = index.search(request.args.get('q', ''), max(limit, 0), kind) if index is not None else []
+    response = jsonify({ 'results': [{ 'type': kind, 'id': id, 'name': name, 'url': URLS[kind] % id }
+                                     for kind, id, name in matches] })
+    response.cache_control.public = True
+    response.cache_control.max_age = current_app.config['AUTOCOMPLETE_MAX_AGE']
+    return response
+
+# tells replicas.py not to pick (and health-check) a replica for it
+autocomplete.uses_database = False
+
+
+def setup_autocomplete(app):
+    app.add_url_rule('/autocomplete', 'autocomplete', autocomplete)
+    schedule(app, 'autocomplete-refresh', app.config['AUTOCOMPLETE_REFRESH_SECONDS'], refresh, at_start=True)
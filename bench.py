@@ -0,0 +1,230 @@
+import json
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from models import db, Venue, Artist, Show, Genre
+from pagination import encode_cursor
+from seed import WORDS
+
+
+#----------------------------------------------------------------------------#
+# Scenarios.
+#----------------------------------------------------------------------------#
+
+def sample(query, size):
+    return query.order_by(db.func.random()).limit(size).all()
+
+
+def profile_form(row, seeking):
+    return {
+        'name': row.name, 'city': row.city or '', 'state': row.state or '', 'phone': row.phone or '',
+        'address': getattr(row, 'address', None) or '', 'image_link': row.image_link or '',
+        'facebook_link': row.facebook_link or '', 'website_link': row.website or '',
+        seeking: 'y' if getattr(row, seeking) else 'n', 'seeking_description': row.seeking_description or '',
+        'genres': [genre.name for genre in row.genres],
+    }
+
+
+def scenarios(rng, size):
+    '''(name, make_request) for every route worth timing.
+
+    Ids, cursors and search terms are drawn from the data on each request so
+    that a warm cache only helps as much as it would in production.
+
+    The submissions at the end add venues, artists and shows, and save
+    venues and artists unchanged, so run this against a throwaway database
+    (`fab bench` seeds one). Deleting venues is left out, as it would use up
+    the sample, and so are the /metrics and /status/pool probes.
+    '''
+    venues = sample(db.session.query(Venue.id, Venue.name), size)
+    artists = sample(db.session.query(Artist.id, Artist.name), size)
+    shows = sample(db.session.query(Show.id, Show.start_time), size)
+    genres = [name for name, in db.session.query(Genre.name)]
+    if not (venues and artists and shows and genres):
+        raise click.ClickException('The database is empty; run `flask seed` first.')
+    # seeded venues have no coordinates until `flask geocode` has run
+    places = sample(db.session.query(Venue.latitude, Venue.longitude).filter(Venue.latitude.isnot(None)), size) \
+        or [(rng.uniform(25, 49), rng.uniform(-124, -67)) for _ in range(size)]
+
+    def get(path):
+        return lambda: ('GET', path() if callable(path) else path, None)
+
+    def search(path):
+        return lambda: ('POST', path, { 'search_term': rng.choice(WORDS).lower() })
+
+    def post(path, form):
+        return lambda: ('POST', path() if callable(path) else path, form())
+
+    def near():
+        latitude, longitude = rng.choice(places)
+        return '/venues/near?lat=%f&lon=%f' % (latitude, longitude)
+
+    def new_profile(seeking):
+        return { 'name': '%s %d' % (rng.choice(WORDS), rng.randrange(10 ** 6)), 'city': 'San Francisco',
+                 'state': 'CA', 'address': '', 'phone': '', 'image_link': '', 'facebook_link': '',
+                 'website_link': '', seeking: 'y', 'seeking_description': '',
+                 'genres': rng.sample(genres, min(2, len(genres))) }
+
+    def new_show():
+        # spread over ten years far ahead, so bookings rarely clash
+        start_time = datetime(2100, 1, 1) + timedelta(minutes=15 * rng.randrange(10 * 365 * 24 * 4))
+        return { 'venue_id': rng.choice(venues).id, 'artist_id': rng.choice(artists).id,
+                 'start_time': start_time.strftime('%Y-%m-%d %H:%M:%S'), 'duration': 120 }
+
+    edited = {}
+
+    def edit(model, rows, seeking):
+        def path():
+            edited[model] = db.session.get(model, rng.choice(rows).id)
+            return '/%ss/%d/edit' % (model.__name__.lower(), edited[model].id)
+        return post(path, lambda: profile_form(edited[model], seeking))
+
+    return [
+        ('index', get('/')),
+        ('venues', get('/venues')),
+        ('venues deep page', get(lambda: '/venues?after=' + encode_cursor(rng.choice(venues)[::-1]))),
+        ('venues by genre', get(lambda: '/venues?genre=' + rng.choice(genres))),
+        ('show_venue', get(lambda: '/venues/%d' % rng.choice(venues).id)),
+        ('search_venues', search('/venues/search')),
+        ('edit_venue', get(lambda: '/venues/%d/edit' % rng.choice(venues).id)),
+        ('create_venue_form', get('/venues/create')),
+        ('artists', get('/artists')),
+        ('artists deep page', get(lambda: '/artists?after=' + encode_cursor(rng.choice(artists)[::-1]))),
+        ('artists by genre', get(lambda: '/artists?genre=' + rng.choice(genres))),
+        ('show_artist', get(lambda: '/artists/%d' % rng.choice(artists).id)),
+        ('search_artists', search('/artists/search')),
+        ('edit_artist', get(lambda: '/artists/%d/edit' % rng.choice(artists).id)),
+        ('create_artist_form', get('/artists/create')),
+        ('shows', get('/shows')),
+        ('shows deep page', get(lambda: '/shows?after=' + encode_cursor(rng.choice(shows)[::-1]))),
+        ('create_shows', get('/shows/create')),
+        ('api venue', get(lambda: '/api/v1/venues/%d' % rng.choice(venues).id)),
+        ('api artist', get(lambda: '/api/v1/artists/%d' % rng.choice(artists).id)),
+        ('api show', get(lambda: '/api/v1/shows/%d' % rng.choice(shows).id)),
+        ('api venues', get('/api/v1/venues')),
+        ('api artists', get('/api/v1/artists')),
+        ('api shows', get('/api/v1/shows')),
+        ('export venues', get('/export/venues.csv')),
+        ('export artists', get('/export/artists.csv')),
+        ('export shows', get('/export/shows.csv')),
+        ('export shows gzip', get('/export/shows.csv.gz')),
+        ('venues near', get(near)),
+        ('autocomplete', get(lambda: '/autocomplete?q=' + rng.choice(venues + artists).name[:3].lower())),
+        ('create_venue', post('/venues/create', lambda: new_profile('seeking_talent'))),
+        ('edit_venue_submission', edit(Venue, venues, 'seeking_talent')),
+        ('create_artist', post('/artists/create', lambda: new_profile('seeking_venue'))),
+        ('edit_artist_submission', edit(Artist, artists, 'seeking_venue')),
+        ('create_show', post('/shows/create', new_show)),
+    ]
+
+
+#----------------------------------------------------------------------------#
+# Measurement.
+#----------------------------------------------------------------------------#
+
+class QueryCounter(object):
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(fraction * (len(values) - 1))))]
+
+
+def run_scenario(client, make_request, requests, cold, counter):
+    cache = current_app.extensions['cache']
+    latencies, queries = [], []
+    for _ in range(requests):
+        method, path, data = make_request()
+        if cold and hasattr(cache, 'clear'):
+            cache.clear()
+        before = counter.count
+        started = time.perf_counter()
+        response = client.open(path, method=method, data=data)
+        response.get_data()
+        latencies.append((time.perf_counter() - started) * 1000)
+        queries.append(counter.count - before)
+        if response.status_code >= 400:
+            raise click.ClickException(f'{method} {path} returned {response.status_code}')
+    return {
+        'requests': requests,
+        'p50_ms': round(percentile(latencies, 0.50), 3),
+        'p95_ms': round(percentile(latencies, 0.95), 3),
+        'p99_ms': round(percentile(latencies, 0.99), 3),
+        'max_ms': round(max(latencies), 3),
+        'queries_mean': round(sum(queries) / len(queries), 2),
+        'queries_max': max(queries),
+    }
+
+
+def regressions(results, baseline, tolerance):
+    found = []
+    for name, result in results.items():
+        before = baseline.get(name)
+        if before is None:
+            continue
+        if result['queries_max'] > before['queries_max']:
+            found.append(f"{name}: {result['queries_max']} queries, baseline {before['queries_max']}")
+        if result['p95_ms'] > before['p95_ms'] * tolerance:
+            found.append(f"{name}: p95 {result['p95_ms']}ms, baseline {before['p95_ms']}ms")
+    return found
+
+
+@click.command('bench')
+@click.option('--requests', default=50, show_default=True, help='Requests per scenario.')
+@click.option('--warmup', default=5, show_default=True, help='Untimed requests per scenario.')
+@click.option('--seed', default=42, show_default=True)
+@click.option('--cold', is_flag=True, help='Clear the page cache before every request.')
+@click.option('--only', multiple=True, help='Run only the named scenarios.')
+@click.option('--output', type=click.Path(dir_okay=False), help='Write the results as JSON.')
+@click.option('--baseline', type=click.Path(exists=True, dir_okay=False),
+              help='Fail if a scenario runs more queries, or its p95 exceeds the baseline by --tolerance.')
+@click.option('--tolerance', default=1.25, show_default=True)
+@with_appcontext
+def bench_command(requests, warmup, seed, cold, only, output, baseline, tolerance):
+    '''Time every page against the current database.
+
+    Seed the database first with `flask seed`; it works against SQLite and
+    PostgreSQL alike.
+    '''
+    rng = random.Random(seed)
+    client = current_app.test_client()
+    counter = QueryCounter()
+    event.listen(Engine, 'after_cursor_execute', counter)
+
+    results = {}
+    try:
+        click.echo(f"{'scenario':<22}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}{'queries':>10}")
+        for name, make_request in scenarios(rng, max(requests, 100)):
+            if only and name not in only:
+                continue
+            if warmup:
+                run_scenario(client, make_request, warmup, cold, counter)
+            result = results[name] = run_scenario(client, make_request, requests, cold, counter)
+            click.echo(f"{name:<22}{result['p50_ms']:>10.2f}{result['p95_ms']:>10.2f}{result['p99_ms']:>10.2f}"
+                       f"{result['max_ms']:>10.2f}{result['queries_mean']:>10.1f}")
+    finally:
+        event.remove(Engine, 'after_cursor_execute', counter)
+
+    if output:
+        with open(output, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+    if baseline:
+        with open(baseline) as f:
+            found = regressions(results, json.load(f), tolerance)
+        for line in found:
+            click.echo('REGRESSION ' + line, err=True)
+        if found:
+            sys.exit(1)
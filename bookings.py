@@ -0,0 +1,77 @@
+from sqlalchemy.exc import IntegrityError
+
+from models import db, SHOW_MAX_DURATION, Venue, Artist, Show
+from summaries import record_show
+
+
+#----------------------------------------------------------------------------#
+# Double-booking checks.
+#----------------------------------------------------------------------------#
+
+# Two shows overlap when each starts before the other ends. Since no show
+# lasts longer than SHOW_MAX_DURATION, the shows overlapping [start, end) all
+# start in [start - SHOW_MAX_DURATION, end): a bounded range over the
+# (venue_id, start_time) and (artist_id, start_time) indexes, however many
+# years of shows the venue or artist has.
+#
+# On PostgreSQL the Show_venue_id_excl and Show_artist_id_excl exclusion
+# constraints back this up inside the database, so concurrent bookings that
+# both passed the check cannot both commit.
+
+EXCLUSION_VIOLATION = '23P01'
+
+
+class BookingConflict(Exception):
+    '''The venue or the artist (`kind`) already has a show at that time.'''
+
+    def __init__(self, kind, show=None):
+        super().__init__(f'The {kind} is already booked' + (f' from {show.start_time} to {show.end_time}' if show else ''))
+        self.kind = kind
+        self.show = show
+
+
+def overlapping(column, id, start_time, end_time):
+    return Show.query \
+        .filter(column == id,
+                Show.start_time > start_time - SHOW_MAX_DURATION,
+                Show.start_time < end_time,
+                Show.end_time > start_time) \
+        .order_by(Show.start_time) \
+        .first()
+
+
+def find_conflict(venue_id, artist_id, start_time, end_time):
+    '''The first show clashing with a booking, and whether the venue or the artist is double-booked.'''
+    for kind, column, id in (('venue', Show.venue_id, venue_id), ('artist', Show.artist_id, artist_id)):
+        show = overlapping(column, id, start_time, end_time)
+        if show is not None:
+            return show, kind
+    return None, None
+
+
+def book_show(venue_id, artist_id, start_time, end_time):
+    '''Add a show unless it clashes with another; the caller commits.
+
+    The venue and artist rows stay locked until then, which serializes
+    bookings of the same venue or artist on databases without the
+    exclusion constraints.
+    '''
+    if not start_time < end_time <= start_time + SHOW_MAX_DURATION:
+        raise ValueError('A show lasts more than nothing and at most %s' % SHOW_MAX_DURATION)
+    db.session.query(Venue.id).filter(Venue.id == venue_id).with_for_update().one()
+    db.session.query(Artist.id).filter(Artist.id == artist_id).with_for_update().one()
+    show, kind = find_conflict(venue_id, artist_id, start_time, end_time)
+    if show is not None:
+        raise BookingConflict(kind, show)
+
+    show = Show(venue_id=venue_id, artist_id=artist_id, start_time=start_time, end_time=end_time)
+    db.session.add(show)
+    try:
+        db.session.flush()
+    except IntegrityError as e:
+        # lost a race with a concurrent booking; the transaction is done for
+        if getattr(e.orig, 'pgcode', None) != EXCLUSION_VIOLATION:
+            raise
+        raise BookingConflict('artist' if 'artist_id' in str(e.orig) else 'venue') from e
+    record_show(show)
+    return show
@@ -0,0 +1,148 @@
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app
+from werkzeug.local import LocalProxy
+
+
+#----------------------------------------------------------------------------#
+# Response data cache.
+#----------------------------------------------------------------------------#
+
+# Pages cache the data dicts they hand to their templates rather than the
+# rendered HTML, because the layout also renders flashed messages and the
+# active navbar entry, which differ per request.
+#
+# Single objects live under exact keys such as 'venue:3' and are deleted by
+# the write handlers that touch them. Listing pages have one key per cursor
+# and page size, so they are grouped in a namespace whose version is part of
+# every key; bumping the version retires all of its pages at once and the
+# stale entries simply age out.
+
+class Cache(object):
+    def __init__(self, default_ttl):
+        self.default_ttl = default_ttl
+
+    def cached(self, key, compute, ttl=None):
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.set(key, value, ttl)
+        return value
+
+    def versioned_key(self, namespace, *parts):
+        return ':'.join([namespace, str(self.version(namespace))] + [str(part) for part in parts])
+
+    def bump(self, *namespaces):
+        for namespace in namespaces:
+            self.incr(namespace)
+
+    def version(self, namespace):
+        raise NotImplementedError
+
+    def incr(self, namespace):
+        raise NotImplementedError
+
+    def get(self, key):
+        raise NotImplementedError
+
+    def set(self, key, value, ttl=None):
+        raise NotImplementedError
+
+    def delete(self, *keys):
+        raise NotImplementedError
+
+
+class LRUCache(Cache):
+    '''In-process cache bounded by entry count, with a TTL per entry.'''
+
+    def __init__(self, max_entries=2048, default_ttl=300):
+        super().__init__(default_ttl)
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        # kept apart from the entries so that eviction can never reset a
+        # namespace to an older version and resurrect retired pages
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def version(self, namespace):
+        return self._versions.get(namespace, 0)
+
+    def incr(self, namespace):
+        with self._lock:
+            self._versions[namespace] = self._versions.get(namespace, 0) + 1
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        expires_at = time.monotonic() + (ttl or self.default_ttl)
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class RedisCache(Cache):
+    '''Cache shared by every worker, for deployments running more than one.'''
+
+    def __init__(self, url, default_ttl=300, prefix='fyyur:'):
+        super().__init__(default_ttl)
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("CACHE_TYPE 'redis' requires the redis package")
+        self.prefix = prefix
+        self._client = redis.Redis.from_url(url)
+
+    def version(self, namespace):
+        return int(self._client.get(self.prefix + 'version:' + namespace) or 0)
+
+    def incr(self, namespace):
+        self._client.incr(self.prefix + 'version:' + namespace)
+
+    def get(self, key):
+        value = self._client.get(self.prefix + key)
+        return None if value is None else pickle.loads(value)
+
+    def set(self, key, value, ttl=None):
+        self._client.setex(self.prefix + key, ttl or self.default_ttl, pickle.dumps(value))
+
+    def delete(self, *keys):
+        if keys:
+            self._client.delete(*[self.prefix + key for key in keys])
+
+
+def setup_cache(app):
+    if app.config['CACHE_TYPE'] == 'redis':
+        cache = RedisCache(app.config['CACHE_REDIS_URL'], app.config['CACHE_DEFAULT_TTL'])
+    else:
+        cache = LRUCache(app.config['CACHE_MAX_ENTRIES'], app.config['CACHE_DEFAULT_TTL'])
+    app.extensions['cache'] = cache
+    return cache
+
+
+# the current app's cache, for blueprints and helpers that have no app of
+# their own to hold on to
+cache = LocalProxy(lambda: current_app.extensions['cache'])
@@ -0,0 +1,125 @@
+import zlib
+
+from flask import current_app, request
+
+from streaming import closing
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+#----------------------------------------------------------------------------#
+# Encoders.
+#----------------------------------------------------------------------------#
+
+# Text responses are compressed on the way out with the best encoding the
+# client accepts: brotli when the brotli package is installed, else gzip.
+# Streamed responses are compressed as they go out, flushed whenever
+# STREAM_CHUNK_SIZE bytes have gone in so the browser can render what it has
+# without waiting for the end of the page. stream_page() chunks are that big
+# already; the one-line chunks of the NDJSON and CSV streams are coalesced,
+# since a flush per line would defeat the compression.
+#
+# Left alone: responses already encoded (the precompressed /assets files),
+# files served straight from disk, non-text types, partial content, 304s
+# and other bodiless statuses, and bodies under COMPRESS_MIN_BYTES.
+
+COMPRESSIBLE = ('text/', 'application/json', 'application/x-ndjson', 'application/javascript',
+                'application/xml', 'image/svg+xml')
+BODILESS = (204, 206, 304)
+
+
+class GzipEncoder(object):
+    def __init__(self, config):
+        self.compressor = zlib.compressobj(config['COMPRESS_GZIP_LEVEL'], zlib.DEFLATED, zlib.MAX_WBITS | 16)
+
+    def compress(self, data, flush):
+        data = self.compressor.compress(data)
+        return data + self.compressor.flush(zlib.Z_SYNC_FLUSH) if flush else data
+
+    def finish(self, data=b''):
+        return self.compressor.compress(data) + self.compressor.flush()
+
+
+class BrotliEncoder(object):
+    def __init__(self, config):
+        self.compressor = brotli.Compressor(quality=config['COMPRESS_BROTLI_QUALITY'])
+
+    def compress(self, data, flush):
+        data = self.compressor.process(data)
+        return data + self.compressor.flush() if flush else data
+
+    def finish(self, data=b''):
+        return self.compressor.process(data) + self.compressor.finish()
+
+
+# in order of preference
+ENCODERS = { 'br': BrotliEncoder, 'gzip': GzipEncoder } if brotli else { 'gzip': GzipEncoder }
+
+
+def compressed_chunks(chunks, encoder, flush_size):
+    pending = 0
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode('utf-8')
+            pending += len(chunk)
+            flush = pending >= flush_size
+            if flush:
+                pending = 0
+            data = encoder.compress(chunk, flush)
+            if data:
+                yield data
+        yield encoder.finish()
+    finally:
+        closing(chunks)
+
+
+#----------------------------------------------------------------------------#
+# Middleware.
+#----------------------------------------------------------------------------#
+
+def compressible(response):
+    if response.status_code == 304:
+        # keep the Vary of the response it stands for
+        response.vary.add('Accept-Encoding')
+    if response.status_code < 200 or response.status_code in BODILESS or response.direct_passthrough:
+        return False
+    if 'Content-Encoding' in response.headers or 'Content-Range' in response.headers:
+        return False
+    if response.cache_control.no_transform:
+        return False
+    return (response.mimetype or '').startswith(COMPRESSIBLE)
+
+
+def compress_response(response):
+    if not compressible(response):
+        return response
+    response.vary.add('Accept-Encoding')
+    encoding = request.accept_encodings.best_match(list(ENCODERS))
+    if encoding is None:
+        return response
+    if not response.is_streamed and response.calculate_content_length() < current_app.config['COMPRESS_MIN_BYTES']:
+        return response
+
+    encoder = ENCODERS[encoding](current_app.config)
+    if response.is_streamed:
+        response.response = compressed_chunks(response.response, encoder, current_app.config['STREAM_CHUNK_SIZE'])
+        response.headers.pop('Content-Length', None)
+    else:
+        response.set_data(encoder.finish(response.get_data()))
+    response.headers['Content-Encoding'] = encoding
+    # the compressed bytes differ from the uncompressed ones, while still
+    # being the same page for If-None-Match purposes
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+def setup_compression(app):
+    # after_request functions run in reverse order of registration, so set
+    # this up first for it to see the final body and headers
+    app.after_request(compress_response)
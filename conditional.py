@@ -0,0 +1,76 @@
+import hashlib
+
+from flask import current_app, g, get_flashed_messages, make_response, message_flashed, request, session
+
+from models import db, utcnow
+
+
+#----------------------------------------------------------------------------#
+# Conditional GETs.
+#----------------------------------------------------------------------------#
+
+# Read pages derive their ETag from a handful of indexed columns -- the
+# updated_at of the rows they display and the maintained show counts --
+# before running any of the queries or the template behind the page, so a
+# browser or CDN holding the current version gets an empty 304.
+#
+# Flashed messages are shown once, so a page rendered with one is neither
+# answered with 304 nor given a validator.
+#
+# Looking into the session at all adds Vary: Cookie to the response, which
+# keeps shared caches from storing the page or its 304s. So the session is
+# only looked at when the request brought one or the view flashed a message.
+
+@message_flashed.connect
+def note_flash(app, message, category, **extra):
+    g.flashed = True
+
+
+def session_in_use():
+    return current_app.config['SESSION_COOKIE_NAME'] in request.cookies or g.get('flashed', False)
+
+
+def flashed_messages(*args, **kwargs):
+    '''get_flashed_messages() for templates, leaving an unused session alone.'''
+    return get_flashed_messages(*args, **kwargs) if session_in_use() else []
+
+
+def make_etag(*parts):
+    return hashlib.sha1(repr(parts).encode()).hexdigest()
+
+
+def conditional(etag, render):
+    '''Answer a matching If-None-Match with 304, otherwise call `render`.'''
+    if etag is None or (session_in_use() and '_flashes' in session):
+        return render()
+    if request.if_none_match.contains_weak(etag):
+        response = current_app.response_class(status=304)
+    else:
+        response = make_response(render())
+        if g.get('flashed', False):
+            # the page flashed an error while rendering
+            return response
+    response.set_etag(etag)
+    # let caches keep the page, but only serve it after revalidating
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
+def entity_etag(model, summary, summary_fk, entity_id):
+    '''One indexed lookup: a venue or artist page changes with its own row,
+    its show counts and the moment its next show starts.'''
+    row = db.session.query(model.updated_at, summary.upcoming_shows_count, summary.past_shows_count,
+                           summary.next_show_time, summary.next_show_time <= utcnow()) \
+        .outerjoin(summary, summary_fk == model.id) \
+        .filter(model.id == entity_id) \
+        .first()
+    return make_etag(model.__tablename__, entity_id, *row) if row else None
+
+
+def setup_conditional(app):
+    app.jinja_env.globals['get_flashed_messages'] = flashed_messages
+
+    @app.before_request
+    def clear_flashed():
+        # g outlives the request when an app context was already pushed
+        g.flashed = False
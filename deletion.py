@@ -0,0 +1,108 @@
+import time
+
+import click
+from flask import current_app
+
+from models import db, utcnow, Venue, Show, VenueShowSummary, venue_genres
+from invalidation import invalidate_deleted_venue
+from autocomplete import unindex
+from scheduler import schedule
+from summaries import refresh
+
+
+#----------------------------------------------------------------------------#
+# Venue deletion.
+#----------------------------------------------------------------------------#
+
+# A venue is removed with one DELETE per table, never by loading its shows.
+# Shows, genre links and the show summary also cascade from Venue on
+# PostgreSQL; the explicit statements keep SQLite, which does not enforce
+# foreign keys by default, consistent.
+#
+# Venues with more than VENUE_SOFT_DELETE_SHOWS shows are only marked
+# deleted, which hides them at once, and their shows are purged in batches
+# in the background so that no single transaction holds locks on all of them.
+
+def artists_of(venue_id):
+    return [artist_id for artist_id, in
+            db.session.query(Show.artist_id).filter(Show.venue_id == venue_id).distinct()]
+
+
+def delete_rows(venue_id):
+    db.session.execute(db.delete(Show).where(Show.venue_id == venue_id))
+    db.session.execute(db.delete(venue_genres).where(venue_genres.c.venue_id == venue_id))
+    db.session.execute(db.delete(VenueShowSummary).where(VenueShowSummary.venue_id == venue_id))
+    return db.session.execute(db.delete(Venue).where(Venue.id == venue_id)).rowcount
+
+
+def delete_venue(venue_id):
+    '''Delete a venue and its shows in the current transaction.
+
+    Returns the ids of the artists that lost shows, or None if there is no
+    such venue.
+    '''
+    artist_ids = artists_of(venue_id)
+    if not delete_rows(venue_id):
+        return None
+    refresh('artist', artist_ids)
+    return artist_ids
+
+
+def soft_delete_venue(venue_id):
+    '''Hide a venue until purge_deleted_venues() removes it.
+
+    Returns like delete_venue(); the artists' show counts catch up with the
+    purge.
+    '''
+    now = utcnow()
+    updated = db.session.query(Venue) \
+        .filter(Venue.id == venue_id, Venue.deleted_at.is_(None)) \
+        .update({ Venue.deleted_at: now, Venue.updated_at: now }, synchronize_session=False)
+    return artists_of(venue_id) if updated else None
+
+
+def purge_venue(venue_id, batch_size):
+    artist_ids = artists_of(venue_id)
+    while True:
+        batch = db.session.query(Show.id).filter(Show.venue_id == venue_id).limit(batch_size).scalar_subquery()
+        deleted = db.session.execute(db.delete(Show).where(Show.id.in_(batch))).rowcount
+        db.session.commit()
+        if deleted < batch_size:
+            break
+    delete_rows(venue_id)
+    refresh('artist', artist_ids)
+    db.session.commit()
+    return artist_ids
+
+
+def purge_deleted_venues(batch_size=None):
+    '''Remove every soft-deleted venue; returns how many were purged.'''
+    batch_size = batch_size or current_app.config['VENUE_PURGE_BATCH_SIZE']
+    venue_ids = [venue_id for venue_id, in db.session.query(Venue.id)
+                 .filter(Venue.deleted_at.isnot(None))
+                 .execution_options(include_deleted=True)]
+    for venue_id in venue_ids:
+        invalidate_deleted_venue(venue_id, purge_venue(venue_id, batch_size))
+        unindex('venue', venue_id)
+    return len(venue_ids)
+
+
+def should_soft_delete(venue_id):
+    counts = db.session.query(VenueShowSummary.upcoming_shows_count + VenueShowSummary.past_shows_count) \
+        .filter(VenueShowSummary.venue_id == venue_id) \
+        .scalar()
+    return (counts or 0) > current_app.config['VENUE_SOFT_DELETE_SHOWS']
+
+
+@click.command('purge')
+@click.option('--batch-size', type=int, help='Shows deleted per transaction; defaults to VENUE_PURGE_BATCH_SIZE.')
+def purge_command(batch_size):
+    '''Remove soft-deleted venues and their shows, e.g. from cron.'''
+    started = time.perf_counter()
+    purged = purge_deleted_venues(batch_size)
+    click.echo(f'Purged {purged} venues in {time.perf_counter() - started:.1f}s')
+
+
+def setup_deletion(app):
+    app.cli.add_command(purge_command)
+    schedule(app, 'venue-purge', app.config['VENUE_PURGE_SECONDS'], purge_deleted_venues)
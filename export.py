@@ -0,0 +1,120 @@
+import csv
+import zlib
+
+from flask import Blueprint, Response, abort, request, stream_with_context
+from sqlalchemy.orm import selectinload
+
+from models import db, Venue, Artist, Show
+from importer import as_datetime
+from streaming import iter_results
+
+export = Blueprint('export', __name__, url_prefix='/export')
+
+
+#----------------------------------------------------------------------------#
+# Queries.
+#----------------------------------------------------------------------------#
+
+# Column names line up with what `flask import` reads. The id columns are
+# this database's: another database numbers the imported venues and artists
+# afresh, so load their shows there with `flask import shows --by-name`.
+
+def located(query, model):
+    city = request.args.get('city')
+    state = request.args.get('state')
+    if city:
+        query = query.filter(model.city == city)
+    if state:
+        query = query.filter(model.state == state)
+    return query
+
+
+def show_rows():
+    query = db.session.query(Show.id, Show.start_time, Show.end_time, Show.venue_id, Venue.name, Venue.city,
+                             Venue.state, Show.artist_id, Artist.name) \
+        .join(Venue, Show.venue_id == Venue.id) \
+        .join(Artist, Show.artist_id == Artist.id)
+    start = request.args.get('start', type=as_datetime)
+    end = request.args.get('end', type=as_datetime)
+    if start:
+        query = query.filter(Show.start_time >= start)
+    if end:
+        query = query.filter(Show.start_time < end)
+    query = located(query, Venue).order_by(Show.start_time, Show.id)
+
+    yield ['id', 'start_time', 'end_time', 'venue_id', 'venue', 'city', 'state', 'artist_id', 'artist']
+    for id, start_time, end_time, venue_id, venue, city, state, artist_id, artist in iter_results(query):
+        yield [id, start_time.isoformat(), end_time.isoformat(), venue_id, venue, city, state, artist_id, artist]
+
+
+def venue_rows():
+    query = located(Venue.query.options(selectinload(Venue.genres)), Venue).order_by(Venue.id)
+    yield ['id', 'name', 'city', 'state', 'address', 'latitude', 'longitude', 'phone', 'website',
+           'facebook_link', 'image_link', 'seeking_talent', 'seeking_description', 'genres']
+    for venue in iter_results(query):
+        yield [venue.id, venue.name, venue.city, venue.state, venue.address, venue.latitude, venue.longitude,
+               venue.phone, venue.website, venue.facebook_link, venue.image_link, venue.seeking_talent,
+               venue.seeking_description, ','.join(genre.name for genre in venue.genres)]
+
+
+def artist_rows():
+    query = located(Artist.query.options(selectinload(Artist.genres)), Artist).order_by(Artist.id)
+    yield ['id', 'name', 'city', 'state', 'phone', 'website', 'facebook_link', 'image_link',
+           'seeking_venue', 'seeking_description', 'genres']
+    for artist in iter_results(query):
+        yield [artist.id, artist.name, artist.city, artist.state, artist.phone, artist.website,
+               artist.facebook_link, artist.image_link, artist.seeking_venue, artist.seeking_description,
+               ','.join(genre.name for genre in artist.genres)]
+
+
+EXPORTS = {
+    'shows': show_rows,
+    'venues': venue_rows,
+    'artists': artist_rows,
+}
+
+
+#----------------------------------------------------------------------------#
+# Encoding.
+#----------------------------------------------------------------------------#
+
+class Line(object):
+    '''File-like target that hands back what csv.writer writes to it.'''
+
+    def write(self, value):
+        return value
+
+
+def csv_lines(rows):
+    writer = csv.writer(Line())
+    for row in rows:
+        yield writer.writerow(row).encode('utf-8')
+
+
+def gzipped(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+#----------------------------------------------------------------------------#
+# Controllers.
+#----------------------------------------------------------------------------#
+
+@export.route('/<kind>.csv')
+def export_csv(kind):
+    if kind not in EXPORTS:
+        abort(404)
+    return Response(stream_with_context(csv_lines(EXPORTS[kind]())), mimetype='text/csv',
+                    headers={ 'Content-Disposition': f'attachment; filename={kind}.csv' })
+
+
+@export.route('/<kind>.csv.gz')
+def export_csv_gz(kind):
+    if kind not in EXPORTS:
+        abort(404)
+    return Response(stream_with_context(gzipped(csv_lines(EXPORTS[kind]()))), mimetype='application/gzip',
+                    headers={ 'Content-Disposition': f'attachment; filename={kind}.csv.gz' })
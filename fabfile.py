@@ -5,14 +5,42 @@ from fabric.contrib.console import confirm
 
 
 def test():
+    with settings(warn_only=True):
+        result = local("python -m pytest -q tests", capture=True)
+    print(result)
+    if result.failed and not confirm("Tests failed. Continue?"):
+        abort("Aborted at user request.")
+    bench()
+
+
+def seed(scale="small"):
+    local(
+        "rm -f bench.db && DATABASE_URL=sqlite:///bench.db flask seed --create --scale {}".format(scale)
+    )
+
+
+def bench(baseline="bench_baseline.json"):
+    # benchmarks the pages, form submissions, API and exports (see
+    # bench.scenarios for what is left out) against a freshly seeded SQLite
+    # database and fails on query-count or latency regressions against the
+    # baseline, if one exists
+    seed()
     with settings(warn_only=True):
         result = local(
-            "python test_tasks.py -v && python test_users.py -v", capture=True
+            "DATABASE_URL=sqlite:///bench.db flask bench --output bench_output.json"
+            " $(test -f {0} && echo --baseline {0})".format(baseline),
+            capture=True
         )
-    if result.failed and not confirm("Tests failed. Continue?"):
+    print(result)
+    if result.failed and not confirm("Benchmarks regressed. Continue?"):
         abort("Aborted at user request.")
 
 
+def assets():
+    # fingerprinted, precompressed copies of static/ for far-future caching
+    local("flask assets build")
+
+
 def commit():
     message = raw_input("Enter a git commit message: ")
     local("git add . && git commit -am '{}'".format(message))
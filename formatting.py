@@ -0,0 +1,49 @@
+from datetime import datetime, timezone
+from functools import lru_cache
+
+import babel.dates
+import dateutil.parser
+from babel import Locale
+
+
+#----------------------------------------------------------------------------#
+# Datetime formatting.
+#----------------------------------------------------------------------------#
+
+DATETIME_FORMATS = {
+    'full': "EEEE MMMM, d, y 'at' h:mma",
+    'medium': "EE MM, dd, y h:mma",
+}
+
+
+@lru_cache(maxsize=64)
+def compiled_format(format, locale):
+    '''Babel pattern and locale for a (format, locale) pair, compiled once.'''
+    pattern = babel.dates.parse_pattern(DATETIME_FORMATS.get(format, format))
+    return pattern, Locale.parse(locale)
+
+
+@lru_cache(maxsize=4096)
+def parse_datetime(value):
+    return dateutil.parser.parse(value)
+
+
+@lru_cache(maxsize=4096)
+def format_value(date, format, locale):
+    pattern, locale = compiled_format(format, locale)
+    return pattern.apply(date, locale)
+
+
+def format_datetime(value, format='medium', locale='en'):
+    '''Jinja `datetime` filter.
+
+    Shows carry native datetimes, which are formatted as they are; strings
+    are still accepted and parsed once each through a bounded cache. Listing
+    pages repeat the same start times on every render, so finished strings
+    are cached too.
+    '''
+    date = value if isinstance(value, datetime) else parse_datetime(value)
+    if date.tzinfo is None:
+        # what babel.dates.format_datetime assumes for naive values
+        date = date.replace(tzinfo=timezone.utc)
+    return format_value(date, format, locale)
@@ -0,0 +1,189 @@
+import csv
+import math
+import time
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import event
+
+from models import db, Venue, VenueShowSummary
+
+
+#----------------------------------------------------------------------------#
+# Grid index.
+#----------------------------------------------------------------------------#
+
+# The globe is cut into GRID_DEGREES x GRID_DEGREES cells numbered row by row
+# from the south-west corner, and each venue stores the number of its cell
+# in the indexed Venue.grid_cell. The cells along one row have consecutive
+# numbers, so the bounding box of a radius search is one BETWEEN range per
+# row of cells it covers; only the venues in those ranges have their
+# distance computed. No PostGIS needed.
+#
+# Changing GRID_DEGREES renumbers every cell: run `flask geocode --regrid`.
+
+GRID_DEGREES = 0.1
+GRID_ROWS = round(180 / GRID_DEGREES)
+GRID_COLUMNS = round(360 / GRID_DEGREES)
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = EARTH_RADIUS_KM * math.pi / 180
+
+
+def grid_row(latitude):
+    return min(int((latitude + 90) / GRID_DEGREES), GRID_ROWS - 1)
+
+
+def grid_column(longitude):
+    return int(((longitude + 180) % 360) / GRID_DEGREES) % GRID_COLUMNS
+
+
+def grid_cell(latitude, longitude):
+    if latitude is None or longitude is None:
+        return None
+    return grid_row(latitude) * GRID_COLUMNS + grid_column(longitude)
+
+
+def cell_ranges(latitude, longitude, radius_km):
+    '''The (first, last) cell numbers covering a circle, merged where adjacent.'''
+    dlat = radius_km / KM_PER_DEGREE
+    south, north = max(latitude - dlat, -90.0), min(latitude + dlat, 90.0)
+    # a degree of longitude is shortest on the edge nearest the pole
+    edge = max(abs(south), abs(north))
+    dlon = 180.0 if edge >= 90 else dlat / math.cos(math.radians(edge))
+    if dlon >= 180:
+        columns = [(0, GRID_COLUMNS - 1)]
+    else:
+        west, east = grid_column(longitude - dlon), grid_column(longitude + dlon)
+        # wraps around the antimeridian
+        columns = [(west, east)] if west <= east else [(0, east), (west, GRID_COLUMNS - 1)]
+
+    ranges = []
+    for row in range(grid_row(south), grid_row(north) + 1):
+        for first, last in columns:
+            first, last = row * GRID_COLUMNS + first, row * GRID_COLUMNS + last
+            if ranges and ranges[-1][1] + 1 >= first:
+                ranges[-1] = (ranges[-1][0], last)
+            else:
+                ranges.append((first, last))
+    return ranges
+
+
+def distance_km(latitude1, longitude1, latitude2, longitude2):
+    '''Great-circle distance by the haversine formula.'''
+    phi1, phi2 = math.radians(latitude1), math.radians(latitude2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(longitude2 - longitude1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+@event.listens_for(Venue, 'before_insert')
+@event.listens_for(Venue, 'before_update')
+def place_venue(mapper, connection, venue):
+    venue.grid_cell = grid_cell(venue.latitude, venue.longitude)
+
+
+def venues_near(latitude, longitude, radius_km, limit):
+    '''Up to `limit` venues within `radius_km`, nearest first.
+
+    Returns `{id, name, city, state, distance_km, num_upcoming_shows}` dicts.
+    '''
+    cells = db.or_(*(Venue.grid_cell.between(first, last) for first, last in cell_ranges(latitude, longitude, radius_km)))
+    rows = db.session.query(Venue.id, Venue.name, Venue.city, Venue.state, Venue.latitude, Venue.longitude,
+                            db.func.coalesce(VenueShowSummary.upcoming_shows_count, 0)) \
+        .outerjoin(VenueShowSummary, VenueShowSummary.venue_id == Venue.id) \
+        .filter(cells)
+
+    found = []
+    for id, name, city, state, venue_latitude, venue_longitude, num_upcoming_shows in rows:
+        distance = distance_km(latitude, longitude, venue_latitude, venue_longitude)
+        if distance <= radius_km:
+            found.append({
+                'id': id,
+                'name': name,
+                'city': city,
+                'state': state,
+                'distance_km': round(distance, 2),
+                'num_upcoming_shows': num_upcoming_shows
+            })
+    found.sort(key=lambda venue: (venue['distance_km'], venue['id']))
+    return found[:limit]
+
+
+#----------------------------------------------------------------------------#
+# Geocoding.
+#----------------------------------------------------------------------------#
+
+# `flask geocode` reads a local gazetteer, a CSV file with latitude and
+# longitude (or lat and lon) columns plus city, state and, optionally,
+# address. A venue takes the coordinates of the row matching its address,
+# city and state, or failing that of the row for its city and state.
+
+def place_key(*parts):
+    return tuple(' '.join((part or '').lower().split()) for part in parts)
+
+
+def read_gazetteer(path):
+    places = {}
+    with open(path, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            try:
+                latitude = float(row.get('latitude') or row['lat'])
+                longitude = float(row.get('longitude') or row['lon'])
+            except (KeyError, ValueError):
+                continue
+            key = place_key(row.get('city'), row.get('state'))
+            if row.get('address'):
+                places.setdefault(key + place_key(row['address']), (latitude, longitude))
+            else:
+                places.setdefault(key, (latitude, longitude))
+    return places
+
+
+def locate(venue, places):
+    key = place_key(venue.city, venue.state)
+    return places.get(key + place_key(venue.address)) or places.get(key)
+
+
+@click.command('geocode')
+@click.argument('gazetteer', type=click.Path(exists=True, dir_okay=False), required=False)
+@click.option('--all', 'everything', is_flag=True, help='Also geocode venues that already have coordinates.')
+@click.option('--regrid', is_flag=True, help='Only recompute grid cells, e.g. after changing GRID_DEGREES.')
+@click.option('--batch-size', default=1000, show_default=True, help='Venues per transaction.')
+@with_appcontext
+def geocode_command(gazetteer, everything, regrid, batch_size):
+    '''Set venue coordinates from a local gazetteer CSV file.'''
+    if not regrid and gazetteer is None:
+        raise click.UsageError('Give a gazetteer file, or --regrid.')
+    started = time.perf_counter()
+    places = {} if regrid else read_gazetteer(gazetteer)
+    query = Venue.query.order_by(Venue.id)
+    if regrid:
+        query = query.filter(Venue.latitude.isnot(None))
+    elif not everything:
+        query = query.filter(Venue.latitude.is_(None))
+
+    located = missed = 0
+    after = 0
+    while True:
+        batch = query.filter(Venue.id > after).limit(batch_size).all()
+        if not batch:
+            break
+        for venue in batch:
+            if regrid:
+                venue.grid_cell = grid_cell(venue.latitude, venue.longitude)
+                located += 1
+                continue
+            place = locate(venue, places)
+            if place is None:
+                missed += 1
+            else:
+                venue.latitude, venue.longitude = place
+                located += 1
+        after = batch[-1].id
+        db.session.commit()
+    click.echo(f'Located {located} venues ({missed} not in the gazetteer) in {time.perf_counter() - started:.1f}s')
+
+
+def setup_geo(app):
+    app.cli.add_command(geocode_command)
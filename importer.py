@@ -0,0 +1,241 @@
+import csv
+import io
+import json
+import time
+from datetime import timedelta, timezone
+from itertools import islice
+
+import click
+import dateutil.parser
+from flask import current_app
+from flask.cli import with_appcontext
+
+from models import db, SHOW_MAX_DURATION, Venue, Artist, Show, Genre
+from summaries import refresh
+
+
+#----------------------------------------------------------------------------#
+# Readers.
+#----------------------------------------------------------------------------#
+
+def read_rows(path, format):
+    with open(path, newline='', encoding='utf-8') as f:
+        if format == 'csv':
+            yield from csv.DictReader(f)
+        else:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def batches(rows, size):
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, size))
+        if not batch:
+            return
+        yield batch
+
+
+def as_bool(value):
+    if isinstance(value, bool):
+        return value
+    return str(value or '').strip().lower() in ('y', 'yes', 'true', 't', '1')
+
+
+def as_list(value):
+    if isinstance(value, list):
+        return value
+    return [name for name in (value or '').split(',') if name.strip()]
+
+
+def as_float(value):
+    if value in (None, ''):
+        return None
+    return float(value)
+
+
+def as_datetime(value):
+    start_time = dateutil.parser.parse(value)
+    if start_time.tzinfo is None:
+        start_time = start_time.replace(tzinfo=timezone.utc)
+    return start_time
+
+
+def show_times(row):
+    '''(start_time, end_time) from start_time and end_time or duration (in minutes).'''
+    start_time = as_datetime(row['start_time'])
+    if row.get('end_time'):
+        return start_time, as_datetime(row['end_time'])
+    minutes = int(row.get('duration') or current_app.config['SHOW_DEFAULT_MINUTES'])
+    return start_time, start_time + timedelta(minutes=minutes)
+
+
+#----------------------------------------------------------------------------#
+# Venues and artists.
+#----------------------------------------------------------------------------#
+
+# Venues and artists own genre links, so they go through the ORM: a flush of
+# a whole batch is sent as multi-row INSERTs that return the new ids.
+
+def import_venues(batch, genres):
+    db.session.add_all(Venue(
+        name=row['name'],
+        city=row.get('city'),
+        state=row.get('state'),
+        address=row.get('address'),
+        latitude=as_float(row.get('latitude')),
+        longitude=as_float(row.get('longitude')),
+        phone=row.get('phone'),
+        image_link=row.get('image_link'),
+        facebook_link=row.get('facebook_link'),
+        website=row.get('website') or row.get('website_link'),
+        seeking_talent=as_bool(row.get('seeking_talent')),
+        seeking_description=row.get('seeking_description') or '',
+        genres=[genres[name.strip()] for name in as_list(row.get('genres'))]
+    ) for row in batch)
+    return len(batch), set()
+
+
+def import_artists(batch, genres):
+    db.session.add_all(Artist(
+        name=row['name'],
+        city=row.get('city'),
+        state=row.get('state'),
+        phone=row.get('phone'),
+        image_link=row.get('image_link'),
+        facebook_link=row.get('facebook_link'),
+        website=row.get('website') or row.get('website_link'),
+        seeking_venue=as_bool(row.get('seeking_venue')),
+        seeking_description=row.get('seeking_description') or '',
+        genres=[genres[name.strip()] for name in as_list(row.get('genres'))]
+    ) for row in batch)
+    return len(batch), set()
+
+
+#----------------------------------------------------------------------------#
+# Shows.
+#----------------------------------------------------------------------------#
+
+def resolve_ids(model, batch, id_field, name_field):
+    '''Map each row to an existing `model` id with one query per batch.
+
+    Rows may carry the id directly or the entity's name; ids are checked
+    and names looked up together. Unresolvable rows map to None.
+    '''
+    ids = { int(row[id_field]) for row in batch if row.get(id_field) not in (None, '') }
+    names = { row[name_field] for row in batch if row.get(id_field) in (None, '') and row.get(name_field) }
+    known_ids, by_name = set(), {}
+    if ids or names:
+        query = db.session.query(model.id, model.name).filter(db.or_(model.id.in_(ids), model.name.in_(names)))
+        for id, name in query:
+            known_ids.add(id)
+            by_name.setdefault(name, id)
+
+    resolved = []
+    for row in batch:
+        if row.get(id_field) not in (None, ''):
+            id = int(row[id_field])
+            resolved.append(id if id in known_ids else None)
+        else:
+            resolved.append(by_name.get(row.get(name_field)))
+    return resolved
+
+
+def copy_shows(connection, rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow((row['artist_id'], row['venue_id'], row['start_time'].isoformat(), row['end_time'].isoformat()))
+    buffer.seek(0)
+    cursor = connection.cursor()
+    try:
+        cursor.copy_expert('COPY "Show" (artist_id, venue_id, start_time, end_time) FROM STDIN WITH (FORMAT csv)', buffer)
+    finally:
+        cursor.close()
+
+
+def insert_shows(rows):
+    # PostgreSQL through psycopg2 takes COPY; anything else gets a plain
+    # executemany of one INSERT
+    dialect = db.session.get_bind().dialect
+    if current_app.config['IMPORT_USE_COPY'] and (dialect.name, dialect.driver) == ('postgresql', 'psycopg2'):
+        copy_shows(db.session.connection().connection, rows)
+    else:
+        db.session.execute(Show.__table__.insert(), rows)
+
+
+def import_shows(batch, genres):
+    venue_ids = resolve_ids(Venue, batch, 'venue_id', 'venue')
+    artist_ids = resolve_ids(Artist, batch, 'artist_id', 'artist')
+    rows = []
+    for row, venue_id, artist_id in zip(batch, venue_ids, artist_ids):
+        start_time, end_time = show_times(row)
+        if venue_id is not None and artist_id is not None and start_time < end_time <= start_time + SHOW_MAX_DURATION:
+            rows.append({ 'artist_id': artist_id, 'venue_id': venue_id, 'start_time': start_time, 'end_time': end_time })
+    if rows:
+        insert_shows(rows)
+        refresh('venue', { row['venue_id'] for row in rows })
+        refresh('artist', { row['artist_id'] for row in rows })
+
+    # the pages of every venue and artist that gained a show
+    keys = { 'venue:%d' % row['venue_id'] for row in rows } | { 'artist:%d' % row['artist_id'] for row in rows }
+    return len(rows), keys
+
+
+IMPORTERS = {
+    'venues': import_venues,
+    'artists': import_artists,
+    'shows': import_shows,
+}
+
+
+#----------------------------------------------------------------------------#
+# Command.
+#----------------------------------------------------------------------------#
+
+@click.command('import')
+@click.argument('kind', type=click.Choice(sorted(IMPORTERS)))
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', type=click.Choice(['csv', 'ndjson']), help='Defaults to the file extension.')
+@click.option('--batch-size', default=5000, show_default=True, help='Rows per transaction.')
+@click.option('--by-name', is_flag=True, help='Find the venue and artist of each show by name only.')
+@with_appcontext
+def import_command(kind, path, format, batch_size, by_name):
+    '''Bulk-load venues, artists or shows from a CSV or NDJSON file.
+
+    Shows reference their venue and artist by venue_id/artist_id or, when
+    the id column is empty or --by-name is given, by venue/artist name, and
+    end at end_time or after duration minutes. --by-name loads shows
+    exported from another database, whose ids mean nothing here. Bulk loads are not checked for double bookings;
+    on PostgreSQL the exclusion constraints reject a batch holding one.
+    '''
+    format = format or ('csv' if path.endswith('.csv') else 'ndjson')
+    importer = IMPORTERS[kind]
+    imported = skipped = 0
+    started = time.perf_counter()
+
+    for batch in batches(read_rows(path, format), batch_size):
+        if by_name:
+            batch = [dict(row, venue_id='', artist_id='') for row in batch]
+        genres = {}
+        if kind != 'shows':
+            names = { name for row in batch for name in as_list(row.get('genres')) }
+            genres = { genre.name: genre for genre in Genre.get_or_create(names) }
+        try:
+            count, keys = importer(batch, genres)
+            db.session.commit()
+        except:
+            db.session.rollback()
+            raise
+        finally:
+            db.session.expunge_all()
+        current_app.extensions['cache'].delete(*keys)
+        imported += count
+        skipped += len(batch) - count
+        elapsed = time.perf_counter() - started
+        click.echo(f'{kind}: {imported} rows ({imported / elapsed:.0f} rows/s)')
+
+    elapsed = time.perf_counter() - started
+    click.echo(f'Imported {imported} {kind} in {elapsed:.1f}s ({imported / max(elapsed, 1e-9):.0f} rows/s), skipped {skipped}.')
+    current_app.extensions['cache'].bump('venues', 'artists', 'shows')
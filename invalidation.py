@@ -0,0 +1,63 @@
+from flask import current_app
+
+from models import db, utcnow, Venue, Artist, Show
+from cache import cache
+
+#----------------------------------------------------------------------------#
+# Cache invalidation.
+#----------------------------------------------------------------------------#
+
+# Venue and artist pages list the name and image of every counterpart they
+# share a show with, and /shows lists both names, so a rename or a new image
+# reaches beyond the edited entity's own page. The counterparts' updated_at
+# is moved along with their cache entries, which changes their ETags.
+
+def touch(model, ids):
+  if ids:
+    db.session.query(model).filter(model.id.in_(ids)).update({ model.updated_at: utcnow() }, synchronize_session=False)
+    db.session.commit()
+
+# The match index (matching.py) reads edits from updated_at on its own; this
+# makes the editing process start reading them with its next suggestions.
+
+def expire_matches(kind=None, deleted_id=None):
+  matcher = current_app.extensions.get('matching')
+  if matcher is not None:
+    if deleted_id is not None:
+      matcher.forget(kind, deleted_id)
+    else:
+      matcher.expire()
+
+def invalidate_venue(venue_id, renamed=False, relisted=False):
+  keys = ['venue:%d' % venue_id]
+  expire_matches()
+  if renamed:
+    artist_ids = [artist_id for artist_id, in db.session.query(Show.artist_id).filter_by(venue_id=venue_id).distinct()]
+    keys += ['artist:%d' % artist_id for artist_id in artist_ids]
+    touch(Artist, artist_ids)
+    cache.bump('shows')
+  if relisted:
+    cache.bump('venues')
+  cache.delete(*keys)
+
+def invalidate_artist(artist_id, renamed=False, relisted=False):
+  keys = ['artist:%d' % artist_id]
+  expire_matches()
+  if renamed:
+    venue_ids = [venue_id for venue_id, in db.session.query(Show.venue_id).filter_by(artist_id=artist_id).distinct()]
+    keys += ['venue:%d' % venue_id for venue_id in venue_ids]
+    touch(Venue, venue_ids)
+    cache.bump('shows')
+  if relisted:
+    cache.bump('artists')
+  cache.delete(*keys)
+
+def invalidate_deleted_venue(venue_id, artist_ids):
+  expire_matches('venue', venue_id)
+  cache.delete('venue:%d' % venue_id, *['artist:%d' % artist_id for artist_id in artist_ids])
+  touch(Artist, artist_ids)
+  cache.bump('venues', 'shows')
+
+def invalidate_show(venue_id, artist_id):
+  cache.delete('venue:%d' % venue_id, 'artist:%d' % artist_id)
+  cache.bump('shows', 'venues')
@@ -0,0 +1,262 @@
+import threading
+import time
+from datetime import timedelta
+
+import numpy as np
+from flask import current_app
+
+from models import db, Venue, Artist, venue_genres, artist_genres
+from geo import place_key
+
+
+#----------------------------------------------------------------------------#
+# Genre vectors.
+#----------------------------------------------------------------------------#
+
+# Artists seeking a venue and venues seeking talent are kept in memory as
+# genre vectors: one column per Genre.id, 1 for each genre held, scaled to
+# unit length so that a dot product is the cosine similarity. The genre
+# vocabulary is a few dozen names, so the vectors are stored as dense
+# float32 rows, grouped by city and state; suggesting artists for a venue
+# is one matrix-vector product over the seeking artists of its city.
+#
+# The index is built from the database in a background thread the first
+# time a page asks for suggestions, then brought up to date with the rows
+# whose updated_at moved, at most every MATCH_REFRESH_SECONDS, again in the
+# background. Each worker process has its own.
+#
+# A GenreIndex is never changed once requests can see it: catching up builds
+# changed copies and swaps them in whole, so a request reading an index finds
+# its ids and vectors in step.
+
+SIDES = {
+    'artist': (Artist, artist_genres, 'artist_id', Artist.seeking_venue),
+    'venue': (Venue, venue_genres, 'venue_id', Venue.seeking_talent),
+}
+OTHER = { 'artist': 'venue', 'venue': 'artist' }
+
+# transactions commit out of updated_at order; reading a row twice is harmless
+REFRESH_OVERLAP = timedelta(seconds=60)
+
+
+def widen(vectors, width):
+    if vectors.shape[1] >= width:
+        return vectors
+    return np.pad(vectors, ((0, 0), (0, width - vectors.shape[1])))
+
+
+def genre_vectors(genre_lists, width):
+    '''Unit-length rows with a 1 in the column of each genre id.'''
+    vectors = np.zeros((len(genre_lists), width), np.float32)
+    rows = [row for row, genre_ids in enumerate(genre_lists) for genre_id in genre_ids]
+    columns = [genre_id for genre_ids in genre_lists for genre_id in genre_ids]
+    vectors[rows, columns] = 1
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return np.divide(vectors, norms, out=vectors, where=norms > 0)
+
+
+class GenreIndex(object):
+    '''The seeking artists or venues of every city: sorted ids and their vectors.
+
+    remove() and put() are for building a new index (see updated()); they
+    replace the arrays of a group rather than write into them.
+    '''
+
+    def __init__(self, rows=()):
+        self.groups = {}
+        self.where = {}
+        by_place = {}
+        for id, place, genre_ids in rows:
+            by_place.setdefault(place, []).append((id, genre_ids))
+        width = 1 + max((genre_id for id, place, genre_ids in rows for genre_id in genre_ids), default=0)
+        for place, members in by_place.items():
+            members.sort()
+            ids = np.array([id for id, genre_ids in members], np.int64)
+            self.groups[place] = (ids, genre_vectors([genre_ids for id, genre_ids in members], width))
+            self.where.update(dict.fromkeys(ids.tolist(), place))
+
+    def vector(self, id):
+        place = self.where.get(id)
+        if place is None:
+            return None, None
+        ids, vectors = self.groups[place]
+        return place, vectors[np.searchsorted(ids, id)]
+
+    def remove(self, id):
+        place = self.where.pop(id, None)
+        if place is not None:
+            ids, vectors = self.groups[place]
+            keep = ids != id
+            self.groups[place] = (ids[keep], vectors[keep])
+
+    def put(self, id, place, genre_ids):
+        self.remove(id)
+        vector = genre_vectors([genre_ids], 1 + max(genre_ids, default=0))
+        ids, vectors = self.groups.get(place, (np.empty(0, np.int64), np.empty((0, 1), np.float32)))
+        width = max(vectors.shape[1], vector.shape[1])
+        at = np.searchsorted(ids, id)
+        self.groups[place] = (np.insert(ids, at, id), np.insert(widen(vectors, width), at, widen(vector, width), axis=0))
+        self.where[id] = place
+
+    def updated(self, rows):
+        '''A copy with `rows` put in, or taken out where their place is None.'''
+        index = GenreIndex()
+        index.groups = dict(self.groups)
+        index.where = dict(self.where)
+        for id, place, genre_ids in rows:
+            if place is None:
+                index.remove(id)
+            else:
+                index.put(id, place, genre_ids)
+        return index
+
+    def scores(self, place, vector):
+        ids, vectors = self.groups.get(place, (np.empty(0, np.int64), np.empty((0, 1), np.float32)))
+        width = max(vectors.shape[1], len(vector))
+        return ids, widen(vectors, width) @ widen(vector[None, :], width)[0]
+
+
+#----------------------------------------------------------------------------#
+# Matcher.
+#----------------------------------------------------------------------------#
+
+def load(kind, since=None):
+    '''`(id, place, genre ids)` of every seeking row, or of the rows changed
+    since `since`, with a place of None for those that left the index; and
+    the latest updated_at seen.'''
+    model, links, owner_column, seeking = SIDES[kind]
+    query = db.session.query(model.id, model.city, model.state, seeking, model.updated_at)
+    if kind == 'venue':
+        query = query.add_columns(Venue.deleted_at).execution_options(include_deleted=True)
+    query = query.filter(seeking) if since is None else query.filter(model.updated_at >= since)
+    rows = query.all()
+
+    owner_fk = links.c[owner_column]
+    genres = {}
+    if rows:
+        link_query = db.session.query(owner_fk, links.c.genre_id)
+        if since is not None:
+            link_query = link_query.filter(owner_fk.in_([row.id for row in rows]))
+        for owner_id, genre_id in link_query:
+            genres.setdefault(owner_id, []).append(genre_id)
+
+    loaded = []
+    for row in rows:
+        gone = not row[3] or (kind == 'venue' and row.deleted_at is not None)
+        loaded.append((row.id, None if gone else place_key(row.city, row.state), genres.get(row.id, [])))
+    return loaded, max((row.updated_at for row in rows), default=None)
+
+
+class Matcher(object):
+    '''Both indexes, and how far into the updated_at columns they have read.'''
+
+    def __init__(self, refresh_interval):
+        self.refresh_interval = refresh_interval
+        self.indexes = None
+        self.stamp = None
+        self.checked_at = 0.0
+        self.forgotten = []
+        self._lock = threading.Lock()
+        self._forgotten_lock = threading.Lock()
+
+    def advance(self, stamp):
+        if stamp is not None and (self.stamp is None or stamp > self.stamp):
+            self.stamp = stamp
+
+    def build(self):
+        started = time.perf_counter()
+        indexes = {}
+        for kind in SIDES:
+            rows, stamp = load(kind)
+            indexes[kind] = GenreIndex(rows)
+            self.advance(stamp)
+        self.indexes = indexes
+        self.checked_at = time.monotonic()
+        current_app.logger.info('Built the match index in %.1fs', time.perf_counter() - started)
+
+    def catch_up(self):
+        since = None if self.stamp is None else self.stamp - REFRESH_OVERLAP
+        changes = { kind: load(kind, since) for kind in SIDES }
+        with self._forgotten_lock:
+            forgotten, self.forgotten = self.forgotten, []
+        indexes = {}
+        for kind, (rows, stamp) in changes.items():
+            gone = [(id, None, None) for forgotten_kind, id in forgotten if forgotten_kind == kind]
+            indexes[kind] = self.indexes[kind].updated(gone + rows)
+        self.indexes = indexes
+        for rows, stamp in changes.values():
+            self.advance(stamp)
+        self.checked_at = time.monotonic()
+
+    def update(self, app):
+        with app.app_context():
+            try:
+                if self.indexes is None:
+                    self.build()
+                else:
+                    self.catch_up()
+            except Exception:
+                app.logger.exception('Could not update the match index')
+            finally:
+                db.session.remove()
+                self._lock.release()
+
+    def refresh(self):
+        '''Start the build, or a catch-up when due, in the background.'''
+        if self.indexes is not None and time.monotonic() - self.checked_at < self.refresh_interval:
+            return
+        if not self._lock.acquire(blocking=False):
+            return
+        threading.Thread(target=self.update, args=(current_app._get_current_object(),),
+                         name='match-index', daemon=True).start()
+
+    def expire(self):
+        # the next suggestions in this process start reading the edit that called this
+        self.checked_at = 0.0
+
+    def forget(self, kind, id):
+        '''Drop a deleted row with the next catch-up; updated_at cannot tell of it.'''
+        with self._forgotten_lock:
+            self.forgotten.append((kind, id))
+        self.expire()
+
+    def suggest(self, kind, id, limit):
+        '''`(id, score)` of the best matches of the other kind for a seeking artist or venue.'''
+        self.refresh()
+        indexes = self.indexes
+        if indexes is None:
+            return []
+        place, vector = indexes[kind].vector(id)
+        if place is None:
+            return []
+        ids, scores = indexes[OTHER[kind]].scores(place, vector)
+        found = np.flatnonzero(scores > 0)
+        if len(found) > limit:
+            found = found[np.argpartition(-scores[found], limit - 1)[:limit]]
+        best = sorted(found, key=lambda at: (-scores[at], ids[at]))
+        return [(int(ids[at]), round(float(scores[at]), 3)) for at in best]
+
+
+_lock = threading.Lock()
+
+
+def matcher():
+    app = current_app._get_current_object()
+    if 'matching' not in app.extensions:
+        with _lock:
+            app.extensions.setdefault('matching', Matcher(app.config['MATCH_REFRESH_SECONDS']))
+    return app.extensions['matching']
+
+
+def suggestions(kind, id):
+    '''The MATCH_SUGGESTIONS best `{id, name, image_link, score}` matches of
+    the other kind for artist or venue `id`, best first.'''
+    matches = matcher().suggest(kind, id, current_app.config['MATCH_SUGGESTIONS'])
+    if not matches:
+        return []
+    model = SIDES[OTHER[kind]][0]
+    # rows deleted since the index last caught up drop out here
+    rows = { row.id: row for row in db.session.query(model.id, model.name, model.image_link)
+             .filter(model.id.in_([id for id, score in matches])) }
+    return [{ 'id': id, 'name': rows[id].name, 'image_link': rows[id].image_link, 'score': score }
+            for id, score in matches if id in rows]
@@ -0,0 +1,186 @@
+import bisect
+import threading
+import time
+
+from flask import Response, before_render_template, current_app, g, has_request_context, request, template_rendered
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from models import db
+from pool import pool_status
+
+
+#----------------------------------------------------------------------------#
+# Histograms.
+#----------------------------------------------------------------------------#
+
+class Histogram(object):
+    '''Prometheus histogram with one series per endpoint.'''
+
+    def __init__(self, name, help, buckets):
+        self.name = name
+        self.help = help
+        self.buckets = sorted(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, endpoint, value):
+        with self._lock:
+            series = self._series.get(endpoint)
+            if series is None:
+                series = self._series[endpoint] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][bisect.bisect_left(self.buckets, value)] += 1
+            series[1] += value
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            series = sorted((endpoint, list(counts), total) for endpoint, (counts, total) in self._series.items())
+        for endpoint, counts, total in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + ['+Inf'], counts):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{endpoint="{endpoint}",le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_sum{{endpoint="{endpoint}"}} {total}')
+            lines.append(f'{self.name}_count{{endpoint="{endpoint}"}} {cumulative}')
+        return lines
+
+
+SECONDS = [0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10]
+QUERIES = [0, 1, 2, 3, 5, 10, 20, 50, 100, 200, 500, 1000]
+
+REQUEST_SECONDS = Histogram('fyyur_request_duration_seconds', 'Wall time per request.', SECONDS)
+SQL_QUERIES = Histogram('fyyur_request_sql_queries', 'SQL statements executed per request.', QUERIES)
+SQL_SECONDS = Histogram('fyyur_request_sql_duration_seconds', 'Time spent in SQL per request.', SECONDS)
+TEMPLATE_SECONDS = Histogram('fyyur_request_template_duration_seconds', 'Time spent rendering templates per request.', SECONDS)
+HISTOGRAMS = (REQUEST_SECONDS, SQL_QUERIES, SQL_SECONDS, TEMPLATE_SECONDS)
+
+
+#----------------------------------------------------------------------------#
+# Per-request timers.
+#----------------------------------------------------------------------------#
+
+class RequestTimings(object):
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.sql_seconds = 0.0
+        self.template_seconds = 0.0
+        self._template_started = []
+
+
+def current_timings():
+    return getattr(g, 'timings', None) if has_request_context() else None
+
+
+# Registered on the Engine class so every engine -- the primary and any that
+# are added later -- is counted. Statements outside a request are ignored.
+# The start time goes on the statement's execution context, which is dropped
+# with it, so a statement that fails leaves nothing behind.
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context.query_started = time.perf_counter()
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, 'query_started', None)
+    timings = current_timings()
+    if started is not None and timings is not None:
+        timings.queries += 1
+        timings.sql_seconds += time.perf_counter() - started
+
+
+def template_started(app, template, context, **extra):
+    timings = current_timings()
+    if timings is not None:
+        timings._template_started.append(time.perf_counter())
+
+
+def template_finished(app, template, context, **extra):
+    timings = current_timings()
+    if timings is not None and timings._template_started:
+        timings.template_seconds += time.perf_counter() - timings._template_started.pop()
+
+
+def observe(endpoint, timings):
+    elapsed = time.perf_counter() - timings.started
+    REQUEST_SECONDS.observe(endpoint, elapsed)
+    SQL_QUERIES.observe(endpoint, timings.queries)
+    SQL_SECONDS.observe(endpoint, timings.sql_seconds)
+    TEMPLATE_SECONDS.observe(endpoint, timings.template_seconds)
+    return elapsed
+
+
+#----------------------------------------------------------------------------#
+# Setup.
+#----------------------------------------------------------------------------#
+
+# pool_status() keys: the current state of the pool as gauges, and what it
+# has counted since the process started as counters
+POOL_METRICS = {
+    'size': ('size', 'gauge'),
+    'checked_out': ('checked_out', 'gauge'),
+    'checked_in': ('checked_in', 'gauge'),
+    'overflow': ('overflow', 'gauge'),
+    'wait_seconds_max': ('wait_seconds_max', 'gauge'),
+    'checkouts': ('checkouts_total', 'counter'),
+    'wait_seconds_total': ('wait_seconds_total', 'counter'),
+    'overflow_events': ('overflow_events_total', 'counter'),
+    'timeouts': ('timeouts_total', 'counter'),
+}
+
+def render_metrics():
+    lines = []
+    for histogram in HISTOGRAMS:
+        lines += histogram.render()
+    if 'startup_seconds' in current_app.extensions:
+        lines.append('# TYPE fyyur_startup_seconds gauge')
+        lines.append(f"fyyur_startup_seconds {current_app.extensions['startup_seconds']}")
+    status = pool_status(db.engine)
+    for key, (name, type) in POOL_METRICS.items():
+        if key in status:
+            lines.append(f'# TYPE fyyur_db_pool_{name} {type}')
+            lines.append(f'fyyur_db_pool_{name} {status[key]}')
+    return '\n'.join(lines) + '\n'
+
+
+def setup_metrics(app):
+    '''Record wall, SQL and template time for every request.
+
+    Observations are labelled by endpoint and served in the Prometheus text
+    format at /metrics. With METRICS_SERVER_TIMING set, each response also
+    carries them in a Server-Timing header, except streamed ones: those are
+    recorded once the body has been sent, as rendering it and the queries it
+    runs happen after the headers have gone.
+    '''
+    before_render_template.connect(template_started, app)
+    template_rendered.connect(template_finished, app)
+
+    @app.before_request
+    def start_timings():
+        g.timings = RequestTimings()
+
+    @app.after_request
+    def record_timings(response):
+        timings = current_timings()
+        if timings is None:
+            return response
+        endpoint = request.endpoint or 'unmatched'
+        if response.is_streamed:
+            response.call_on_close(lambda: observe(endpoint, timings))
+            return response
+        elapsed = observe(endpoint, timings)
+        if app.config['METRICS_SERVER_TIMING']:
+            response.headers['Server-Timing'] = ', '.join([
+                f'db;dur={timings.sql_seconds * 1000:.2f};desc="{timings.queries} queries"',
+                f'tpl;dur={timings.template_seconds * 1000:.2f}',
+                f'app;dur={elapsed * 1000:.2f}',
+            ])
+        return response
+
+    @app.route('/metrics')
+    def metrics():
+        return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
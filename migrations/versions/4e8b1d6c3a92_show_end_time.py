@@ -0,0 +1,52 @@
+"""show end times and exclusion constraints against double bookings
+
+Revision ID: 4e8b1d6c3a92
+Revises: 9d4c2a7e1f58
+Create Date: 2023-04-05 11:08:27.531946
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4e8b1d6c3a92'
+down_revision = '9d4c2a7e1f58'
+branch_labels = None
+depends_on = None
+
+# existing shows get the default length, SHOW_DEFAULT_MINUTES
+DEFAULT_MINUTES = 120
+# models.SHOW_MAX_DURATION
+MAX_DURATION = '24 hours'
+
+
+def upgrade():
+    postgresql = op.get_bind().dialect.name == 'postgresql'
+    op.add_column('Show', sa.Column('end_time', sa.DateTime(timezone=True), nullable=True))
+    if postgresql:
+        op.execute(f"""UPDATE "Show" SET end_time = start_time + interval '{DEFAULT_MINUTES} minutes'""")
+    else:
+        op.execute(f"""UPDATE "Show" SET end_time = datetime(start_time, '+{DEFAULT_MINUTES} minutes')""")
+    with op.batch_alter_table('Show') as batch_op:
+        batch_op.alter_column('end_time', existing_type=sa.DateTime(timezone=True), nullable=False)
+
+    if not postgresql:
+        return
+    op.create_check_constraint('Show_duration_check', 'Show',
+                               f"end_time > start_time AND end_time <= start_time + interval '{MAX_DURATION}'")
+    # fails while overlapping bookings exist; the venue or artist rows they
+    # share must be rescheduled first
+    op.execute('CREATE EXTENSION IF NOT EXISTS btree_gist')
+    for column in ('venue_id', 'artist_id'):
+        op.execute(f'ALTER TABLE "Show" ADD CONSTRAINT "Show_{column}_excl" '
+                   f'EXCLUDE USING gist ({column} WITH =, tstzrange(start_time, end_time) WITH &&)')
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        for column in ('artist_id', 'venue_id'):
+            op.drop_constraint(f'Show_{column}_excl', 'Show')
+        op.drop_constraint('Show_duration_check', 'Show', type_='check')
+    with op.batch_alter_table('Show') as batch_op:
+        batch_op.drop_column('end_time')
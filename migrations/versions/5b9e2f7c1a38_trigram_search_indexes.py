@@ -0,0 +1,34 @@
+"""trigram indexes for venue and artist search
+
+Revision ID: 5b9e2f7c1a38
+Revises: d41e7b3a6c05
+Create Date: 2023-03-18 11:05:37.904112
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5b9e2f7c1a38'
+down_revision = 'd41e7b3a6c05'
+branch_labels = None
+depends_on = None
+
+# must match search.search_document()
+SEARCH_DOCUMENT = "lower(coalesce(name, '') || ' ' || coalesce(city, '') || ' ' || coalesce(state, '') || ' ' || coalesce(genres, ''))"
+
+
+def upgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    op.execute(f'CREATE INDEX "ix_Venue_search_trgm" ON "Venue" USING gin (({SEARCH_DOCUMENT}) gin_trgm_ops)')
+    op.execute(f'CREATE INDEX "ix_Artist_search_trgm" ON "Artist" USING gin (({SEARCH_DOCUMENT}) gin_trgm_ops)')
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute('DROP INDEX IF EXISTS "ix_Artist_search_trgm"')
+    op.execute('DROP INDEX IF EXISTS "ix_Venue_search_trgm"')
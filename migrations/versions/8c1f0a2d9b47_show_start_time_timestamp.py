@@ -0,0 +1,40 @@
+"""convert Show.start_time to timestamptz and index shows by venue/artist
+
+Revision ID: 8c1f0a2d9b47
+Revises: 3951864b0b3e
+Create Date: 2023-03-04 10:12:41.218305
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8c1f0a2d9b47'
+down_revision = '3951864b0b3e'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # start_time was stored as an ISO 8601 string with a trailing 'Z', which
+    # PostgreSQL casts to timestamptz directly.
+    with op.batch_alter_table('Show', schema=None) as batch_op:
+        batch_op.alter_column('start_time',
+               existing_type=sa.String(length=120),
+               type_=sa.DateTime(timezone=True),
+               existing_nullable=False,
+               postgresql_using='start_time::timestamp with time zone')
+        batch_op.create_index('ix_Show_venue_id_start_time', ['venue_id', 'start_time'], unique=False)
+        batch_op.create_index('ix_Show_artist_id_start_time', ['artist_id', 'start_time'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('Show', schema=None) as batch_op:
+        batch_op.drop_index('ix_Show_artist_id_start_time')
+        batch_op.drop_index('ix_Show_venue_id_start_time')
+        batch_op.alter_column('start_time',
+               existing_type=sa.DateTime(timezone=True),
+               type_=sa.String(length=120),
+               existing_nullable=False,
+               postgresql_using="to_char(start_time AT TIME ZONE 'UTC', 'YYYY-MM-DD\"T\"HH24:MI:SS.MS\"Z\"')")
@@ -0,0 +1,31 @@
+"""venue coordinates and grid cell for nearby search
+
+Revision ID: 9d4c2a7e1f58
+Revises: f3a91c6e7b20
+Create Date: 2023-04-03 15:12:44.208317
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9d4c2a7e1f58'
+down_revision = 'f3a91c6e7b20'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('Venue', sa.Column('latitude', sa.Float(), nullable=True))
+    op.add_column('Venue', sa.Column('longitude', sa.Float(), nullable=True))
+    op.add_column('Venue', sa.Column('grid_cell', sa.Integer(), nullable=True))
+    op.create_index('ix_Venue_grid_cell', 'Venue', ['grid_cell'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_Venue_grid_cell', table_name='Venue')
+    with op.batch_alter_table('Venue') as batch_op:
+        batch_op.drop_column('grid_cell')
+        batch_op.drop_column('longitude')
+        batch_op.drop_column('latitude')
@@ -0,0 +1,51 @@
+"""per-venue and per-artist upcoming/past show counts
+
+Revision ID: a7d3f9c2e514
+Revises: e6a0c4d8f213
+Create Date: 2023-03-26 14:02:41.118204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a7d3f9c2e514'
+down_revision = 'e6a0c4d8f213'
+branch_labels = None
+depends_on = None
+
+OWNERS = (('Venue', 'VenueShowSummary', 'venue_id'), ('Artist', 'ArtistShowSummary', 'artist_id'))
+
+
+def upgrade():
+    for owner_table, summary_table, owner_column in OWNERS:
+        op.create_table(summary_table,
+        sa.Column(owner_column, sa.Integer(), nullable=False),
+        sa.Column('upcoming_shows_count', sa.Integer(), nullable=False),
+        sa.Column('past_shows_count', sa.Integer(), nullable=False),
+        sa.Column('next_show_time', sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint([owner_column], [f'{owner_table}.id'], ),
+        sa.PrimaryKeyConstraint(owner_column)
+        )
+        op.create_index(f'ix_{summary_table}_next_show_time', summary_table, ['next_show_time'], unique=False)
+
+        # backfill with one grouped pass over the shows; later shows are
+        # counted as they are booked
+        show = sa.table('Show', sa.column(owner_column, sa.Integer), sa.column('start_time', sa.DateTime(timezone=True)))
+        summary = sa.table(summary_table, *(sa.column(name) for name in
+                           (owner_column, 'upcoming_shows_count', 'past_shows_count', 'next_show_time')))
+        upcoming = show.c.start_time > sa.func.now()
+        op.execute(summary.insert().from_select(
+            [owner_column, 'upcoming_shows_count', 'past_shows_count', 'next_show_time'],
+            sa.select(show.c[owner_column],
+                      sa.func.count(sa.case((upcoming, 1))),
+                      sa.func.count(sa.case((~upcoming, 1))),
+                      sa.func.min(sa.case((upcoming, show.c.start_time))))
+            .group_by(show.c[owner_column])))
+
+
+def downgrade():
+    for owner_table, summary_table, owner_column in reversed(OWNERS):
+        op.drop_index(f'ix_{summary_table}_next_show_time', table_name=summary_table)
+        op.drop_table(summary_table)
@@ -0,0 +1,31 @@
+"""venue and artist names not null, so (name, id) keysets compare
+
+Revision ID: b5e1c9a4d270
+Revises: 4e8b1d6c3a92
+Create Date: 2023-04-12 09:21:44.102385
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b5e1c9a4d270'
+down_revision = '4e8b1d6c3a92'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # a NULL name never compares greater than a cursor, so its row could not
+    # be paged to; the forms always required a name
+    for table in ('Venue', 'Artist'):
+        op.execute(f"""UPDATE "{table}" SET name = '' WHERE name IS NULL""")
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.alter_column('name', existing_type=sa.String(), nullable=False)
+
+
+def downgrade():
+    for table in ('Artist', 'Venue'):
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.alter_column('name', existing_type=sa.String(), nullable=True)
@@ -0,0 +1,28 @@
+"""indexes backing keyset pagination of listing pages
+
+Revision ID: d41e7b3a6c05
+Revises: 8c1f0a2d9b47
+Create Date: 2023-03-11 16:40:02.554190
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd41e7b3a6c05'
+down_revision = '8c1f0a2d9b47'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_Venue_name_id', 'Venue', ['name', 'id'], unique=False)
+    op.create_index('ix_Artist_name_id', 'Artist', ['name', 'id'], unique=False)
+    op.create_index('ix_Show_start_time_id', 'Show', ['start_time', 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_Show_start_time_id', table_name='Show')
+    op.drop_index('ix_Artist_name_id', table_name='Artist')
+    op.drop_index('ix_Venue_name_id', table_name='Venue')
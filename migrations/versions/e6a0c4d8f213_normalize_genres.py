@@ -0,0 +1,110 @@
+"""move comma-joined genres into a Genre table with link tables
+
+Revision ID: e6a0c4d8f213
+Revises: 5b9e2f7c1a38
+Create Date: 2023-03-25 09:47:15.330861
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e6a0c4d8f213'
+down_revision = '5b9e2f7c1a38'
+branch_labels = None
+depends_on = None
+
+# must match search.search_document(); genres are matched through the link
+# tables now, so they drop out of the trigram document
+OLD_SEARCH_DOCUMENT = "lower(coalesce(name, '') || ' ' || coalesce(city, '') || ' ' || coalesce(state, '') || ' ' || coalesce(genres, ''))"
+SEARCH_DOCUMENT = "lower(coalesce(name, '') || ' ' || coalesce(city, '') || ' ' || coalesce(state, ''))"
+
+OWNERS = (('Venue', 'VenueGenre', 'venue_id'), ('Artist', 'ArtistGenre', 'artist_id'))
+
+
+def create_search_indexes(document):
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute('DROP INDEX IF EXISTS "ix_Venue_search_trgm"')
+    op.execute('DROP INDEX IF EXISTS "ix_Artist_search_trgm"')
+    op.execute(f'CREATE INDEX "ix_Venue_search_trgm" ON "Venue" USING gin (({document}) gin_trgm_ops)')
+    op.execute(f'CREATE INDEX "ix_Artist_search_trgm" ON "Artist" USING gin (({document}) gin_trgm_ops)')
+
+
+def upgrade():
+    op.create_table('Genre',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=120), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('name')
+    )
+    for owner_table, link_table, owner_column in OWNERS:
+        op.create_table(link_table,
+        sa.Column(owner_column, sa.Integer(), nullable=False),
+        sa.Column('genre_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['genre_id'], ['Genre.id'], ),
+        sa.ForeignKeyConstraint([owner_column], [f'{owner_table}.id'], ),
+        sa.PrimaryKeyConstraint(owner_column, 'genre_id')
+        )
+        op.create_index(f'ix_{link_table}_genre_id_{owner_column}', link_table, ['genre_id', owner_column], unique=False)
+
+    # data migration: split the strings once, insert each distinct genre and
+    # then every link in bulk
+    connection = op.get_bind()
+    genre = sa.table('Genre', sa.column('id', sa.Integer), sa.column('name', sa.String))
+    links = {}
+    for owner_table, link_table, owner_column in OWNERS:
+        owner = sa.table(owner_table, sa.column('id', sa.Integer), sa.column('genres', sa.String))
+        links[link_table] = [
+            (owner_id, name.strip())
+            for owner_id, genres in connection.execute(sa.select(owner.c.id, owner.c.genres))
+            for name in dict.fromkeys((genres or '').split(','))
+            if name.strip()
+        ]
+    names = sorted({ name for rows in links.values() for _, name in rows })
+    if names:
+        connection.execute(genre.insert(), [{ 'name': name } for name in names])
+    genre_ids = dict((name, id) for id, name in connection.execute(sa.select(genre.c.id, genre.c.name)))
+    for owner_table, link_table, owner_column in OWNERS:
+        link = sa.table(link_table, sa.column(owner_column, sa.Integer), sa.column('genre_id', sa.Integer))
+        rows = list(dict.fromkeys((owner_id, genre_ids[name]) for owner_id, name in links[link_table]))
+        if rows:
+            connection.execute(link.insert(), [{ owner_column: owner_id, 'genre_id': genre_id } for owner_id, genre_id in rows])
+
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute('DROP INDEX IF EXISTS "ix_Venue_search_trgm"')
+        op.execute('DROP INDEX IF EXISTS "ix_Artist_search_trgm"')
+    with op.batch_alter_table('Venue', schema=None) as batch_op:
+        batch_op.drop_column('genres')
+    with op.batch_alter_table('Artist', schema=None) as batch_op:
+        batch_op.drop_column('genres')
+    create_search_indexes(SEARCH_DOCUMENT)
+
+
+def downgrade():
+    with op.batch_alter_table('Artist', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('genres', sa.String(length=120), nullable=True))
+    with op.batch_alter_table('Venue', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('genres', sa.String(length=120), nullable=True))
+
+    connection = op.get_bind()
+    genre = sa.table('Genre', sa.column('id', sa.Integer), sa.column('name', sa.String))
+    for owner_table, link_table, owner_column in OWNERS:
+        owner = sa.table(owner_table, sa.column('id', sa.Integer), sa.column('genres', sa.String))
+        link = sa.table(link_table, sa.column(owner_column, sa.Integer), sa.column('genre_id', sa.Integer))
+        genres = {}
+        rows = connection.execute(
+            sa.select(link.c[owner_column], genre.c.name)
+            .select_from(link.join(genre, genre.c.id == link.c.genre_id))
+            .order_by(link.c[owner_column], genre.c.name))
+        for owner_id, name in rows:
+            genres.setdefault(owner_id, []).append(name)
+        for owner_id, names in genres.items():
+            connection.execute(owner.update().where(owner.c.id == owner_id).values(genres=','.join(names)))
+
+    for owner_table, link_table, owner_column in reversed(OWNERS):
+        op.drop_index(f'ix_{link_table}_genre_id_{owner_column}', table_name=link_table)
+        op.drop_table(link_table)
+    op.drop_table('Genre')
+    create_search_indexes(OLD_SEARCH_DOCUMENT)
@@ -0,0 +1,40 @@
+"""soft delete for venues and ON DELETE CASCADE from venues
+
+Revision ID: f3a91c6e7b20
+Revises: c2b8e5d1f736
+Create Date: 2023-03-28 16:40:52.207631
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3a91c6e7b20'
+down_revision = 'c2b8e5d1f736'
+branch_labels = None
+depends_on = None
+
+# PostgreSQL's default names for the unnamed constraints created earlier
+FOREIGN_KEYS = (('Show', 'venue_id'), ('VenueGenre', 'venue_id'), ('VenueShowSummary', 'venue_id'))
+
+
+def replace_foreign_keys(ondelete):
+    # SQLite does not enforce foreign keys by default; deletion.py removes
+    # the child rows with explicit DELETEs there
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    for table, column in FOREIGN_KEYS:
+        name = f'{table}_{column}_fkey'
+        op.drop_constraint(name, table, type_='foreignkey')
+        op.create_foreign_key(name, table, 'Venue', [column], ['id'], ondelete=ondelete)
+
+
+def upgrade():
+    op.add_column('Venue', sa.Column('deleted_at', sa.DateTime(timezone=True), nullable=True))
+    replace_foreign_keys('CASCADE')
+
+
+def downgrade():
+    replace_foreign_keys(None)
+    op.drop_column('Venue', 'deleted_at')
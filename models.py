@@ -1,15 +1,41 @@
-from datetime import datetime
-from flask import Flask
+from datetime import datetime, timedelta, timezone
+from flask import g, has_app_context
 from flask_sqlalchemy import SQLAlchemy
-from flask_migrate import Migrate
-import dateutil.parser
+from flask_sqlalchemy.session import Session as FlaskSession
+from sqlalchemy import event
+from sqlalchemy.dialects.postgresql import ExcludeConstraint
+from sqlalchemy.orm import Session, contains_eager, with_loader_criteria
 
-db = SQLAlchemy()
+from pool import engine_options
+
+
+class RoutingSession(FlaskSession):
+    '''Reads from the replica that replicas.py picked for the request.
+
+    Flushes and INSERT/UPDATE/DELETE statements always go to the primary, as
+    does everything outside a request that was given a replica.
+    '''
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        read_bind = g.get('read_bind') if has_app_context() else None
+        if read_bind and bind is None and not self._flushing and not getattr(clause, 'is_dml', False):
+            return self._db.engines[read_bind]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+db = SQLAlchemy(session_options={ 'class_': RoutingSession })
+
+def utcnow():
+    return datetime.now(timezone.utc)
+
+def replica_binds(config):
+    return dict(('replica_%d' % i, uri) for i, uri in enumerate(config['SQLALCHEMY_REPLICA_URIS']))
 
 def setup_db(app):
-    app.config.from_object('config')
-    db.app = app
-    migrate = Migrate(app, db)
+    # Flask-Migrate, and the Alembic import behind it, is set up by
+    # create_app() for CLI runs only
+    app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', engine_options(app.config))
+    app.config['SQLALCHEMY_BINDS'] = dict(app.config.get('SQLALCHEMY_BINDS') or {}, **replica_binds(app.config))
     db.init_app(app)
     return db
 
@@ -18,11 +44,50 @@ def setup_db(app):
 # Models.
 #----------------------------------------------------------------------------#
 
+# Genre links are keyed (owner, genre) for loading an entity's genres and
+# indexed (genre, owner) so that filtering by genre is an index range scan.
+venue_genres = db.Table('VenueGenre',
+    db.Column('venue_id', db.Integer, db.ForeignKey('Venue.id', ondelete='CASCADE'), primary_key=True),
+    db.Column('genre_id', db.Integer, db.ForeignKey('Genre.id'), primary_key=True),
+    db.Index('ix_VenueGenre_genre_id_venue_id', 'genre_id', 'venue_id')
+)
+
+artist_genres = db.Table('ArtistGenre',
+    db.Column('artist_id', db.Integer, db.ForeignKey('Artist.id'), primary_key=True),
+    db.Column('genre_id', db.Integer, db.ForeignKey('Genre.id'), primary_key=True),
+    db.Index('ix_ArtistGenre_genre_id_artist_id', 'genre_id', 'artist_id')
+)
+
+class Genre(db.Model):
+    __tablename__ = 'Genre'
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(120), nullable=False, unique=True)
+
+    @classmethod
+    def get_or_create(cls, names):
+       names = list(dict.fromkeys(name.strip() for name in names if name.strip()))
+       if not names:
+         return []
+       genres = { genre.name: genre for genre in cls.query.filter(cls.name.in_(names)) }
+       for name in names:
+         if name not in genres:
+           genres[name] = cls(name=name)
+           db.session.add(genres[name])
+       return [genres[name] for name in names]
+
+    def __repr__(self):
+      return f'<Genre {self.id} name: {self.name}>'
+
 class Venue(db.Model):
     __tablename__ = 'Venue'
+    __table_args__ = (
+      db.Index('ix_Venue_name_id', 'name', 'id'),
+      db.Index('ix_Venue_grid_cell', 'grid_cell'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
-    name = db.Column(db.String)
+    name = db.Column(db.String, nullable=False)
     city = db.Column(db.String(120))
     state = db.Column(db.String(120))
     address = db.Column(db.String(120))
@@ -30,22 +95,31 @@ class Venue(db.Model):
     image_link = db.Column(db.String(500))
     facebook_link = db.Column(db.String(120))
     website = db.Column(db.String(120))    
+    # from `flask geocode`; grid_cell is kept in step by geo.py
+    latitude = db.Column(db.Float)
+    longitude = db.Column(db.Float)
+    grid_cell = db.Column(db.Integer)
     seeking_talent = db.Column(db.Boolean, nullable=False, default=False)
     seeking_description = db.Column(db.String, default='')
-    genres = db.Column(db.String(120))
-    shows = db.relationship('Show', backref='Venue', lazy=True)
+    # validator for conditional GETs of the pages that show this row
+    updated_at = db.Column(db.DateTime(timezone=True), nullable=False, index=True, default=utcnow, onupdate=utcnow)
+    # set by a soft delete; the row and its shows stay until purged
+    deleted_at = db.Column(db.DateTime(timezone=True))
+    genres = db.relationship('Genre', secondary=venue_genres, order_by='Genre.name', lazy=True)
+    shows = db.relationship('Show', backref='Venue', lazy=True, passive_deletes=True)
 
     def get_shows(self):
-       upcoming_shows = [] 
-       past_shows = []    
-       shows = Show.query.filter_by(venue_id=self.id).all()
-       for show in shows:   
-          current_time = dateutil.parser.parse(datetime.now().strftime("%d/%m/%Y %H:%M:%S"))     
-          show_start_time = dateutil.parser.parse(dateutil.parser.parse(show.start_time).strftime("%d/%m/%Y %H:%M:%S"))    
-          if show_start_time > current_time:
-            upcoming_shows.append(show)
-          else:
-            past_shows.append(show) 
+       # one round trip over the (venue_id, start_time) index: each show comes back
+       # with its artist already loaded and flagged upcoming/past by the database
+       now = datetime.now(timezone.utc)
+       rows = db.session.query(Show, (Show.start_time > now).label('upcoming')) \
+          .join(Show.Artist) \
+          .options(contains_eager(Show.Artist)) \
+          .filter(Show.venue_id == self.id) \
+          .order_by(Show.start_time) \
+          .all()
+       upcoming_shows = [show for show, upcoming in rows if upcoming]
+       past_shows = [show for show, upcoming in reversed(rows) if not upcoming]
        return { 'upcoming_shows' : upcoming_shows, 'past_shows' : past_shows }
 
     def __repr__(self):
@@ -53,43 +127,107 @@ class Venue(db.Model):
 
 class Artist(db.Model):
     __tablename__ = 'Artist'
+    __table_args__ = (
+      db.Index('ix_Artist_name_id', 'name', 'id'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
-    name = db.Column(db.String)
+    name = db.Column(db.String, nullable=False)
     city = db.Column(db.String(120))
     state = db.Column(db.String(120))
     phone = db.Column(db.String(120))
-    genres = db.Column(db.String(120))
+    genres = db.relationship('Genre', secondary=artist_genres, order_by='Genre.name', lazy=True)
     image_link = db.Column(db.String(500))
     facebook_link = db.Column(db.String(120))
     website = db.Column(db.String(120))   
     seeking_venue = db.Column(db.Boolean, nullable=False, default=False)
     seeking_description = db.Column(db.String, default='')
+    # validator for conditional GETs of the pages that show this row
+    updated_at = db.Column(db.DateTime(timezone=True), nullable=False, index=True, default=utcnow, onupdate=utcnow)
     shows = db.relationship('Show', backref='Artist', lazy=True)
 
     def get_shows(self):
-       upcoming_shows = [] 
-       past_shows = []    
-       shows = Show.query.filter_by(artist_id=self.id).all()
-       for show in shows:   
-          current_time = dateutil.parser.parse(datetime.now().strftime("%d/%m/%Y %H:%M:%S"))     
-          show_start_time = dateutil.parser.parse(dateutil.parser.parse(show.start_time).strftime("%d/%m/%Y %H:%M:%S"))    
-          if show_start_time > current_time:
-            upcoming_shows.append(show)
-          else:
-            past_shows.append(show) 
+       # one round trip over the (artist_id, start_time) index: each show comes back
+       # with its venue already loaded and flagged upcoming/past by the database
+       now = datetime.now(timezone.utc)
+       rows = db.session.query(Show, (Show.start_time > now).label('upcoming')) \
+          .join(Show.Venue) \
+          .options(contains_eager(Show.Venue)) \
+          .filter(Show.artist_id == self.id) \
+          .order_by(Show.start_time) \
+          .all()
+       upcoming_shows = [show for show, upcoming in rows if upcoming]
+       past_shows = [show for show, upcoming in reversed(rows) if not upcoming]
        return { 'upcoming_shows' : upcoming_shows, 'past_shows' : past_shows }
 
     def __repr__(self):
       return f'<Artist {self.id} name: {self.name}>'
 
+# No show runs longer than this, so the shows overlapping a new booking all
+# start within SHOW_MAX_DURATION before its end (see bookings.py). Migration
+# 4e8b1d6c3a92 checks it on PostgreSQL.
+SHOW_MAX_DURATION = timedelta(hours=24)
+
+def lasts_at_most(duration):
+  # PostgreSQL only, like the migration, for the interval arithmetic
+  hours = f'{duration.total_seconds() / 3600:g} hours'
+  return db.CheckConstraint(f"end_time > start_time AND end_time <= start_time + interval '{hours}'",
+                            name='Show_duration_check').ddl_if(dialect='postgresql')
+
+def booked_during(column):
+  # a venue or an artist is in at most one show at a time (PostgreSQL only;
+  # needs the btree_gist extension)
+  return ExcludeConstraint((column, '='), (db.func.tstzrange(db.column('start_time'), db.column('end_time')), '&&'),
+                           using='gist', name=f'Show_{column}_excl').ddl_if(dialect='postgresql')
+
 class Show(db.Model):
   __tablename__ = 'Show'
+  __table_args__ = (
+    db.Index('ix_Show_venue_id_start_time', 'venue_id', 'start_time'),
+    db.Index('ix_Show_artist_id_start_time', 'artist_id', 'start_time'),
+    db.Index('ix_Show_start_time_id', 'start_time', 'id'),
+    booked_during('venue_id'),
+    booked_during('artist_id'),
+    lasts_at_most(SHOW_MAX_DURATION),
+  )
 
   id = db.Column(db.Integer, primary_key=True)
   artist_id = db.Column(db.Integer, db.ForeignKey('Artist.id'), nullable=False)
-  venue_id = db.Column(db.Integer, db.ForeignKey('Venue.id'), nullable=False)
-  start_time = db.Column(db.String(120), nullable=False, default=f"{datetime.utcnow().isoformat()[:-3]}Z")
+  venue_id = db.Column(db.Integer, db.ForeignKey('Venue.id', ondelete='CASCADE'), nullable=False)
+  start_time = db.Column(db.DateTime(timezone=True), nullable=False, default=lambda: datetime.now(timezone.utc))
+  end_time = db.Column(db.DateTime(timezone=True), nullable=False)
+
+  @property
+  def duration(self):
+    return self.end_time - self.start_time
 
   def __repr__(self):
     return f'<Show {self.id} artist_id: {self.artist_id} venue_id: {self.venue_id}>'
+
+# Per-venue and per-artist show counts, maintained by summaries.py so that
+# listing and search pages never have to count shows.
+class VenueShowSummary(db.Model):
+  __tablename__ = 'VenueShowSummary'
+
+  venue_id = db.Column(db.Integer, db.ForeignKey('Venue.id', ondelete='CASCADE'), primary_key=True)
+  upcoming_shows_count = db.Column(db.Integer, nullable=False, default=0)
+  past_shows_count = db.Column(db.Integer, nullable=False, default=0)
+  next_show_time = db.Column(db.DateTime(timezone=True), index=True)
+
+class ArtistShowSummary(db.Model):
+  __tablename__ = 'ArtistShowSummary'
+
+  artist_id = db.Column(db.Integer, db.ForeignKey('Artist.id'), primary_key=True)
+  upcoming_shows_count = db.Column(db.Integer, nullable=False, default=0)
+  past_shows_count = db.Column(db.Integer, nullable=False, default=0)
+  next_show_time = db.Column(db.DateTime(timezone=True), index=True)
+
+# Soft-deleted venues drop out of every ORM query that selects or joins Venue,
+# by id lookups included. The purge, and anything else that must see them,
+# passes execution_options(include_deleted=True).
+@event.listens_for(Session, 'do_orm_execute')
+def hide_deleted_venues(execute_state):
+  if execute_state.is_select and not execute_state.is_column_load and not execute_state.is_relationship_load \
+      and not execute_state.execution_options.get('include_deleted', False):
+    execute_state.statement = execute_state.statement.options(
+      with_loader_criteria(Venue, Venue.deleted_at.is_(None), include_aliases=True))
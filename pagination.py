@@ -0,0 +1,61 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+
+from flask import current_app, request
+from sqlalchemy import DateTime, tuple_
+
+
+#----------------------------------------------------------------------------#
+# Keyset pagination.
+#----------------------------------------------------------------------------#
+
+# Listing pages are ordered by an indexed, unique key such as (name, id) or
+# (start_time, id). The `after` token is the key of the last row on the
+# previous page, so fetching the next page is an index seek followed by
+# LIMIT rows -- the cost does not grow with how deep the page is, unlike
+# OFFSET, which has to walk every skipped row. The key columns are NOT NULL:
+# a NULL never compares greater than a cursor, so its row would be skipped.
+
+def encode_cursor(values):
+    payload = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    raw = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token, columns):
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        values = json.loads(raw.decode('utf-8'))
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValueError(f'invalid cursor {token!r}')
+    if not isinstance(values, list) or len(values) != len(columns):
+        raise ValueError(f'invalid cursor {token!r}')
+    return [datetime.fromisoformat(v) if isinstance(column.type, DateTime) else v
+            for column, v in zip(columns, values)]
+
+
+def page_size():
+    size = request.args.get('limit', type=int) or current_app.config['PAGE_SIZE']
+    return max(1, min(size, current_app.config['MAX_PAGE_SIZE']))
+
+
+def paginate(query, columns):
+    '''Return one page of `query` ordered by `columns` and the token for the next.
+
+    `columns` must be NOT NULL and end with a unique column (the primary key),
+    and every row must expose them as attributes, either as ORM objects or
+    labelled rows.
+    '''
+    limit = page_size()
+    after = request.args.get('after')
+    if after:
+        query = query.filter(tuple_(*columns) > tuple_(*decode_cursor(after, columns)))
+    rows = query.order_by(*columns).limit(limit + 1).all()
+
+    next_after = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_after = encode_cursor([getattr(rows[-1], column.key) for column in columns])
+    return rows, next_after
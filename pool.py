@@ -0,0 +1,99 @@
+import threading
+import time
+
+from sqlalchemy.exc import TimeoutError
+from sqlalchemy.pool import QueuePool
+
+
+#----------------------------------------------------------------------------#
+# Connection pool telemetry.
+#----------------------------------------------------------------------------#
+
+class PoolStats(object):
+    '''Counters for how long requests waited to get a connection.'''
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.overflow_events = 0
+        self.timeouts = 0
+
+    def record(self, wait, overflowed=False, timed_out=False):
+        with self._lock:
+            self.checkouts += not timed_out
+            self.wait_seconds += wait
+            self.max_wait_seconds = max(self.max_wait_seconds, wait)
+            self.overflow_events += overflowed
+            self.timeouts += timed_out
+
+
+class InstrumentedQueuePool(QueuePool):
+    '''QueuePool that times every checkout and counts overflow connections.
+
+    Hooks QueuePool._do_get, the one place a checkout blocks, because the
+    public pool events only fire once a connection has been handed out.
+    '''
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+
+    def recreate(self):
+        # engine.dispose() swaps in a fresh pool; keep counting where we were
+        pool = super().recreate()
+        pool.stats = self.stats
+        return pool
+
+    def _do_get(self):
+        started = time.perf_counter()
+        overflow = self._overflow
+        try:
+            connection = super()._do_get()
+        except TimeoutError:
+            self.stats.record(time.perf_counter() - started, timed_out=True)
+            raise
+        # _overflow counts up from -pool_size with each connection opened, so
+        # it turns positive once connections beyond pool_size exist
+        self.stats.record(time.perf_counter() - started, overflowed=self._overflow > max(overflow, 0))
+        return connection
+
+
+def engine_options(config):
+    '''SQLALCHEMY_ENGINE_OPTIONS for the configured database.'''
+    if not config['SQLALCHEMY_DATABASE_URI'].startswith('postgresql'):
+        return {}
+    options = {
+        'poolclass': InstrumentedQueuePool,
+        'pool_size': config['DB_POOL_SIZE'],
+        'max_overflow': config['DB_MAX_OVERFLOW'],
+        'pool_timeout': config['DB_POOL_TIMEOUT'],
+        'pool_recycle': config['DB_POOL_RECYCLE'],
+        'pool_pre_ping': config['DB_POOL_PRE_PING'],
+    }
+    if config['DB_STATEMENT_TIMEOUT_MS']:
+        options['connect_args'] = { 'options': '-c statement_timeout=%d' % config['DB_STATEMENT_TIMEOUT_MS'] }
+    return options
+
+
+def pool_status(engine):
+    pool = engine.pool
+    status = { 'pool': pool.__class__.__name__ }
+    if isinstance(pool, QueuePool):
+        status.update({
+            'size': pool.size(),
+            'checked_out': pool.checkedout(),
+            'checked_in': pool.checkedin(),
+            'overflow': max(pool.overflow(), 0),
+        })
+    stats = getattr(pool, 'stats', None)
+    if stats is not None:
+        status.update({
+            'checkouts': stats.checkouts,
+            'wait_seconds_total': round(stats.wait_seconds, 6),
+            'wait_seconds_max': round(stats.max_wait_seconds, 6),
+            'overflow_events': stats.overflow_events,
+            'timeouts': stats.timeouts,
+        })
+    return status
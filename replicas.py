@@ -0,0 +1,125 @@
+import random
+import threading
+import time
+
+from flask import current_app, g, request
+from sqlalchemy import text
+
+from models import db
+
+
+#----------------------------------------------------------------------------#
+# Read replicas.
+#----------------------------------------------------------------------------#
+
+# GET and HEAD requests read from a replica chosen at random among those
+# whose replay lag is under REPLICA_MAX_LAG_SECONDS; RoutingSession in
+# models.py sends their SELECTs there and everything else to the primary.
+#
+# A browser that has just written something (any other method that did not
+# fail) is kept on the primary for REPLICA_STICKY_SECONDS, so the page it is
+# redirected to shows the write. That goes in a cookie of its own rather than
+# the session: it has to mean the same to every worker, and the only harm in
+# forging one is reading from the primary. When no replica is healthy, or the
+# lag cannot be measured, reads go to the primary.
+
+READ_METHODS = ('GET', 'HEAD')
+SAFE_METHODS = READ_METHODS + ('OPTIONS',)
+PRIMARY_COOKIE = 'primary_until'
+
+# seconds the replica is behind, or 0 when it has replayed all it received
+LAG_SQL = text(
+    'SELECT CASE WHEN NOT pg_is_in_recovery() THEN 0'
+    ' WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0'
+    ' ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END')
+
+
+class ReplicaMonitor(object):
+    '''Tracks which replica binds are fresh enough to read from.
+
+    Lag is measured lazily by whichever request first finds the last check
+    older than REPLICA_LAG_CHECK_SECONDS; the others keep using the last
+    result rather than wait for it.
+    '''
+
+    def __init__(self, binds, max_lag, check_interval):
+        self.binds = binds
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.lag = dict.fromkeys(binds)
+        self.healthy = []
+        self.checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def measure(self, bind):
+        engine = db.engines[bind]
+        if engine.dialect.name != 'postgresql':
+            return 0.0
+        with engine.connect() as connection:
+            return float(connection.execute(LAG_SQL).scalar() or 0)
+
+    def check(self):
+        healthy = []
+        for bind in self.binds:
+            try:
+                self.lag[bind] = self.measure(bind)
+            except Exception:
+                current_app.logger.exception('Could not measure the lag of %s', bind)
+                self.lag[bind] = None
+                continue
+            if self.lag[bind] <= self.max_lag:
+                healthy.append(bind)
+            else:
+                current_app.logger.warning('%s is %.1fs behind; reading from the primary', bind, self.lag[bind])
+        self.healthy = healthy
+        self.checked_at = time.monotonic()
+
+    def pick(self):
+        if time.monotonic() - self.checked_at >= self.check_interval and self._lock.acquire(blocking=False):
+            try:
+                self.check()
+            finally:
+                self._lock.release()
+        healthy = self.healthy
+        return random.choice(healthy) if healthy else None
+
+    def status(self):
+        return { bind: { 'lag_seconds': lag, 'healthy': bind in self.healthy } for bind, lag in self.lag.items() }
+
+
+def choose_read_bind():
+    monitor = current_app.extensions.get('replicas')
+    if monitor is None or request.method not in READ_METHODS:
+        return
+    if not getattr(current_app.view_functions.get(request.endpoint), 'uses_database', True):
+        return
+    if on_primary():
+        return
+    g.read_bind = monitor.pick()
+
+
+def on_primary():
+    try:
+        until = float(request.cookies.get(PRIMARY_COOKIE, 0))
+    except ValueError:
+        return False
+    now = time.time()
+    return now < until <= now + current_app.config['REPLICA_STICKY_SECONDS']
+
+
+def stick_to_primary(response):
+    if request.method not in SAFE_METHODS and response.status_code < 500:
+        sticky = current_app.config['REPLICA_STICKY_SECONDS']
+        response.set_cookie(PRIMARY_COOKIE, '%.3f' % (time.time() + sticky), max_age=sticky,
+                            httponly=True, samesite='Lax')
+    return response
+
+
+def setup_replicas(app):
+    binds = sorted(bind for bind in app.config['SQLALCHEMY_BINDS'] if bind.startswith('replica_'))
+    if not binds:
+        return
+    app.extensions['replicas'] = ReplicaMonitor(binds, app.config['REPLICA_MAX_LAG_SECONDS'],
+                                                app.config['REPLICA_LAG_CHECK_SECONDS'])
+    app.before_request(choose_read_bind)
+    app.after_request(stick_to_primary)
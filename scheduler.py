@@ -0,0 +1,54 @@
+import threading
+import time
+
+from models import db
+
+
+#----------------------------------------------------------------------------#
+# Periodic background jobs.
+#----------------------------------------------------------------------------#
+
+class PeriodicTask(threading.Thread):
+    '''Daemon thread calling `job` in an app context every `interval` seconds,
+    and once straight away with `at_start`.'''
+
+    def __init__(self, app, name, interval, job, at_start=False):
+        super().__init__(name=name, daemon=True)
+        self.app = app
+        self.interval = interval
+        self.job = job
+        self.at_start = at_start
+
+    def run(self):
+        while True:
+            if not self.at_start:
+                time.sleep(self.interval)
+            self.at_start = False
+            with self.app.app_context():
+                try:
+                    self.job()
+                except Exception:
+                    db.session.rollback()
+                    self.app.logger.exception('Background job %s failed', self.name)
+                finally:
+                    db.session.remove()
+
+
+def schedule(app, name, interval, job, at_start=False):
+    '''Run `job` every `interval` seconds once the app serves its first request.
+
+    Starting with a request keeps CLI commands, and processes that never
+    serve pages, from running it. An interval of 0 disables the job.
+    '''
+    if not interval:
+        return
+    lock = threading.Lock()
+    started = []
+
+    @app.before_request
+    def start_periodic_task():
+        if not started:
+            with lock:
+                if not started:
+                    started.append(PeriodicTask(app, name, interval, job, at_start))
+                    started[0].start()
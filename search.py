@@ -0,0 +1,65 @@
+from flask import current_app
+from sqlalchemy import literal_column
+
+from models import db, Venue, Genre, VenueShowSummary, ArtistShowSummary, venue_genres, artist_genres
+
+
+#----------------------------------------------------------------------------#
+# Venue and artist search.
+#----------------------------------------------------------------------------#
+
+# On PostgreSQL each table carries a pg_trgm GIN index over this document
+# expression (see migration e6a0c4d8f213). The expression below must stay
+# byte-for-byte identical to the indexed one for the planner to use it, which
+# is why the separators are literals rather than bound parameters.
+
+def search_document(model):
+    blank = literal_column("''")
+    space = literal_column("' '")
+    return db.func.lower(
+        db.func.coalesce(model.name, blank) + space +
+        db.func.coalesce(model.city, blank) + space +
+        db.func.coalesce(model.state, blank)
+    )
+
+
+def search_entities(model, term):
+    '''Ranked search over name, city, state and genres of venues or artists.
+
+    Returns `(count, data)` where count is the total number of hits and data
+    holds at most SEARCH_RESULT_LIMIT `{id, name, num_upcoming_shows}` dicts.
+    Hits, their total and their upcoming show counts come back in one query.
+    '''
+    summary = VenueShowSummary if model is Venue else ArtistShowSummary
+    summary_fk = summary.venue_id if model is Venue else summary.artist_id
+    document = search_document(model)
+    needle = term.strip().lower()
+
+    # substring matches keep the old ILIKE semantics; on PostgreSQL the
+    # trigram similarity operator adds typo-tolerant matches, and both are
+    # answered from the same GIN index
+    match = document.contains(needle, autoescape=True)
+    ordering = [model.name, model.id]
+    if db.session.get_bind().dialect.name == 'postgresql':
+        match = db.or_(match, document.op('%')(needle))
+        ordering.insert(0, db.func.similarity(document, needle).desc())
+
+    # genres live in their own small table; matching ones are resolved first
+    # and their owners found through the (genre_id, owner) link index
+    links = venue_genres if model is Venue else artist_genres
+    owner = links.c.venue_id if model is Venue else links.c.artist_id
+    genre_ids = db.session.query(Genre.id).filter(db.func.lower(Genre.name).contains(needle, autoescape=True))
+    match = db.or_(match, model.id.in_(db.session.query(owner).filter(links.c.genre_id.in_(genre_ids))))
+
+    rows = db.session.query(model.id, model.name,
+                            db.func.coalesce(summary.upcoming_shows_count, 0).label('num_upcoming_shows'),
+                            db.func.count().over().label('count')) \
+        .outerjoin(summary, summary_fk == model.id) \
+        .filter(match) \
+        .order_by(*ordering) \
+        .limit(current_app.config['SEARCH_RESULT_LIMIT']) \
+        .all()
+
+    count = rows[0].count if rows else 0
+    data = [{ 'id': row.id, 'name': row.name, 'num_upcoming_shows': row.num_upcoming_shows } for row in rows]
+    return count, data
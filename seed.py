@@ -0,0 +1,159 @@
+import random
+import time
+from datetime import datetime, timedelta, timezone
+
+import click
+from flask.cli import with_appcontext
+
+from models import db, Venue, Artist, Genre, venue_genres, artist_genres
+from importer import insert_shows
+from summaries import refresh
+
+
+#----------------------------------------------------------------------------#
+# Synthetic data.
+#----------------------------------------------------------------------------#
+
+CITIES = [
+    ('San Francisco', 'CA'), ('Los Angeles', 'CA'), ('San Diego', 'CA'), ('New York', 'NY'),
+    ('Brooklyn', 'NY'), ('Austin', 'TX'), ('Houston', 'TX'), ('Chicago', 'IL'), ('Seattle', 'WA'),
+    ('Portland', 'OR'), ('Denver', 'CO'), ('Nashville', 'TN'), ('Memphis', 'TN'), ('New Orleans', 'LA'),
+    ('Atlanta', 'GA'), ('Miami', 'FL'), ('Boston', 'MA'), ('Philadelphia', 'PA'), ('Detroit', 'MI'),
+    ('Minneapolis', 'MN'),
+]
+
+WORDS = [
+    'Blue', 'Red', 'Golden', 'Electric', 'Velvet', 'Midnight', 'Silver', 'Wild', 'Little', 'Grand',
+    'Old', 'New', 'Lucky', 'Crystal', 'Neon', 'Hollow', 'Iron', 'Secret', 'Rusty', 'Royal',
+    'Fox', 'Owl', 'Moon', 'River', 'Garden', 'Cellar', 'Room', 'Hall', 'Stage', 'Lounge',
+    'Tavern', 'Club', 'Tigers', 'Echoes', 'Rebels', 'Sparrows', 'Wolves', 'Kings', 'Drifters', 'Ghosts',
+]
+
+SCALES = {
+    'tiny': (50, 200, 5000),
+    'small': (1000, 4000, 100000),
+    'large': (50000, 200000, 5000000),
+}
+
+
+def genre_names():
+    from forms import VenueForm
+    return [value for value, label in VenueForm.genres.kwargs['choices']]
+
+
+def next_id(model):
+    return (db.session.query(db.func.max(model.id)).execution_options(include_deleted=True).scalar() or 0) + 1
+
+
+def reset_sequence(model):
+    # rows are inserted with explicit ids, which PostgreSQL's serial
+    # sequences do not see
+    if db.session.get_bind().dialect.name == 'postgresql':
+        table = model.__tablename__
+        db.session.execute(db.text(
+            f"SELECT setval(pg_get_serial_sequence('\"{table}\"', 'id'), (SELECT max(id) FROM \"{table}\"))"))
+
+
+def seed_entities(rng, model, links, owner_column, count, batch_size, genre_ids, seeking_column):
+    first_id = next_id(model)
+    for start in range(first_id, first_id + count, batch_size):
+        ids = range(start, min(start + batch_size, first_id + count))
+        rows, genre_rows = [], []
+        for id in ids:
+            city, state = rng.choice(CITIES)
+            rows.append({
+                'id': id,
+                'name': ' '.join(rng.sample(WORDS, 2)) + ' %d' % id,
+                'city': city,
+                'state': state,
+                'phone': '%03d-%03d-%04d' % (rng.randrange(200, 999), rng.randrange(1000), rng.randrange(10000)),
+                'image_link': 'https://picsum.photos/seed/%s%d/300/300' % (model.__tablename__.lower(), id),
+                seeking_column: rng.random() < 0.3,
+                'seeking_description': '',
+            })
+            genre_rows += [{ owner_column: id, 'genre_id': genre_id } for genre_id in rng.sample(genre_ids, rng.randint(1, 3))]
+        db.session.execute(model.__table__.insert(), rows)
+        db.session.execute(links.insert(), genre_rows)
+        db.session.commit()
+    reset_sequence(model)
+    db.session.commit()
+    return range(first_id, first_id + count)
+
+
+def seed_shows(rng, count, batch_size, venue_ids, artist_ids):
+    now = datetime.now(timezone.utc)
+    # three years of history and one year of upcoming shows in two-hour
+    # slots, without booking a venue or an artist twice in the same slot:
+    # the n-th show of a slot goes to the n-th venue and the n-th artist
+    # after that slot's random offsets, so only a count and the offsets of
+    # each slot are kept, and a full slot passes its show on to the next
+    earliest = now.replace(minute=0, second=0, microsecond=0) - timedelta(days=3 * 365)
+    slots = 4 * 365 * 12
+    slot = timedelta(hours=2)
+    per_slot = min(len(venue_ids), len(artist_ids))
+    if count > slots * per_slot:
+        raise click.ClickException(f'{len(venue_ids)} venues and {len(artist_ids)} artists can hold '
+                                   f'at most {slots * per_slot} shows.')
+    filled, offsets = {}, {}
+
+    def draw():
+        at = rng.randrange(slots)
+        while filled.get(at, 0) == per_slot:
+            at = (at + 1) % slots
+        if at not in offsets:
+            offsets[at] = (rng.randrange(len(venue_ids)), rng.randrange(len(artist_ids)))
+        venue_offset, artist_offset = offsets[at]
+        n = filled[at] = filled.get(at, 0) + 1
+        start_time = earliest + at * slot
+        return { 'venue_id': venue_ids[(venue_offset + n) % len(venue_ids)],
+                 'artist_id': artist_ids[(artist_offset + n) % len(artist_ids)],
+                 'start_time': start_time, 'end_time': start_time + slot }
+
+    for start in range(0, count, batch_size):
+        insert_shows([draw() for _ in range(start, min(start + batch_size, count))])
+        db.session.commit()
+    refresh('venue', venue_ids)
+    refresh('artist', artist_ids)
+    db.session.commit()
+
+
+@click.command('seed')
+@click.option('--scale', type=click.Choice(sorted(SCALES)), default='small', show_default=True,
+              help='Preset venue/artist/show counts; the options below override it.')
+@click.option('--venues', type=int)
+@click.option('--artists', type=int)
+@click.option('--shows', type=int)
+@click.option('--seed', default=42, show_default=True, help='Random seed, so runs are reproducible.')
+@click.option('--batch-size', default=10000, show_default=True)
+@click.option('--create', is_flag=True, help='Create the tables first (for a scratch SQLite database).')
+@with_appcontext
+def seed_command(scale, venues, artists, shows, seed, batch_size, create):
+    '''Fill the database with a reproducible synthetic catalogue.
+
+    Use `flask db upgrade` rather than --create on PostgreSQL, so that the
+    indexes created only by migrations exist.
+    '''
+    default_venues, default_artists, default_shows = SCALES[scale]
+    venues = default_venues if venues is None else venues
+    artists = default_artists if artists is None else artists
+    shows = default_shows if shows is None else shows
+    rng = random.Random(seed)
+    if create:
+        db.create_all()
+
+    genres = Genre.get_or_create(genre_names())
+    db.session.commit()
+    genre_ids = [genre.id for genre in genres]
+
+    started = time.perf_counter()
+    venue_ids = seed_entities(rng, Venue, venue_genres, 'venue_id', venues, batch_size, genre_ids, 'seeking_talent')
+    click.echo(f'venues: {venues} rows in {time.perf_counter() - started:.1f}s')
+
+    started = time.perf_counter()
+    artist_ids = seed_entities(rng, Artist, artist_genres, 'artist_id', artists, batch_size, genre_ids, 'seeking_venue')
+    click.echo(f'artists: {artists} rows in {time.perf_counter() - started:.1f}s')
+
+    started = time.perf_counter()
+    if venue_ids and artist_ids:
+        seed_shows(rng, shows, batch_size, venue_ids, artist_ids)
+    click.echo(f'shows: {shows} rows in {time.perf_counter() - started:.1f}s')
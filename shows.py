@@ -0,0 +1,111 @@
+from datetime import timedelta, timezone
+
+from flask import Blueprint, current_app, render_template, request, flash
+
+from models import db, Venue, Artist, Show
+from pagination import paginate, page_size
+from cache import cache
+from conditional import conditional, make_etag
+from invalidation import invalidate_show
+from bookings import book_show, BookingConflict
+from streaming import stream_page
+
+bp = Blueprint('shows', __name__)
+
+#----------------------------------------------------------------------------#
+# Validators.
+#----------------------------------------------------------------------------#
+
+# one indexed lookup: /shows changes with any new show and any venue or
+# artist edit
+
+def shows_etag():
+  latest = [db.session.query(db.func.max(column)).scalar_subquery() for column in (Show.id, Venue.updated_at, Artist.updated_at)]
+  return make_etag('shows', *db.session.query(*latest).one())
+
+#----------------------------------------------------------------------------#
+# Controllers.
+#----------------------------------------------------------------------------#
+
+#  Shows
+#  ----------------------------------------------------------------
+
+@bp.route('/shows')
+def shows():
+  # displays list of shows at /shows
+  def load():
+    query = db.session.query(Show.id, Show.start_time, Show.venue_id, Venue.name.label('venue_name'),
+                             Show.artist_id, Artist.name.label('artist_name'), Artist.image_link.label('artist_image_link')) \
+      .join(Venue, Show.venue_id == Venue.id) \
+      .join(Artist, Show.artist_id == Artist.id)
+    shows, next_after = paginate(query, [Show.start_time, Show.id])
+    data = []
+    for show in shows:
+      data.append({
+              'venue_id' :show.venue_id,
+              'venue_name' :show.venue_name,
+              'artist_id' :show.artist_id,
+              'artist_name' :show.artist_name,
+              'artist_image_link' :show.artist_image_link,
+              'start_time' :show.start_time
+          })
+    return data, next_after
+
+  def render():
+    data = []
+    next_after = None
+    error = False
+    try:
+      key = cache.versioned_key('shows', request.args.get('after'), page_size())
+      data, next_after = cache.cached(key, load)
+    except:
+      error = True
+    if error:
+      flash('An error occurred. Shows cannot be listed.')
+    return stream_page('pages/shows.html', shows=data, next_after=next_after)
+
+  try:
+    etag = shows_etag()
+  except:
+    etag = None
+  return conditional(etag, render)
+
+@bp.route('/shows/create')
+def create_shows():
+  # renders form. do not touch.
+  from forms import ShowForm
+  form = ShowForm()
+  return render_template('forms/new_show.html', form=form)
+
+@bp.route('/shows/create', methods=['POST'])
+def create_show_submission():
+  error = False  
+  conflict = None
+  try:  
+   artist_id = int(request.form['artist_id'])
+   venue_id = int(request.form['venue_id'])
+   import dateutil.parser
+   start_time = dateutil.parser.parse(request.form['start_time'])
+   if start_time.tzinfo is None:
+     start_time = start_time.replace(tzinfo=timezone.utc)
+   duration = int(request.form.get('duration') or current_app.config['SHOW_DEFAULT_MINUTES'])
+   book_show(venue_id, artist_id, start_time, start_time + timedelta(minutes=duration))
+   db.session.commit()
+   invalidate_show(venue_id, artist_id)
+  except BookingConflict as e:
+    db.session.rollback()
+    conflict = e
+  except:   
+    db.session.rollback() 
+    error = True 
+  finally:
+    db.session.close()
+
+  if conflict:
+    flash('Show could not be listed: the %s is already booked at that time.' % conflict.kind)
+  elif error:
+    flash('An error occurred. Show could not be listed.')
+  else:
+    flash('Show was successfully listed!')
+
+  return render_template('pages/home.html')
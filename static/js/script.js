@@ -2,3 +2,33 @@ window.parseISOString = function parseISOString(s) {
   var b = s.split(/\D+/);
   return new Date(Date.UTC(b[0], --b[1], b[2], b[3], b[4], b[5], b[6]));
 };
+
+// Type-ahead for the navbar search boxes, from /autocomplete
+document.addEventListener('DOMContentLoaded', function () {
+  var inputs = document.querySelectorAll('form.search input[data-autocomplete]');
+  Array.prototype.forEach.call(inputs, function (input) {
+    var list = document.getElementById(input.getAttribute('list'));
+    var timer = null;
+    input.addEventListener('input', function () {
+      var term = input.value.trim();
+      clearTimeout(timer);
+      if (!term) {
+        list.innerHTML = '';
+        return;
+      }
+      timer = setTimeout(function () {
+        var url = '/autocomplete?type=' + input.dataset.autocomplete + '&q=' + encodeURIComponent(term);
+        fetch(url).then(function (response) {
+          return response.json();
+        }).then(function (data) {
+          list.innerHTML = '';
+          data.results.forEach(function (match) {
+            var option = document.createElement('option');
+            option.value = match.name;
+            list.appendChild(option);
+          });
+        });
+      }, 100);
+    });
+  });
+});
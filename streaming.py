@@ -0,0 +1,58 @@
+from flask import Response, current_app, render_template, session, stream_template
+
+from conditional import session_in_use
+
+
+#----------------------------------------------------------------------------#
+# Streaming query results.
+#----------------------------------------------------------------------------#
+
+def iter_results(query):
+    '''Iterate a query in STREAM_BATCH_SIZE batches from a server-side cursor.
+
+    Only one batch of rows is held in memory at a time, so a response built
+    on top of this stays flat no matter how many rows the query returns.
+    '''
+    batch_size = current_app.config['STREAM_BATCH_SIZE']
+    return query.execution_options(stream_results=True).yield_per(batch_size)
+
+
+#----------------------------------------------------------------------------#
+# Streaming pages.
+#----------------------------------------------------------------------------#
+
+def closing(chunks):
+    # a wrapping generator closed early (the client went away) has to close
+    # the one it wraps, which holds the request context
+    close = getattr(chunks, 'close', None)
+    if close is not None:
+        close()
+
+
+def buffered(chunks, size):
+    '''Join the small pieces a template generates into chunks of `size` characters.'''
+    pending, length = [], 0
+    try:
+        for chunk in chunks:
+            pending.append(chunk)
+            length += len(chunk)
+            if length >= size:
+                yield ''.join(pending)
+                pending, length = [], 0
+        if pending:
+            yield ''.join(pending)
+    finally:
+        closing(chunks)
+
+
+def stream_page(template_name, **context):
+    '''render_template() for long listings: the page goes out as it renders,
+    so the browser gets the head and fetches the stylesheets early.
+
+    Pages with flashed messages are rendered whole. The template consumes
+    them, and the session cookie saying so has to leave with the headers.
+    '''
+    if session_in_use() and '_flashes' in session:
+        return render_template(template_name, **context)
+    chunks = stream_template(template_name, **context)
+    return Response(buffered(chunks, current_app.config['STREAM_CHUNK_SIZE']))
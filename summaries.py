@@ -0,0 +1,144 @@
+import time
+from datetime import datetime, timezone
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy.dialects import postgresql, sqlite
+
+from models import db, Venue, Artist, Show, VenueShowSummary, ArtistShowSummary
+from scheduler import schedule
+
+
+#----------------------------------------------------------------------------#
+# Show summaries.
+#----------------------------------------------------------------------------#
+
+# Every venue and artist with shows has one summary row holding its upcoming
+# and past show counts and the start of its next show. Booking a show bumps
+# the two rows it touches; as time passes, roll_over() recounts only the
+# owners whose next show has started, found through the next_show_time index.
+
+SUMMARIES = {
+    'venue': (Venue, VenueShowSummary, VenueShowSummary.venue_id, Show.venue_id),
+    'artist': (Artist, ArtistShowSummary, ArtistShowSummary.artist_id, Show.artist_id),
+}
+
+CHUNK_SIZE = 1000
+
+
+def chunks(ids):
+    ids = list(ids)
+    for start in range(0, len(ids), CHUNK_SIZE):
+        yield ids[start:start + CHUNK_SIZE]
+
+
+def refresh(kind, ids):
+    '''Recount the summaries of the given venue or artist ids from their shows.'''
+    model, summary, key, show_fk = SUMMARIES[kind]
+    now = datetime.now(timezone.utc)
+    upcoming = Show.start_time > now
+    for chunk in chunks(ids):
+        counts = dict((owner_id, (upcoming_count, past_count, next_show_time)) for owner_id, upcoming_count, past_count, next_show_time in
+            db.session.query(show_fk,
+                             db.func.count(db.case((upcoming, 1))),
+                             db.func.count(db.case((~upcoming, 1))),
+                             db.func.min(db.case((upcoming, Show.start_time))))
+            .filter(show_fk.in_(chunk))
+            .group_by(show_fk))
+        db.session.query(summary).filter(key.in_(chunk)).delete(synchronize_session=False)
+        if counts:
+            db.session.execute(summary.__table__.insert(), [{
+                key.key: owner_id,
+                'upcoming_shows_count': upcoming_count,
+                'past_shows_count': past_count,
+                'next_show_time': next_show_time,
+            } for owner_id, (upcoming_count, past_count, next_show_time) in counts.items()])
+
+
+def upsert(summary):
+    dialect = db.session.get_bind().dialect.name
+    return (postgresql.insert if dialect == 'postgresql' else sqlite.insert)(summary.__table__)
+
+
+def record_show(show):
+    '''Count a newly added show in its venue's and artist's summaries.
+
+    One INSERT ... ON CONFLICT DO UPDATE per summary: the owner's first show
+    creates its row, later ones bump the counts in place.
+    '''
+    upcoming = show.start_time > datetime.now(timezone.utc)
+    for kind, owner_id in (('venue', show.venue_id), ('artist', show.artist_id)):
+        model, summary, key, show_fk = SUMMARIES[kind]
+        columns = summary.__table__.c
+        if upcoming:
+            values = {
+                'upcoming_shows_count': columns.upcoming_shows_count + 1,
+                'next_show_time': db.case(
+                    (db.or_(columns.next_show_time.is_(None), columns.next_show_time > show.start_time), show.start_time),
+                    else_=columns.next_show_time),
+            }
+        else:
+            values = { 'past_shows_count': columns.past_shows_count + 1 }
+        db.session.execute(upsert(summary).values({
+            key.key: int(owner_id),
+            'upcoming_shows_count': int(upcoming),
+            'past_shows_count': int(not upcoming),
+            'next_show_time': show.start_time if upcoming else None,
+        }).on_conflict_do_update(index_elements=[key.key], set_=values))
+
+
+def roll_over():
+    '''Recount the owners whose next show has started; returns their ids by kind.'''
+    now = datetime.now(timezone.utc)
+    rolled = {}
+    for kind, (model, summary, key, show_fk) in SUMMARIES.items():
+        rolled[kind] = [owner_id for owner_id, in db.session.query(key).filter(summary.next_show_time <= now)]
+        refresh(kind, rolled[kind])
+    db.session.commit()
+    return rolled
+
+
+def rebuild():
+    for kind, (model, summary, key, show_fk) in SUMMARIES.items():
+        refresh(kind, [owner_id for owner_id, in db.session.query(model.id)])
+        db.session.commit()
+
+
+#----------------------------------------------------------------------------#
+# Commands.
+#----------------------------------------------------------------------------#
+
+def invalidate_rolled(cache, rolled):
+    # pages split shows into upcoming and past, so they changed as well
+    keys = ['%s:%d' % (kind, owner_id) for kind, ids in rolled.items() for owner_id in ids]
+    if keys:
+        cache.delete(*keys)
+    if rolled['venue']:
+        cache.bump('venues')
+
+
+summaries_cli = AppGroup('summaries', help='Maintain the per-venue and per-artist show counts.')
+
+
+@summaries_cli.command('rebuild')
+def rebuild_command():
+    '''Recount every summary from the Show table.'''
+    started = time.perf_counter()
+    rebuild()
+    current_app.extensions['cache'].bump('venues')
+    click.echo(f'Rebuilt show summaries in {time.perf_counter() - started:.1f}s')
+
+
+@summaries_cli.command('roll-over')
+def roll_over_command():
+    '''Move shows that have started from upcoming to past, e.g. from cron.'''
+    rolled = roll_over()
+    invalidate_rolled(current_app.extensions['cache'], rolled)
+    click.echo(f"Rolled over {len(rolled['venue'])} venues and {len(rolled['artist'])} artists")
+
+
+def setup_summaries(app):
+    app.cli.add_command(summaries_cli)
+    schedule(app, 'summary-rollover', app.config['SUMMARY_ROLLOVER_SECONDS'],
+             lambda: invalidate_rolled(current_app.extensions['cache'], roll_over()))
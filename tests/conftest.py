@@ -0,0 +1,59 @@
+import pytest
+from flask import template_rendered
+
+from app import create_app
+from models import db, Venue, Artist, Genre
+
+
+# Run from the repository root with `python -m pytest tests` (or `fab test`),
+# which puts the top-level modules on the path. Each test gets its own app on
+# a throwaway SQLite database, with the flask commands and none of the
+# background jobs.
+
+@pytest.fixture
+def app(tmp_path):
+    app = create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + str(tmp_path / 'fyyur.db'),
+        'SUMMARY_ROLLOVER_SECONDS': 0,
+        'VENUE_PURGE_SECONDS': 0,
+        'AUTOCOMPLETE_REFRESH_SECONDS': 0,
+    }, cli=True)
+    with app.app_context():
+        db.create_all(bind_key=None)
+        yield app
+        db.session.remove()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def rendered(app):
+    '''The (template name, context) of every template the test renders.'''
+    templates = []
+
+    def record(sender, template, context, **extra):
+        templates.append((template.name, context))
+
+    template_rendered.connect(record, app)
+    yield templates
+    template_rendered.disconnect(record, app)
+
+
+@pytest.fixture
+def venue(app):
+    venue = Venue(name='The Musical Hop', city='San Francisco', state='CA', genres=Genre.get_or_create(['Jazz', 'Blues']))
+    db.session.add(venue)
+    db.session.commit()
+    return venue
+
+
+@pytest.fixture
+def artist(app):
+    artist = Artist(name='Guns N Petals', city='San Francisco', state='CA', genres=Genre.get_or_create(['Rock n Roll']))
+    db.session.add(artist)
+    db.session.commit()
+    return artist
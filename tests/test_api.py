@@ -0,0 +1,42 @@
+import json
+from datetime import datetime, timedelta, timezone
+
+from models import db, Venue, Show, Genre
+
+
+def lines(response):
+    assert response.mimetype == 'application/x-ndjson'
+    return [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+
+def test_collections_resume_after_id(app, client, venue, artist, monkeypatch):
+    monkeypatch.setitem(app.config, 'STREAM_BATCH_SIZE', 2)
+    db.session.add_all(Venue(name='Venue %d' % i, genres=Genre.get_or_create(['Jazz'])) for i in range(6))
+    db.session.commit()
+
+    everything = lines(client.get('/api/v1/venues'))
+    assert [row['id'] for row in everything] == sorted(venue.id for venue in Venue.query)
+    assert everything[0]['genres'] == ['Blues', 'Jazz']
+
+    # a client that stopped after three rows picks up where it left off
+    rest = lines(client.get('/api/v1/venues?after_id=%d' % everything[2]['id']))
+    assert everything[:3] + rest == everything
+    assert lines(client.get('/api/v1/venues?after_id=%d' % everything[-1]['id'])) == []
+
+
+def test_shows_stream_and_single_resources(client, venue, artist):
+    start = datetime(2040, 1, 1, 20, tzinfo=timezone.utc)
+    db.session.add_all(Show(venue_id=venue.id, artist_id=artist.id, start_time=start + timedelta(days=days),
+                            end_time=start + timedelta(days=days, hours=2))
+                       for days in range(3))
+    db.session.commit()
+
+    shows = lines(client.get('/api/v1/shows'))
+    assert [datetime.fromisoformat(show['start_time']).day for show in shows] == [1, 2, 3]
+    assert lines(client.get('/api/v1/shows?after_id=%d' % shows[0]['id'])) == shows[1:]
+
+    data = client.get('/api/v1/venues/%d' % venue.id).get_json()
+    assert [show['id'] for show in data['upcoming_shows']] == [show['id'] for show in shows]
+    assert client.get('/api/v1/shows/%d' % shows[1]['id']).get_json() == shows[1]
+    response = client.get('/api/v1/artists/404')
+    assert (response.status_code, response.get_json()) == (404, { 'error': 'not found' })
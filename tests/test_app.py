@@ -0,0 +1,22 @@
+import logging
+
+from app import create_app
+
+
+def test_config_overrides_and_commands(tmp_path):
+    uri = 'sqlite:///' + str(tmp_path / 'other.db')
+    web = create_app({ 'SQLALCHEMY_DATABASE_URI': uri, 'PAGE_SIZE': 7 })
+    assert (web.config['SQLALCHEMY_DATABASE_URI'], web.config['PAGE_SIZE']) == (uri, 7)
+    assert 'import' not in web.cli.commands and 'db' not in web.cli.commands
+    assert 'venues.show_venue' in web.view_functions
+
+    command = create_app({ 'SQLALCHEMY_DATABASE_URI': uri }, cli=True)
+    assert { 'import', 'seed', 'bench', 'db' } <= set(command.cli.commands)
+
+
+def test_startup_time_is_reported(tmp_path, caplog):
+    with caplog.at_level(logging.WARNING):
+        app = create_app({ 'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + str(tmp_path / 'fyyur.db'), 'STARTUP_BUDGET_MS': 0 })
+    assert 'over the 0ms budget' in caplog.text
+    metrics = app.test_client().get('/metrics').get_data(as_text=True)
+    assert 'fyyur_startup_seconds %s' % app.extensions['startup_seconds'] in metrics
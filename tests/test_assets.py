@@ -0,0 +1,74 @@
+import gzip
+import json
+
+import pytest
+
+from assets import asset_url, build
+
+
+@pytest.fixture
+def static(app, tmp_path, monkeypatch):
+    tmp_path = tmp_path / 'static'
+    (tmp_path / 'css').mkdir(parents=True)
+    (tmp_path / 'img').mkdir()
+    (tmp_path / 'img' / 'logo.png').write_bytes(b'\x89PNG not really')
+    (tmp_path / 'css' / 'main.css').write_text('body { background: url("../img/logo.png"); }\n' * 40)
+    (tmp_path / '.gitkeep').write_text('')
+    monkeypatch.setattr(app, 'static_folder', str(tmp_path))
+    monkeypatch.setitem(app.extensions, 'assets', build(str(tmp_path)))
+    return tmp_path
+
+
+def test_build_fingerprints_and_rewrites_css(static):
+    manifest = json.loads((static / 'dist' / 'manifest.json').read_text())
+    assert sorted(manifest) == ['css/main.css', 'img/logo.png']
+    assert manifest['img/logo.png'].startswith('img/logo.') and manifest['img/logo.png'].endswith('.png')
+
+    css = (static / 'dist' / manifest['css/main.css']).read_text()
+    assert 'url("../%s")' % manifest['img/logo.png'] in css
+    assert gzip.decompress((static / 'dist' / (manifest['css/main.css'] + '.gz')).read_bytes()).decode() == css
+    # the image is not compressible text
+    assert not (static / 'dist' / (manifest['img/logo.png'] + '.gz')).exists()
+
+
+def test_serve_picks_the_accepted_encoding(app, client, static):
+    with app.test_request_context():
+        url = asset_url('css/main.css')
+        assert asset_url('js/missing.js') == '/static/js/missing.js'
+    assert url.startswith('/assets/css/main.')
+
+    response = client.get(url, headers={ 'Accept-Encoding': 'gzip, deflate' })
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert response.mimetype == 'text/css'
+    assert 'Accept-Encoding' in response.headers['Vary']
+    assert 'immutable' in response.headers['Cache-Control']
+    plain = client.get(url, headers={ 'Accept-Encoding': 'identity' })
+    assert 'Content-Encoding' not in plain.headers
+    assert gzip.decompress(response.get_data()) == plain.get_data()
+
+
+def test_refused_encodings_are_not_served(client, static):
+    url = '/assets/' + json.loads((static / 'dist' / 'manifest.json').read_text())['css/main.css']
+    # as written with the brotli package installed
+    (static / 'dist' / (url[len('/assets/'):] + '.br')).write_bytes(b'not really brotli')
+    assert client.get(url, headers={ 'Accept-Encoding': 'br;q=0, gzip' }).headers['Content-Encoding'] == 'gzip'
+    assert client.get(url, headers={ 'Accept-Encoding': 'br, gzip' }).headers['Content-Encoding'] == 'br'
+    assert 'Content-Encoding' not in client.get(url, headers={ 'Accept-Encoding': 'gzip;q=0' }).headers
+    assert client.get(url, headers={ 'Accept-Encoding': '*;q=0.5' }).headers['Content-Encoding'] == 'br'
+
+
+def test_rebuilds_keep_the_files_of_recent_builds(static):
+    def css_file():
+        return static / 'dist' / json.loads((static / 'dist' / 'manifest.json').read_text())['css/main.css']
+
+    built = [css_file()]
+    for number in range(3):
+        (static / 'css' / 'main.css').write_text('body { margin: %dpx; }\n' % number * 40)
+        build(str(static), keep=3)
+        built.append(css_file())
+    # the fixture's build and three more: only the first has gone
+    assert [path.exists() for path in built] == [False, True, True, True]
+    assert not built[0].with_name(built[0].name + '.gz').exists()
+    # the image is in every build
+    logo = json.loads((static / 'dist' / 'manifest.json').read_text())['img/logo.png']
+    assert (static / 'dist' / logo).exists()
@@ -0,0 +1,70 @@
+from autocomplete import PrefixIndex, refresh
+from deletion import delete_venue, purge_deleted_venues, soft_delete_venue
+from models import db, Venue, Artist
+from test_cache import VENUE_FORM
+
+
+def search(app, prefix):
+    return app.extensions['autocomplete'].search(prefix, 10)
+
+
+def test_prefixes_of_every_word():
+    index = PrefixIndex([('venue', 1, 'Blue Fox Lounge'), ('artist', 2, 'Fox Blue')])
+    assert index.search('blu', 10) == [('venue', 1, 'Blue Fox Lounge'), ('artist', 2, 'Fox Blue')]
+    assert index.search('fox l', 10) == [('venue', 1, 'Blue Fox Lounge')]
+    assert index.search('fox', 10, 'venue') == [('venue', 1, 'Blue Fox Lounge')]
+    index.remove('venue', 1)
+    assert index.search('blue', 10) == [('artist', 2, 'Fox Blue')]
+
+
+def test_refresh_reads_renames_from_elsewhere(app):
+    venue = Venue(name='Blue Room')
+    db.session.add_all([venue, Artist(name='Blue Note Trio')])
+    db.session.commit()
+    refresh()
+    assert len(search(app, 'blue')) == 2
+
+    # another worker renames the venue
+    venue.name = 'Red Room'
+    db.session.commit()
+    refresh()
+    assert [name for kind, id, name in search(app, 'blue')] == ['Blue Note Trio']
+    assert search(app, 'red') == [('venue', venue.id, 'Red Room')]
+
+
+def test_endpoint_answers_from_the_index(app, client):
+    refresh()
+    client.post('/venues/create', data=dict(VENUE_FORM, name='Blue Fox'))
+    response = client.get('/autocomplete?q=fox&type=venue')
+    assert response.get_json()['results'] == [{ 'type': 'venue', 'id': 1, 'name': 'Blue Fox', 'url': '/venues/1' }]
+    assert response.cache_control.max_age == 60
+    assert client.get('/autocomplete?q=fox&type=artist').get_json()['results'] == []
+
+
+def test_deleted_venues_drop_out(app, monkeypatch):
+    db.session.add_all([Venue(name='Blue Room'), Venue(name='Blue Fox'), Venue(name='Blue Moon')])
+    db.session.commit()
+    refresh()
+
+    # another worker soft-deletes one venue, and deletes another outright
+    soft_delete_venue(1)
+    delete_venue(2)
+    db.session.commit()
+    refresh()
+    assert sorted(name for kind, id, name in search(app, 'blue')) == ['Blue Fox', 'Blue Moon']
+    # which only a rebuild notices
+    monkeypatch.setitem(app.config, 'AUTOCOMPLETE_REBUILD_SECONDS', 0)
+    refresh()
+    assert [name for kind, id, name in search(app, 'blue')] == ['Blue Moon']
+
+
+def test_purge_unindexes_venues(app):
+    venue = Venue(name='Blue Room')
+    db.session.add(venue)
+    db.session.commit()
+    refresh()
+    # soft-deleted after the last refresh, and purged in this process
+    soft_delete_venue(venue.id)
+    db.session.commit()
+    purge_deleted_venues()
+    assert search(app, 'blue') == []
@@ -0,0 +1,86 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.schema import CreateTable
+
+from bookings import BookingConflict, book_show, find_conflict
+from models import db, Venue, Artist, Show, VenueShowSummary, ArtistShowSummary, SHOW_MAX_DURATION
+
+
+def at(hours):
+    return datetime(2040, 1, 1, tzinfo=timezone.utc) + timedelta(hours=hours)
+
+
+@pytest.fixture
+def other_artist(app):
+    artist = Artist(name='Matt Quevedo')
+    db.session.add(artist)
+    db.session.commit()
+    return artist
+
+
+@pytest.fixture
+def booked(venue, artist):
+    show = book_show(venue.id, artist.id, at(20), at(22))
+    db.session.commit()
+    return show
+
+
+@pytest.mark.parametrize('start, end', [(18, 20), (22, 24), (0, 20), (22, 40)])
+def test_touching_shows_do_not_conflict(booked, venue, artist, start, end):
+    assert find_conflict(venue.id, artist.id, at(start), at(end)) == (None, None)
+
+
+@pytest.mark.parametrize('start, end', [(19, 21), (21, 23), (20, 22), (20.5, 21.5), (19, 23)])
+def test_overlapping_shows_conflict(booked, venue, artist, start, end):
+    assert find_conflict(venue.id, artist.id, at(start), at(end)) == (booked, 'venue')
+
+
+def test_longest_show_is_found_from_its_end(venue, artist):
+    # starts a full SHOW_MAX_DURATION before the booking it clashes with
+    show = book_show(venue.id, artist.id, at(0), at(0) + SHOW_MAX_DURATION)
+    db.session.commit()
+    assert find_conflict(venue.id, artist.id, at(23), at(25)) == (show, 'venue')
+    assert find_conflict(venue.id, artist.id, at(24), at(25)) == (None, None)
+
+
+def test_conflict_names_the_artist(booked, other_artist, artist):
+    venue = booked.Venue
+    book_show(venue.id, other_artist.id, at(10), at(12))
+    db.session.commit()
+    assert find_conflict(venue.id, other_artist.id, at(21), at(23)) == (booked, 'venue')
+
+    elsewhere = Venue(name='Park Square Live Music & Coffee')
+    db.session.add(elsewhere)
+    db.session.commit()
+    assert find_conflict(elsewhere.id, artist.id, at(21), at(23)) == (booked, 'artist')
+    assert find_conflict(elsewhere.id, other_artist.id, at(21), at(23)) == (None, None)
+
+
+def test_book_show_rejects_a_clash(booked, venue, artist):
+    with pytest.raises(BookingConflict) as raised:
+        book_show(venue.id, artist.id, at(21), at(23))
+    assert raised.value.kind == 'venue'
+    assert raised.value.show == booked
+    db.session.rollback()
+    assert Show.query.count() == 1
+
+
+@pytest.mark.parametrize('start, end', [(20, 20), (22, 20), (0, 25)])
+def test_book_show_checks_the_duration(venue, artist, start, end):
+    with pytest.raises(ValueError):
+        book_show(venue.id, artist.id, at(start), at(end))
+
+
+def test_book_show_counts_the_show(booked, venue, artist):
+    assert db.session.get(VenueShowSummary, venue.id).upcoming_shows_count == 1
+    assert db.session.get(ArtistShowSummary, artist.id).upcoming_shows_count == 1
+
+
+def test_constraints_match_the_migration():
+    ddl = str(CreateTable(Show.__table__).compile(dialect=postgresql.dialect()))
+    assert '"Show_duration_check" CHECK (end_time > start_time AND end_time <= start_time + interval \'24 hours\')' in ddl
+    assert 'EXCLUDE USING gist (venue_id WITH =, tstzrange(start_time, end_time) WITH &&)' in ddl
+    # SQLite gets neither
+    assert 'CHECK' not in str(CreateTable(Show.__table__).compile(dialect=sqlite.dialect()))
@@ -0,0 +1,70 @@
+from datetime import datetime, timedelta, timezone
+
+from cache import LRUCache
+from models import db, Show
+
+
+VENUE_FORM = {
+    'name': 'Park Square Live', 'city': 'New York', 'state': 'NY', 'address': '34 Whiskey Moore Ave',
+    'phone': '415-000-1234', 'image_link': '', 'facebook_link': '', 'website_link': '',
+    'seeking_talent': 'n', 'seeking_description': '', 'genres': ['Folk'],
+}
+
+
+def test_lru_evicts_oldest_and_expires(monkeypatch):
+    cache = LRUCache(max_entries=2, default_ttl=60)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert cache.get('a') == 1
+    cache.set('c', 3)
+    assert (cache.get('a'), cache.get('b'), cache.get('c')) == (1, None, 3)
+
+    now = [1000.0]
+    monkeypatch.setattr('cache.time.monotonic', lambda: now[0])
+    cache.set('d', 4, ttl=5)
+    now[0] += 5
+    assert cache.get('d') is None
+
+
+def test_bump_retires_every_page_of_a_namespace():
+    cache = LRUCache()
+    first = cache.versioned_key('venues', None, 50)
+    cache.set(first, 'page')
+    cache.bump('venues')
+    assert cache.versioned_key('venues', None, 50) != first
+    assert cache.versioned_key('artists', None, 50) == 'artists:0:None:50'
+
+
+def test_create_venue_bumps_listing(client, rendered, venue):
+    cache = client.application.extensions['cache']
+    client.get('/venues')
+    version = cache.version('venues')
+
+    client.post('/venues/create', data=VENUE_FORM)
+    assert cache.version('venues') == version + 1
+    client.get('/venues')
+    assert [area['city'] for area in rendered[-1][1]['areas']] == ['San Francisco', 'New York']
+
+
+def test_edit_and_show_writes_drop_the_pages_they_change(client, venue, artist):
+    cache = client.application.extensions['cache']
+    start_time = datetime.now(timezone.utc) + timedelta(days=1)
+    db.session.add(Show(venue_id=venue.id, artist_id=artist.id, start_time=start_time, end_time=start_time + timedelta(hours=2)))
+    db.session.commit()
+    venue_id, artist_id = venue.id, artist.id
+    client.get('/venues/%d' % venue_id)
+    client.get('/artists/%d' % artist_id)
+    assert cache.get('venue:%d' % venue_id) and cache.get('artist:%d' % artist_id)
+
+    # a rename reaches the artist page that lists the venue
+    shows = cache.version('shows')
+    client.post('/venues/%d/edit' % venue_id, data=dict(VENUE_FORM, city='San Francisco', state='CA'))
+    assert cache.get('venue:%d' % venue_id) is None
+    assert cache.get('artist:%d' % artist_id) is None
+    assert cache.version('shows') == shows + 1
+
+    client.get('/venues/%d' % venue_id)
+    venues = cache.version('venues')
+    client.post('/shows/create', data={ 'venue_id': venue_id, 'artist_id': artist_id, 'start_time': '2030-01-01 20:00' })
+    assert cache.get('venue:%d' % venue_id) is None
+    assert (cache.version('shows'), cache.version('venues')) == (shows + 2, venues + 1)
@@ -0,0 +1,48 @@
+import gzip
+
+from compression import GzipEncoder, compressed_chunks
+from models import db, Artist
+
+
+ENCODER_CONFIG = { 'COMPRESS_GZIP_LEVEL': 6 }
+
+
+def test_small_chunks_are_flushed_together():
+    lines = [b'{"id":%d,"venue_id":%d,"artist_id":%d}\n' % (id, id % 50, id % 70) for id in range(20000)]
+    body = b''.join(compressed_chunks(iter(lines), GzipEncoder(ENCODER_CONFIG), 8192))
+    assert gzip.decompress(body) == b''.join(lines)
+    assert len(body) < len(gzip.compress(b''.join(lines), 6)) * 1.1
+
+
+def test_large_chunks_are_flushed_as_they_come():
+    pages = ['<tr><td>%d</td></tr>' % row * 500 for row in range(4)]
+    parts = list(compressed_chunks(iter(pages), GzipEncoder(ENCODER_CONFIG), 8192))
+    # one flushed part per chunk, then the gzip trailer
+    assert len(parts) == 5
+    decompressor = gzip.zlib.decompressobj(31)
+    assert decompressor.decompress(parts[0]).decode() == pages[0]
+
+
+def test_listing_is_streamed_compressed(app, client):
+    db.session.add_all([Artist(name='Artist %d' % number) for number in range(200)])
+    db.session.commit()
+    plain = client.get('/artists')
+    assert plain.is_streamed and 'Content-Encoding' not in plain.headers
+
+    response = client.get('/artists', headers={ 'Accept-Encoding': 'gzip' })
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response.vary
+    assert gzip.decompress(response.get_data()) == plain.get_data()
+
+
+def test_small_and_unchanged_responses_are_left_alone(client, venue):
+    response = client.get('/autocomplete?q=x', headers={ 'Accept-Encoding': 'gzip' })
+    assert 'Content-Encoding' not in response.headers
+
+    response = client.get('/venues/%d' % venue.id, headers={ 'Accept-Encoding': 'gzip' })
+    assert response.headers['Content-Encoding'] == 'gzip'
+    etag, weak = response.get_etag()
+    assert weak
+    unchanged = client.get('/venues/%d' % venue.id, headers={ 'Accept-Encoding': 'gzip', 'If-None-Match': response.headers['ETag'] })
+    assert unchanged.status_code == 304
+    assert 'Accept-Encoding' in unchanged.vary
@@ -0,0 +1,40 @@
+from test_cache import VENUE_FORM
+
+
+def test_venue_page_answers_304_until_edited(client, venue):
+    path = '/venues/%d' % venue.id
+    response = client.get(path)
+    etag = response.headers['ETag']
+    assert response.headers['Cache-Control'] == 'no-cache'
+
+    response = client.get(path, headers={ 'If-None-Match': etag })
+    assert (response.status_code, response.get_data()) == (304, b'')
+    assert response.headers['ETag'] == etag
+
+    client.post(path + '/edit', data=dict(VENUE_FORM, city='San Francisco', state='CA'))
+    # the page showing the flashed message is never validated or cached
+    response = client.get(path, headers={ 'If-None-Match': etag })
+    assert response.status_code == 200 and 'ETag' not in response.headers
+    assert b'successfully updated' in response.get_data()
+
+    response = client.get(path, headers={ 'If-None-Match': etag })
+    assert response.status_code == 200 and response.headers['ETag'] != etag
+
+
+def test_shows_etag_changes_with_a_new_show(client, venue, artist):
+    etag = client.get('/shows').headers['ETag']
+    assert client.get('/shows', headers={ 'If-None-Match': etag }).status_code == 304
+    client.post('/shows/create', data={ 'venue_id': venue.id, 'artist_id': artist.id, 'start_time': '2030-01-01 20:00' })
+    client.get('/')  # shows the flashed message
+    assert client.get('/shows', headers={ 'If-None-Match': etag }).status_code == 200
+
+
+def test_unknown_ids_have_no_etag(client, app):
+    response = client.get('/artists/404')
+    assert response.status_code == 404 and 'ETag' not in response.headers
+
+
+def test_pages_without_a_session_do_not_vary_on_cookie(client, venue):
+    for path in ('/venues/%d' % venue.id, '/venues'):
+        response = client.get(path)
+        assert 'Cookie' not in response.vary and 'Set-Cookie' not in response.headers
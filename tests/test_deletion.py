@@ -0,0 +1,69 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from deletion import delete_venue, purge_deleted_venues, should_soft_delete, soft_delete_venue
+from models import db, Venue, Show, VenueShowSummary, ArtistShowSummary
+from summaries import refresh
+
+
+@pytest.fixture
+def shows(app, venue, artist):
+    app.config['VENUE_SOFT_DELETE_SHOWS'] = 3
+    start = datetime(2040, 1, 1, tzinfo=timezone.utc)
+    def add(count):
+        db.session.add_all(Show(venue_id=venue.id, artist_id=artist.id, start_time=start + timedelta(days=day),
+                                end_time=start + timedelta(days=day, hours=2))
+                           for day in range(Show.query.count(), Show.query.count() + count))
+        refresh('venue', [venue.id])
+        refresh('artist', [artist.id])
+        db.session.commit()
+    return add
+
+
+def test_soft_delete_above_the_threshold(venue, shows):
+    assert not should_soft_delete(venue.id)
+    shows(3)
+    assert not should_soft_delete(venue.id)
+    shows(1)
+    assert should_soft_delete(venue.id)
+
+
+def test_delete_venue_removes_its_rows(venue, artist, shows):
+    shows(2)
+    assert delete_venue(venue.id) == [artist.id]
+    db.session.commit()
+    assert Show.query.count() == 0
+    assert db.session.get(VenueShowSummary, venue.id) is None
+    assert db.session.get(ArtistShowSummary, artist.id) is None
+    assert delete_venue(venue.id) is None
+
+
+def test_soft_deleted_venue_is_hidden_then_purged(venue, artist, shows):
+    shows(5)
+    venue_id, artist_id = venue.id, artist.id
+    assert soft_delete_venue(venue_id) == [artist_id]
+    db.session.commit()
+    db.session.expunge_all()
+    assert Venue.query.filter_by(id=venue_id).first() is None
+    assert Show.query.count() == 5
+    assert soft_delete_venue(venue_id) is None
+
+    assert purge_deleted_venues(batch_size=2) == 1
+    assert Show.query.count() == 0
+    assert Venue.query.execution_options(include_deleted=True).filter_by(id=venue_id).first() is None
+    assert db.session.get(ArtistShowSummary, artist_id) is None
+
+
+def test_delete_endpoint_hides_the_venue_everywhere(client, venue, artist, shows):
+    shows(4)
+    venue_id, artist_id = venue.id, artist.id
+    etag = client.get('/artists/%d' % artist_id).headers['ETag']
+
+    response = client.delete('/venues/%d' % venue_id)
+    assert response.get_json() == { 'success': True }
+    assert client.get('/venues/%d' % venue_id).status_code == 404
+    assert client.get('/api/v1/shows').get_data() == b''
+    # the artist page lost its shows
+    assert client.get('/artists/%d' % artist_id, headers={ 'If-None-Match': etag }).status_code == 200
+    assert client.delete('/venues/%d' % venue_id).status_code == 404
@@ -0,0 +1,71 @@
+import csv
+import gzip
+import io
+from datetime import datetime, timezone
+
+from models import db, Venue, Show
+
+
+def read_csv(response):
+    assert response.status_code == 200
+    return list(csv.reader(io.StringIO(response.get_data(as_text=True))))
+
+
+def test_venue_columns(client, venue):
+    rows = read_csv(client.get('/export/venues.csv'))
+    assert rows[0] == ['id', 'name', 'city', 'state', 'address', 'latitude', 'longitude', 'phone', 'website',
+                       'facebook_link', 'image_link', 'seeking_talent', 'seeking_description', 'genres']
+    assert dict(zip(rows[0], rows[1]))['genres'] == 'Blues,Jazz'
+    assert len(rows) == 2
+
+
+def test_show_columns_and_filters(client, venue, artist):
+    other = Venue(name='Park Square Live', city='New York', state='NY')
+    db.session.add(other)
+    db.session.add_all([
+        Show(venue_id=venue.id, artist_id=artist.id, start_time=datetime(2035, 1, 1, 20, tzinfo=timezone.utc),
+             end_time=datetime(2035, 1, 1, 22, tzinfo=timezone.utc)),
+        Show(venue_id=venue.id, artist_id=artist.id, start_time=datetime(2035, 2, 1, 20, tzinfo=timezone.utc),
+             end_time=datetime(2035, 2, 1, 22, tzinfo=timezone.utc)),
+        Show(venue_id=other.id, artist_id=artist.id, start_time=datetime(2035, 3, 1, 20, tzinfo=timezone.utc),
+             end_time=datetime(2035, 3, 1, 22, tzinfo=timezone.utc)),
+    ])
+    db.session.commit()
+
+    header, *rows = read_csv(client.get('/export/shows.csv'))
+    assert header == ['id', 'start_time', 'end_time', 'venue_id', 'venue', 'city', 'state', 'artist_id', 'artist']
+    assert [row[4] for row in rows] == ['The Musical Hop', 'The Musical Hop', 'Park Square Live']
+    assert rows[0][1].startswith('2035-01-01T20:00:00')
+    assert rows[0][2].startswith('2035-01-01T22:00:00')
+
+    rows = read_csv(client.get('/export/shows.csv?start=2035-01-15&state=CA'))[1:]
+    assert [row[1][:10] for row in rows] == ['2035-02-01']
+
+    response = client.get('/export/shows.csv.gz')
+    assert response.mimetype == 'application/gzip'
+    assert gzip.decompress(response.get_data()) == client.get('/export/shows.csv').get_data()
+    assert client.get('/export/genres.csv').status_code == 404
+
+
+def test_export_loads_into_another_database(app, client, venue, artist, tmp_path):
+    venue.latitude, venue.longitude = 37.77, -122.42
+    db.session.add(Show(venue_id=venue.id, artist_id=artist.id, start_time=datetime(2035, 1, 1, 20, tzinfo=timezone.utc),
+                        end_time=datetime(2035, 1, 1, 23, tzinfo=timezone.utc)))
+    db.session.commit()
+    for kind in ('venues', 'artists', 'shows'):
+        (tmp_path / (kind + '.csv')).write_bytes(client.get('/export/%s.csv' % kind).get_data())
+
+    # an empty database where the ids come out different
+    db.drop_all(bind_key=None)
+    db.create_all(bind_key=None)
+    db.session.add(Venue(name='Park Square Live'))
+    db.session.commit()
+    runner = app.test_cli_runner()
+    for kind in ('venues', 'artists'):
+        assert runner.invoke(args=['import', kind, str(tmp_path / (kind + '.csv'))]).exit_code == 0
+    result = runner.invoke(args=['import', 'shows', str(tmp_path / 'shows.csv'), '--by-name'])
+    assert result.exit_code == 0, result.output
+
+    show = Show.query.one()
+    assert (show.Venue.name, show.Venue.latitude, show.Artist.name) == ('The Musical Hop', 37.77, 'Guns N Petals')
+    assert show.end_time.hour == 23
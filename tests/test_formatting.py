@@ -0,0 +1,24 @@
+from datetime import datetime, timezone
+
+import babel.dates
+import pytest
+
+from formatting import DATETIME_FORMATS, format_datetime, format_value
+
+
+@pytest.mark.parametrize('format', ['medium', 'full', 'yyyy-MM-dd HH:mm'])
+def test_matches_babel(format):
+    date = datetime(2035, 4, 1, 20, 0, tzinfo=timezone.utc)
+    expected = babel.dates.format_datetime(date, DATETIME_FORMATS.get(format, format), locale='en')
+    assert format_datetime(date, format) == expected
+    # strings and naive datetimes are read as UTC, as babel does
+    assert format_datetime('2035-04-01T20:00:00', format) == expected
+    assert format_datetime(date.replace(tzinfo=None), format) == expected
+
+
+def test_repeated_values_are_formatted_once():
+    date = datetime(2035, 4, 2, 21, 30, tzinfo=timezone.utc)
+    format_datetime(date)
+    hits = format_value.cache_info().hits
+    format_datetime(date)
+    assert format_value.cache_info().hits == hits + 1
@@ -0,0 +1,30 @@
+from models import db, Venue, Artist, Genre
+
+from test_cache import VENUE_FORM
+
+
+def test_get_or_create_reuses_rows(app):
+    jazz, = Genre.get_or_create(['Jazz'])
+    db.session.commit()
+    genres = Genre.get_or_create([' Jazz ', 'Folk', 'Folk', ''])
+    assert [genre.name for genre in genres] == ['Jazz', 'Folk']
+    assert genres[0] is jazz
+
+
+def test_listings_filter_by_genre(client, rendered, venue, artist):
+    db.session.add(Venue(name='Park Square Live', city='New York', state='NY', genres=Genre.get_or_create(['Folk'])))
+    db.session.commit()
+
+    client.get('/venues?genre=Jazz')
+    assert [v['name'] for area in rendered[-1][1]['areas'] for v in area['venues']] == ['The Musical Hop']
+    client.get('/venues?genre=Folk')
+    assert [v['name'] for area in rendered[-1][1]['areas'] for v in area['venues']] == ['Park Square Live']
+    client.get('/artists?genre=Jazz')
+    assert rendered[-1][1]['artists'] == []
+
+
+def test_edit_replaces_genre_links(client, venue):
+    venue_id = venue.id
+    client.post('/venues/%d/edit' % venue_id, data=dict(VENUE_FORM, genres=['Blues', 'Soul']))
+    assert [genre.name for genre in db.session.get(Venue, venue_id).genres] == ['Blues', 'Soul']
+    assert Genre.query.count() == 3
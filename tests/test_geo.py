@@ -0,0 +1,59 @@
+import pytest
+
+from geo import GRID_COLUMNS, GRID_ROWS, cell_ranges, distance_km, grid_cell, grid_column, venues_near
+from models import db, Venue
+from test_cache import VENUE_FORM
+
+
+def columns(ranges):
+    return { cell % GRID_COLUMNS for first, last in ranges for cell in range(first, last + 1) }
+
+
+def rows(ranges):
+    return { cell // GRID_COLUMNS for first, last in ranges for cell in (first, last) }
+
+
+def test_ranges_wrap_around_the_antimeridian():
+    ranges = cell_ranges(0.05, 179.99, 20)
+    assert columns(ranges) == { GRID_COLUMNS - 2, GRID_COLUMNS - 1, 0, 1 }
+    assert rows(ranges) == set(range(898, 903))
+    assert grid_column(180.0) == grid_column(-180.0) == 0
+
+
+@pytest.mark.parametrize('latitude', [89.95, -89.95])
+def test_ranges_near_a_pole_cover_whole_rows(latitude):
+    ranges = cell_ranges(latitude, 10.0, 20)
+    assert columns(ranges) == set(range(GRID_COLUMNS))
+    assert all(0 <= row < GRID_ROWS for row in rows(ranges))
+    assert (GRID_ROWS - 1 if latitude > 0 else 0) in rows(ranges)
+    # the whole polar cap is one contiguous range of cells
+    assert len(ranges) == 1
+
+
+def test_venues_near_across_the_antimeridian(app):
+    db.session.add_all([
+        Venue(name='Taveuni East', latitude=-16.80, longitude=-179.98),
+        Venue(name='Taveuni West', latitude=-16.80, longitude=179.97),
+        Venue(name='Far Away', latitude=-16.80, longitude=178.50),
+    ])
+    db.session.commit()
+    assert Venue.query.filter_by(name='Far Away').one().grid_cell == grid_cell(-16.80, 178.50)
+
+    found = venues_near(-16.80, 179.99, 10, 10)
+    assert [venue['name'] for venue in found] == ['Taveuni West', 'Taveuni East']
+    assert found[1]['distance_km'] == round(distance_km(-16.80, 179.99, -16.80, -179.98), 2) < 5
+
+
+def test_moving_a_venue_clears_its_coordinates(client, venue):
+    venue.address, venue.latitude, venue.longitude = '1015 Folsom Street', 37.778, -122.406
+    db.session.commit()
+    venue_id = venue.id
+    form = dict(VENUE_FORM, city='San Francisco', state='CA', address='1015 Folsom Street')
+    client.post('/venues/%d/edit' % venue_id, data=dict(form, phone='415-555-0100'))
+    venue = db.session.get(Venue, venue_id)
+    assert (venue.latitude, venue.grid_cell) == (37.778, grid_cell(37.778, -122.406))
+
+    client.post('/venues/%d/edit' % venue_id, data=dict(form, address='1 Market Street'))
+    venue = db.session.get(Venue, venue_id)
+    assert (venue.latitude, venue.longitude, venue.grid_cell) == (None, None, None)
+    assert venues_near(37.778, -122.406, 5, 10) == []
@@ -0,0 +1,46 @@
+import json
+
+from importer import resolve_ids
+from models import db, Venue, Artist, Show
+
+
+def test_resolve_ids_by_id_or_name(app, venue):
+    other = Venue(name='Park Square Live')
+    db.session.add(other)
+    db.session.commit()
+    batch = [
+        { 'venue_id': str(other.id), 'venue': 'The Musical Hop' },  # the id wins over the name
+        { 'venue_id': '', 'venue': 'The Musical Hop' },
+        { 'venue_id': '', 'venue': 'Nowhere' },
+        { 'venue_id': '999', 'venue': '' },
+        { 'venue': 'Park Square Live' },
+    ]
+    assert resolve_ids(Venue, batch, 'venue_id', 'venue') == [other.id, venue.id, None, None, other.id]
+
+
+def test_import_shows_skips_unresolved_rows(app, venue, artist, tmp_path):
+    path = tmp_path / 'shows.csv'
+    path.write_text(
+        'venue_id,venue,artist_id,artist,start_time\n'
+        '%d,,%d,,2035-05-21T21:30:00\n'
+        ',The Musical Hop,,Guns N Petals,2035-05-22T21:30:00Z\n'
+        ',The Musical Hop,,Nobody,2035-05-23T21:30:00Z\n'
+        '999,,%d,,2035-05-24T21:30:00Z\n' % (venue.id, artist.id, artist.id)
+    )
+    result = app.test_cli_runner().invoke(args=['import', 'shows', str(path), '--batch-size', '2'])
+    assert result.exit_code == 0, result.output
+    assert 'Imported 2 shows' in result.output and 'skipped 2' in result.output
+    assert [show.start_time.day for show in Show.query.order_by(Show.start_time)] == [21, 22]
+
+
+def test_import_venues_and_artists_with_genres(app, tmp_path):
+    path = tmp_path / 'artists.ndjson'
+    path.write_text('\n'.join(json.dumps(row) for row in [
+        { 'name': 'The Wild Sax Band', 'city': 'San Francisco', 'genres': ['Jazz', 'Classical'], 'seeking_venue': 'yes' },
+        { 'name': 'Matt Quevedo', 'genres': 'Jazz' },
+    ]))
+    result = app.test_cli_runner().invoke(args=['import', 'artists', str(path)])
+    assert result.exit_code == 0, result.output
+    sax, matt = Artist.query.order_by(Artist.id)
+    assert ([genre.name for genre in sax.genres], sax.seeking_venue) == (['Classical', 'Jazz'], True)
+    assert [genre.name for genre in matt.genres] == ['Jazz']
@@ -0,0 +1,79 @@
+import numpy as np
+
+from matching import GenreIndex, Matcher
+from models import db, Genre, Venue, Artist
+
+
+def test_index_scores_one_city_by_cosine():
+    index = GenreIndex([(1, 'sf', [1, 2]), (3, 'sf', [2]), (5, 'ny', [1])])
+    assert index.groups['sf'][0].tolist() == [1, 3]
+    assert index.vector(7) == (None, None)
+
+    ids, scores = index.scores('sf', index.vector(3)[1])
+    assert ids.tolist() == [1, 3]
+    assert np.allclose(scores, [np.sqrt(0.5), 1])
+
+    # a genre id past the current width widens the vectors
+    index.put(5, 'sf', [4])
+    index.remove(1)
+    assert index.where == { 3: 'sf', 5: 'sf' }
+    assert index.groups['ny'][0].size == 0
+    ids, scores = index.scores('sf', index.vector(5)[1])
+    assert ids.tolist() == [3, 5]
+    assert np.allclose(scores, [0, 1])
+
+
+def test_updated_copies_leave_the_index_alone():
+    index = GenreIndex([(1, 'sf', [1, 2]), (3, 'sf', [2]), (5, 'ny', [1])])
+    ids, vectors = index.groups['sf']
+    changed = index.updated([(2, 'sf', [1]), (3, None, None), (5, 'sf', [3])])
+
+    assert index.groups['sf'] == (ids, vectors)
+    assert ids.tolist() == [1, 3]
+    assert index.vector(5)[0] == 'ny'
+    assert changed.where == { 1: 'sf', 2: 'sf', 5: 'sf' }
+    assert changed.groups['sf'][0].tolist() == [1, 2, 5]
+    assert changed.groups['ny'][0].size == 0
+    place, vector = changed.vector(5)
+    assert place == 'sf' and np.isclose(vector[3], 1)
+
+
+def test_catch_up_swaps_in_new_indexes(app):
+    jazz = Genre(name='Jazz')
+    venue = Venue(name='The Dueling Pianos Bar', city='New York', state='NY', seeking_talent=True, genres=[jazz])
+    artist = Artist(name='The Wild Sax Band', city='New York', state='NY', seeking_venue=True, genres=[jazz])
+    db.session.add_all([venue, artist])
+    db.session.commit()
+    matcher = Matcher(60)
+    matcher.build()
+    assert matcher.suggest('venue', venue.id, 5) == [(artist.id, 1.0)]
+
+    # a deleted row leaves no updated_at behind
+    before, artist_id = matcher.indexes, artist.id
+    db.session.delete(artist)
+    db.session.commit()
+    matcher.forget('artist', artist_id)
+    matcher.catch_up()
+    assert matcher.indexes is not before
+    assert before['artist'].vector(artist_id)[0] is not None
+    assert matcher.indexes['artist'].vector(artist_id) == (None, None)
+    assert matcher.forgotten == []
+
+
+def test_suggestions_follow_edits(app):
+    jazz, rock = Genre(name='Jazz'), Genre(name='Rock')
+    venue = Venue(name='The Dueling Pianos Bar', city='New York', state='NY', seeking_talent=True, genres=[jazz])
+    artist = Artist(name='The Wild Sax Band', city='New York', state='NY', seeking_venue=True, genres=[jazz])
+    other = Artist(name='Guns N Petals', city='New York', state='NY', seeking_venue=True, genres=[rock])
+    db.session.add_all([venue, artist, other])
+    db.session.commit()
+    matcher = Matcher(60)
+    matcher.build()
+    assert matcher.suggest('venue', venue.id, 5) == [(artist.id, 1.0)]
+    assert matcher.suggest('artist', other.id, 5) == []
+
+    other.genres = [jazz, rock]
+    artist.seeking_venue = False
+    db.session.commit()
+    matcher.catch_up()
+    assert matcher.suggest('venue', venue.id, 5) == [(other.id, 0.707)]
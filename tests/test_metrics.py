@@ -0,0 +1,96 @@
+import re
+
+import pytest
+from sqlalchemy.exc import OperationalError
+
+import metrics
+from metrics import Histogram
+from models import db
+
+
+SAMPLE = re.compile(r'^([a-z_]+)(?:\{(.*)\})? (\S+)$')
+
+
+def samples(text):
+    '''{(name, labels): value} of every sample in a Prometheus text exposition.'''
+    values = {}
+    for line in text.splitlines():
+        if not line.startswith('#'):
+            name, labels, value = SAMPLE.match(line).groups()
+            values[name, labels or ''] = float(value)
+    return values
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram('test_seconds', 'Test.', [0.1, 1])
+    for value in (0.05, 0.1, 0.5, 3):
+        histogram.observe('index', value)
+    lines = histogram.render()
+    assert lines[:2] == ['# HELP test_seconds Test.', '# TYPE test_seconds histogram']
+    assert lines[2:] == [
+        'test_seconds_bucket{endpoint="index",le="0.1"} 2',
+        'test_seconds_bucket{endpoint="index",le="1"} 3',
+        'test_seconds_bucket{endpoint="index",le="+Inf"} 4',
+        'test_seconds_sum{endpoint="index"} 3.65',
+        'test_seconds_count{endpoint="index"} 4',
+    ]
+
+
+def test_metrics_count_requests_and_queries(client, venue):
+    def count(name):
+        return samples(client.get('/metrics').get_data(as_text=True)).get((name, 'endpoint="venues.show_venue"'), 0)
+
+    requests = count('fyyur_request_duration_seconds_count')
+    client.get('/venues/%d' % venue.id)
+    response = client.get('/metrics')
+    assert response.mimetype == 'text/plain'
+    text = response.get_data(as_text=True)
+    assert '# TYPE fyyur_request_sql_queries histogram' in text
+
+    values = samples(text)
+    assert values['fyyur_request_duration_seconds_count', 'endpoint="venues.show_venue"'] == requests + 1
+    assert values['fyyur_request_sql_queries_bucket', 'endpoint="venues.show_venue",le="0"'] <= requests
+    assert values['fyyur_request_template_duration_seconds_sum', 'endpoint="venues.show_venue"'] > 0
+
+
+def test_server_timing_header(app, client, monkeypatch):
+    assert 'Server-Timing' not in client.get('/').headers
+    monkeypatch.setitem(app.config, 'METRICS_SERVER_TIMING', True)
+    assert re.match(r'db;dur=[\d.]+;desc="\d+ queries", tpl;dur=[\d.]+, app;dur=[\d.]+$',
+                    client.get('/').headers['Server-Timing'])
+
+
+def test_failed_statements_leave_nothing_behind(app):
+    with db.engine.connect() as conn:
+        with pytest.raises(OperationalError):
+            conn.exec_driver_sql('SELECT * FROM "Nowhere"')
+        assert 'query_started' not in conn.info
+
+
+def test_pool_counts_are_counters(client, monkeypatch):
+    monkeypatch.setattr(metrics, 'pool_status', lambda engine: {
+        'pool': 'InstrumentedQueuePool', 'size': 5, 'checked_out': 1, 'checked_in': 4, 'overflow': 0,
+        'checkouts': 12, 'wait_seconds_total': 0.5, 'wait_seconds_max': 0.25, 'overflow_events': 2, 'timeouts': 1,
+    })
+    text = client.get('/metrics').get_data(as_text=True)
+    assert '# TYPE fyyur_db_pool_checked_out gauge' in text
+    assert '# TYPE fyyur_db_pool_checkouts_total counter' in text
+    values = samples(text)
+    assert [values['fyyur_db_pool_' + name, ''] for name in
+            ('checkouts_total', 'wait_seconds_total', 'overflow_events_total', 'timeouts_total')] == [12, 0.5, 2, 1]
+    assert ('fyyur_db_pool_checkouts', '') not in values
+
+
+def test_streamed_pages_are_timed_once_sent(client, artist):
+    def values():
+        found = samples(client.get('/metrics').get_data(as_text=True))
+        return [found.get((name, 'endpoint="artists.artists"'), 0) for name in
+                ('fyyur_request_duration_seconds_count', 'fyyur_request_template_duration_seconds_sum')]
+
+    requests, template_seconds = values()
+    response = client.get('/artists')
+    assert response.is_streamed
+    response.get_data()
+    response.close()
+    after = values()
+    assert after[0] == requests + 1 and after[1] > template_seconds
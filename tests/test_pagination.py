@@ -0,0 +1,62 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+from models import db, Venue, Show
+from pagination import decode_cursor, encode_cursor, paginate
+
+
+def test_cursor_round_trip():
+    start = datetime(2040, 1, 1, 20, 30, tzinfo=timezone.utc)
+    token = encode_cursor([start, 42])
+    assert '=' not in token
+    assert decode_cursor(token, [Show.start_time, Show.id]) == [start, 42]
+    assert decode_cursor(encode_cursor(['Café', 7]), [Venue.name, Venue.id]) == ['Café', 7]
+
+
+@pytest.mark.parametrize('token', ['', 'not base64!', encode_cursor([1]), encode_cursor({'id': 1})])
+def test_bad_cursors_are_rejected(token):
+    with pytest.raises(ValueError):
+        decode_cursor(token, [Venue.name, Venue.id])
+
+
+def test_pages_walk_every_row_once(app):
+    # duplicate names are ordered by id
+    db.session.add_all(Venue(name=name) for name in ['b', 'a', 'c', 'a', 'b', 'd', 'a'])
+    db.session.commit()
+    expected = [(venue.name, venue.id) for venue in Venue.query.order_by(Venue.name, Venue.id)]
+
+    seen, after = [], None
+    while True:
+        url = '/venues?limit=3' + ('&after=' + after if after else '')
+        with app.test_request_context(url):
+            rows, after = paginate(Venue.query, [Venue.name, Venue.id])
+        seen += [(venue.name, venue.id) for venue in rows]
+        if after is None:
+            break
+    assert seen == expected
+
+
+def test_names_are_required(app):
+    # a NULL name would drop out of the (name, id) keyset
+    db.session.add(Venue(city='San Francisco'))
+    with pytest.raises(IntegrityError):
+        db.session.commit()
+    db.session.rollback()
+
+
+def test_pages_by_start_time(app, venue, artist):
+    start = datetime(2040, 1, 1, tzinfo=timezone.utc)
+    db.session.add_all(Show(venue_id=venue.id, artist_id=artist.id,
+                            start_time=start + timedelta(hours=hours),
+                            end_time=start + timedelta(hours=hours + 1)) for hours in [5, 1, 3, 1, 2])
+    db.session.commit()
+
+    with app.test_request_context('/shows?limit=2'):
+        first, after = paginate(Show.query, [Show.start_time, Show.id])
+    with app.test_request_context('/shows?limit=10&after=' + after):
+        rest, after = paginate(Show.query, [Show.start_time, Show.id])
+    assert after is None
+    assert [show.start_time.hour for show in first + rest] == [1, 1, 2, 3, 5]
+    assert len({show.id for show in first + rest}) == 5
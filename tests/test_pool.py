@@ -0,0 +1,43 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.exc import TimeoutError
+
+from models import db
+from pool import InstrumentedQueuePool, engine_options, pool_status
+
+
+CONFIG = {
+    'DB_POOL_SIZE': 5, 'DB_MAX_OVERFLOW': 10, 'DB_POOL_TIMEOUT': 30, 'DB_POOL_RECYCLE': 1800,
+    'DB_POOL_PRE_PING': True, 'DB_STATEMENT_TIMEOUT_MS': 0,
+}
+
+
+def test_engine_options():
+    assert engine_options(dict(CONFIG, SQLALCHEMY_DATABASE_URI='sqlite:///fyyur.db')) == {}
+    options = engine_options(dict(CONFIG, SQLALCHEMY_DATABASE_URI='postgresql://localhost/fyyur',
+                                  DB_STATEMENT_TIMEOUT_MS=2500))
+    assert options['poolclass'] is InstrumentedQueuePool
+    assert (options['pool_size'], options['max_overflow'], options['pool_pre_ping']) == (5, 10, True)
+    assert options['connect_args'] == { 'options': '-c statement_timeout=2500' }
+
+
+def test_checkouts_overflow_and_timeouts_are_counted(tmp_path):
+    engine = create_engine('sqlite:///' + str(tmp_path / 'pool.db'), poolclass=InstrumentedQueuePool,
+                           pool_size=1, max_overflow=1, pool_timeout=0.05)
+    first, second = engine.connect(), engine.connect()
+    with pytest.raises(TimeoutError):
+        engine.connect()
+
+    status = pool_status(engine)
+    assert (status['checked_out'], status['overflow']) == (2, 1)
+    assert (status['checkouts'], status['overflow_events'], status['timeouts']) == (2, 1, 1)
+    assert status['wait_seconds_max'] >= 0.05
+
+    first.close()
+    second.close()
+    engine.dispose()
+    assert pool_status(engine)['checkouts'] == 2
+
+
+def test_status_endpoint(client):
+    assert client.get('/status/pool').get_json()['pool'] == db.engine.pool.__class__.__name__
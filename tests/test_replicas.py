@@ -0,0 +1,57 @@
+import time
+
+import pytest
+
+from app import create_app
+from models import db, Venue
+
+
+@pytest.fixture
+def replicated(tmp_path):
+    app = create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + str(tmp_path / 'primary.db'),
+        'SQLALCHEMY_REPLICA_URIS': ['sqlite:///' + str(tmp_path / 'replica.db')],
+        'SUMMARY_ROLLOVER_SECONDS': 0,
+        'VENUE_PURGE_SECONDS': 0,
+    })
+    with app.app_context():
+        # the same venue, as the replica has not caught up with a rename yet
+        for bind, name in ((None, 'Primary Hop'), ('replica_0', 'Replica Hop')):
+            db.metadata.create_all(db.engines[bind])
+            with db.engines[bind].begin() as connection:
+                connection.execute(Venue.__table__.insert(), { 'id': 1, 'name': name, 'seeking_talent': False })
+        yield app
+        db.session.remove()
+
+
+def name(client):
+    return client.get('/api/v1/venues/1').get_json()['name']
+
+
+def test_reads_go_to_a_fresh_replica(replicated):
+    client = replicated.test_client()
+    assert name(client) == 'Replica Hop'
+    assert client.get('/status/pool').get_json()['replicas']['replica_0']['healthy']
+
+    replicated.extensions['replicas'].measure = lambda bind: 60.0
+    replicated.extensions['replicas'].checked_at = 0
+    assert name(client) == 'Primary Hop'
+
+
+def test_writer_sticks_to_the_primary(replicated):
+    writer, reader = replicated.test_client(), replicated.test_client()
+    writer.post('/venues/search', data={ 'search_term': 'hop' })
+    assert name(writer) == 'Primary Hop'
+    assert name(reader) == 'Replica Hop'
+
+
+
+def test_any_worker_reads_the_sticky_cookie(replicated):
+    # set by another worker, which signs its sessions with its own key
+    client = replicated.test_client()
+    client.set_cookie('primary_until', '%.3f' % (time.time() + 5))
+    assert name(client) == 'Primary Hop'
+    # later than a write could have set it
+    client.set_cookie('primary_until', '%.3f' % (time.time() + 3600))
+    assert name(client) == 'Replica Hop'
@@ -0,0 +1,57 @@
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+from models import db, Venue, Artist, Show, Genre
+from search import search_entities
+from summaries import rebuild
+
+
+def trigrams(text):
+    grams = set()
+    for word in text.split():
+        word = '  ' + word + ' '
+        grams.update(word[i:i + 3] for i in range(len(word) - 2))
+    return grams
+
+
+def similarity(left, right):
+    '''pg_trgm's similarity(), for running the PostgreSQL ranking on SQLite.'''
+    left, right = trigrams(left or ''), trigrams(right or '')
+    return len(left & right) / len(left | right) if left | right else 0
+
+
+def test_fallback_matches_substrings_by_name(app, venue, artist):
+    db.session.add_all([
+        Venue(name='Park Square Live', city='New York', state='NY', genres=Genre.get_or_create(['Folk', 'Jazz'])),
+        Venue(name='100% Pure Hop', city='Austin', state='TX', genres=Genre.get_or_create(['Rock'])),
+    ])
+    start_time = datetime.now(timezone.utc) + timedelta(days=1)
+    db.session.add(Show(venue_id=venue.id, artist_id=artist.id, start_time=start_time, end_time=start_time + timedelta(hours=2)))
+    db.session.commit()
+    rebuild()
+
+    count, data = search_entities(Venue, ' JAZZ ')
+    assert count == 2
+    assert [(hit['name'], hit['num_upcoming_shows']) for hit in data] == \
+        [('Park Square Live', 0), ('The Musical Hop', 1)]
+
+    # city, state and genres are searched too, and LIKE wildcards are literal
+    assert search_entities(Venue, 'new york')[1][0]['name'] == 'Park Square Live'
+    assert [hit['name'] for hit in search_entities(Venue, '100%')[1]] == ['100% Pure Hop']
+    assert search_entities(Artist, 'petals')[0] == 1
+    assert search_entities(Artist, 'nothing like it') == (0, [])
+
+
+def test_postgresql_ranks_by_similarity(app, monkeypatch):
+    db.session.add_all([
+        Venue(name='A Long Evening At The Hop Hall', city='Dallas', state='TX'),
+        Venue(name='Hop', city='Dallas', state='TX'),
+    ])
+    db.session.commit()
+    db.session.connection().connection.driver_connection.create_function('similarity', 2, similarity)
+    postgresql = SimpleNamespace(dialect=SimpleNamespace(name='postgresql'))
+    monkeypatch.setattr(db.session, 'get_bind', lambda *args, **kwargs: postgresql)
+
+    count, data = search_entities(Venue, 'hop')
+    assert count == 2
+    assert [hit['name'] for hit in data] == ['Hop', 'A Long Evening At The Hop Hall']
@@ -0,0 +1,64 @@
+import json
+
+from bench import percentile, regressions
+from models import db, Venue, Artist, Show
+
+
+def seed(app, *args):
+    result = app.test_cli_runner().invoke(args=['seed', '--venues', '5', '--artists', '8', '--shows', '60', *args])
+    assert result.exit_code == 0, result.output
+
+
+def test_seed_is_reproducible(app):
+    seed(app)
+    assert (Venue.query.count(), Artist.query.count(), Show.query.count()) == (5, 8, 60)
+    names = [venue.name for venue in Venue.query.order_by(Venue.id)]
+    assert all(venue.genres for venue in Venue.query)
+
+    db.session.execute(Show.__table__.delete())
+    db.session.commit()
+    seed(app, '--venues', '0', '--artists', '0')
+    assert Show.query.count() == 0  # nothing to hold shows
+
+    db.drop_all(bind_key=None)
+    db.create_all(bind_key=None)
+    seed(app)
+    assert [venue.name for venue in Venue.query.order_by(Venue.id)] == names
+
+
+def test_seeded_shows_are_never_double_booked(app):
+    seed(app, '--venues', '2', '--artists', '3', '--shows', '3000')
+    for column in (Show.venue_id, Show.artist_id):
+        clashes = db.session.query(column, Show.start_time).group_by(column, Show.start_time) \
+            .having(db.func.count() > 1).all()
+        assert clashes == []
+
+    # one venue and one artist hold one show per slot
+    result = app.test_cli_runner().invoke(args=['seed', '--venues', '1', '--artists', '1', '--shows', '17521'])
+    assert result.exit_code != 0 and 'at most 17520 shows' in result.output
+
+
+def test_bench_runs_and_flags_regressions(app, tmp_path):
+    seed(app)
+    output = tmp_path / 'bench.json'
+    result = app.test_cli_runner().invoke(args=['bench', '--requests', '3', '--warmup', '1', '--only', 'show_venue',
+                                                '--output', str(output)])
+    assert result.exit_code == 0, result.output
+    results = json.loads(output.read_text())
+    assert list(results) == ['show_venue'] and results['show_venue']['requests'] == 3
+
+    queries = results['show_venue']['queries_max']
+    baseline = { 'show_venue': dict(results['show_venue'], queries_max=queries - 1) }
+    assert regressions(results, baseline, 1.25) == ['show_venue: %d queries, baseline %d' % (queries, queries - 1)]
+    assert percentile([5, 1, 4, 2, 3], 0.5) == 3
+
+
+def test_bench_covers_submissions_api_and_exports(app, tmp_path):
+    seed(app)
+    output = tmp_path / 'bench.json'
+    result = app.test_cli_runner().invoke(args=['bench', '--requests', '2', '--warmup', '0', '--output', str(output)])
+    assert result.exit_code == 0, result.output
+    results = json.loads(output.read_text())
+    assert { 'api shows', 'export shows gzip', 'venues near', 'autocomplete', 'create_venue',
+             'edit_artist_submission', 'create_show' } <= set(results)
+    assert Venue.query.count() == 5 + 2
@@ -0,0 +1,73 @@
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import event
+
+from models import db, Show, VenueShowSummary, ArtistShowSummary
+from summaries import rebuild, record_show, roll_over
+
+
+def add_show(venue, artist, start_time):
+    show = Show(venue_id=venue.id, artist_id=artist.id, start_time=start_time, end_time=start_time + timedelta(hours=2))
+    db.session.add(show)
+    record_show(show)
+    db.session.commit()
+    return show
+
+
+def counts(summary, owner_id):
+    row = db.session.get(summary, owner_id)
+    db.session.refresh(row)
+    return row.upcoming_shows_count, row.past_shows_count
+
+
+def test_record_show_counts_upcoming_and_past(venue, artist):
+    now = datetime.now(timezone.utc)
+    add_show(venue, artist, now - timedelta(days=2))
+    add_show(venue, artist, now + timedelta(days=2))
+    add_show(venue, artist, now + timedelta(days=1))
+    assert counts(VenueShowSummary, venue.id) == (2, 1)
+    assert counts(ArtistShowSummary, artist.id) == (2, 1)
+    next_show = db.session.get(VenueShowSummary, venue.id).next_show_time
+    assert next_show.replace(tzinfo=timezone.utc) > now + timedelta(hours=23)
+
+
+def test_record_show_is_one_upsert_per_summary(venue, artist):
+    statements = []
+    record = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        for days in (1, 2):
+            add_show(venue, artist, datetime.now(timezone.utc) + timedelta(days=days))
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+    summaries = [statement.split()[0] for statement in statements if 'ShowSummary' in statement]
+    assert summaries == ['INSERT'] * 4
+    assert counts(VenueShowSummary, venue.id) == counts(ArtistShowSummary, artist.id) == (2, 0)
+
+
+def test_roll_over_recounts_started_shows(venue, artist):
+    now = datetime.now(timezone.utc)
+    started = add_show(venue, artist, now + timedelta(days=1))
+    add_show(venue, artist, now + timedelta(days=3))
+    assert roll_over() == { 'venue': [], 'artist': [] }
+
+    # time passes: the first show starts
+    started.start_time = now - timedelta(minutes=1)
+    started.end_time = now + timedelta(hours=1)
+    db.session.query(VenueShowSummary).update({ VenueShowSummary.next_show_time: started.start_time })
+    db.session.query(ArtistShowSummary).update({ ArtistShowSummary.next_show_time: started.start_time })
+    db.session.commit()
+
+    assert roll_over() == { 'venue': [venue.id], 'artist': [artist.id] }
+    assert counts(VenueShowSummary, venue.id) == (1, 1)
+    assert counts(ArtistShowSummary, artist.id) == (1, 1)
+    assert roll_over() == { 'venue': [], 'artist': [] }
+
+
+def test_rebuild_matches_record_show(venue, artist):
+    now = datetime.now(timezone.utc)
+    for days in (-3, -1, 1, 2):
+        add_show(venue, artist, now + timedelta(days=days))
+    recorded = counts(VenueShowSummary, venue.id), counts(ArtistShowSummary, artist.id)
+    rebuild()
+    assert (counts(VenueShowSummary, venue.id), counts(ArtistShowSummary, artist.id)) == recorded == ((2, 2), (2, 2))
@@ -0,0 +1,85 @@
+import threading
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import event
+
+from models import db, Venue, Show, Genre
+from summaries import rebuild
+
+
+def at(**delta):
+    return datetime.now(timezone.utc) + timedelta(**delta)
+
+
+def new_show(venue, artist, start_time):
+    return Show(venue_id=venue.id, artist_id=artist.id, start_time=start_time, end_time=start_time + timedelta(hours=2))
+
+
+def test_venues_grouped_by_area(client, rendered, venue, artist):
+    other = Venue(name='Park Square Live', city='New York', state='NY', genres=Genre.get_or_create(['Folk']))
+    second = Venue(name='The Dueling Pianos Bar', city='San Francisco', state='CA', genres=Genre.get_or_create(['Jazz']))
+    db.session.add_all([other, second])
+    db.session.add_all([
+        new_show(venue, artist, at(days=1)),
+        new_show(venue, artist, at(days=2)),
+        new_show(venue, artist, at(days=-1)),
+    ])
+    db.session.commit()
+    rebuild()
+
+    assert client.get('/venues').status_code == 200
+    areas = rendered[0][1]['areas']
+    assert [(area['state'], area['city']) for area in areas] == [('CA', 'San Francisco'), ('NY', 'New York')]
+    assert [(v['name'], v['num_upcoming_shows']) for v in areas[0]['venues']] == \
+        [('The Dueling Pianos Bar', 0), ('The Musical Hop', 2)]
+    assert [v['name'] for v in areas[1]['venues']] == ['Park Square Live']
+
+
+def test_get_shows_splits_on_now(app, venue, artist):
+    later, soon, earlier = at(days=2), at(hours=1), at(days=-1)
+    db.session.add_all([new_show(venue, artist, start_time)
+                        for start_time in (later, earlier, soon)])
+    db.session.commit()
+
+    shows = venue.get_shows()
+    assert [show.start_time.replace(tzinfo=timezone.utc) for show in shows['upcoming_shows']] == [soon, later]
+    assert [show.start_time.replace(tzinfo=timezone.utc) for show in shows['past_shows']] == [earlier]
+    assert len(artist.get_shows()['upcoming_shows']) == 2
+
+
+def test_create_show_stores_utc(client, venue, artist):
+    client.post('/shows/create', data={ 'venue_id': venue.id, 'artist_id': artist.id,
+                                        'start_time': '2030-05-21 21:30:00' })
+    show = Show.query.one()
+    assert show.start_time.replace(tzinfo=None) == datetime(2030, 5, 21, 21, 30)
+
+
+def test_show_venue_loads_artists_with_its_shows(client, rendered, venue, artist):
+    db.session.add_all([new_show(venue, artist, at(days=days))
+                        for days in (1, 2, -3)])
+    db.session.commit()
+    venue_id = venue.id
+    db.session.expunge_all()
+
+    # the match index may build on its own thread meanwhile
+    statements, thread = [], threading.get_ident()
+
+    def record(conn, cursor, statement, *args):
+        if threading.get_ident() == thread:
+            statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        assert client.get('/venues/%d' % venue_id).status_code == 200
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+
+    data = rendered[0][1]['venue']
+    assert [show['artist_name'] for show in data['upcoming_shows']] == ['Guns N Petals'] * 2
+    assert data['past_shows_count'] == 1
+    # one query loads the shows with their artists, however many there are
+    assert len([statement for statement in statements if '"Artist"' in statement]) == 1
+
+
+def test_unknown_venue_is_404(client, app):
+    assert client.get('/venues/404').status_code == 404
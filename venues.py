@@ -0,0 +1,317 @@
+from flask import Blueprint, current_app, render_template, request, flash, redirect, url_for, jsonify, abort
+
+from models import db, utcnow, Venue, Genre, VenueShowSummary, venue_genres
+from pagination import paginate, page_size
+from cache import cache
+from search import search_entities
+from conditional import conditional, entity_etag, make_etag
+from invalidation import invalidate_venue, invalidate_deleted_venue, expire_matches
+from geo import venues_near
+from autocomplete import index_name, unindex
+from streaming import stream_page
+import deletion
+
+bp = Blueprint('venues', __name__)
+
+#----------------------------------------------------------------------------#
+# Controllers.
+#----------------------------------------------------------------------------#
+
+#  Venues
+#  ----------------------------------------------------------------
+
+@bp.route('/venues')
+def venues():
+  data = []
+  next_after = None
+  error = False
+  try:
+    def load():
+      # one round trip: every venue with its area and its maintained upcoming show count
+      query = db.session.query(Venue.city, Venue.state, Venue.id, Venue.name,
+                               db.func.coalesce(VenueShowSummary.upcoming_shows_count, 0)) \
+        .outerjoin(VenueShowSummary, VenueShowSummary.venue_id == Venue.id)
+      if genre:
+        query = query.join(venue_genres, venue_genres.c.venue_id == Venue.id) \
+          .join(Genre, Genre.id == venue_genres.c.genre_id) \
+          .filter(Genre.name == genre)
+      rows, next_after = paginate(query, [Venue.name, Venue.id])
+
+      areas = {}
+      for city, state, venue_id, name, num_upcoming_shows in rows:
+        area = areas.get((state, city))
+        if area is None:
+          area = areas[(state, city)] = { 'city': city, 'state': state, 'venues': [] }
+        area['venues'].append({
+          'id': venue_id,
+          'name': name,
+          'num_upcoming_shows': num_upcoming_shows
+        })
+      return [areas[key] for key in sorted(areas)], next_after
+
+    genre = request.args.get('genre')
+    key = cache.versioned_key('venues', genre, request.args.get('after'), page_size())
+    data, next_after = cache.cached(key, load)
+  except:
+    error = True
+  if error:
+    flash('An error occurred. Venues cannot be listed.')
+
+  return stream_page('pages/venues.html', areas=data, next_after=next_after)
+
+@bp.route('/venues/search', methods=['POST'])
+def search_venues():
+  error = False  
+  response = {}
+  try:  
+    count, data = search_entities(Venue, request.form.get('search_term', ''))
+    if count > 0:
+      response = {
+        'count': count,
+        'data': data
+      }
+    else:
+      flash('Please refine your search...')
+  except: 
+    error = True 
+
+  if error:
+    flash('Error while filtering Venues with the search term -' + request.form['search_term'])
+
+  return render_template('pages/search_venues.html', results=response, search_term=request.form.get('search_term', ''))
+
+@bp.route('/venues/near')
+def search_venues_near():
+  latitude = request.args.get('lat', type=float)
+  longitude = request.args.get('lon', type=float)
+  radius = request.args.get('radius', current_app.config['VENUE_NEAR_RADIUS_KM'], type=float)
+  if latitude is None or longitude is None or not -90 <= latitude <= 90 or not -180 <= longitude <= 180 or not radius > 0:
+    abort(400)
+  radius = min(radius, current_app.config['VENUE_NEAR_MAX_RADIUS_KM'])
+  data = []
+  try:
+    data = venues_near(latitude, longitude, radius, current_app.config['VENUE_NEAR_LIMIT'])
+  except:
+    flash('An error occurred. Venues near you cannot be listed.')
+
+  return render_template('pages/venues_near.html', venues=data, latitude=latitude, longitude=longitude, radius=radius)
+
+@bp.route('/venues/<int:venue_id>')
+def show_venue(venue_id):
+  def load():
+    venue = Venue.query.get_or_404(venue_id)
+    shows = venue.get_shows()
+    upcoming_shows = [{ 'artist_id': show.Artist.id, 'artist_name': show.Artist.name, 'artist_image_link': show.Artist.image_link, 'start_time': show.start_time } for show in shows['upcoming_shows']]
+    past_shows = [{ 'artist_id': show.Artist.id, 'artist_name': show.Artist.name, 'artist_image_link': show.Artist.image_link, 'start_time': show.start_time } for show in shows['past_shows']]
+
+    num_upcoming_shows = len(upcoming_shows)
+    num_past_shows = len(past_shows)
+    data = {
+      'id': venue.id,
+      'name': venue.name,
+      'city': venue.city,
+      'state': venue.state,
+      'phone': venue.phone,
+      'address': venue.address,
+      'website': venue.website,
+      'facebook_link': venue.facebook_link,
+      'seeking_talent': venue.seeking_talent,
+      'seeking_description': venue.seeking_description,
+      'image_link': venue.image_link,
+      'genres' : [genre.name for genre in venue.genres],
+      'past_shows' : past_shows,
+      'upcoming_shows': upcoming_shows,
+      'past_shows_count' : num_past_shows,
+      'upcoming_shows_count' : num_upcoming_shows
+    }
+    return data
+
+  def render():
+    data = cache.cached('venue:%d' % venue_id, load)
+    return render_template('pages/show_venue.html', venue=data, suggested_artists=suggested)
+
+  try:
+    from matching import suggestions
+    suggested = suggestions('venue', venue_id)
+  except:
+    suggested = []
+  etag = entity_etag(Venue, VenueShowSummary, VenueShowSummary.venue_id, venue_id)
+  return conditional(etag and make_etag(etag, suggested), render)
+
+#  Create Venue
+#  ----------------------------------------------------------------
+
+@bp.route('/venues/create', methods=['GET'])
+def create_venue_form():
+  from forms import VenueForm
+  form = VenueForm()
+  return render_template('forms/new_venue.html', form=form)
+
+@bp.route('/venues/create', methods=['POST'])
+def create_venue_submission():
+  error = False  
+  try: 
+   name = request.form['name']
+   city = request.form['city']
+   state = request.form['state']
+   address = request.form['address']
+   phone = request.form['phone']
+   image_link = request.form['image_link']
+   facebook_link = request.form['facebook_link']
+   website = request.form['website_link']
+   seeking_talent = True if request.form['seeking_talent'] == 'y' else False
+   seeking_description = request.form['seeking_description']
+   genres = Genre.get_or_create(request.form.getlist('genres'))
+   venue = Venue(name = name, city = city, state = state, address = address, phone = phone, image_link = image_link, facebook_link = facebook_link, website = website, seeking_talent = seeking_talent, seeking_description= seeking_description, genres = genres)  
+  
+   db.session.add(venue)
+   db.session.commit()
+   cache.bump('venues')
+   expire_matches()
+   index_name('venue', venue.id, name)
+  except:   
+    db.session.rollback() 
+    error = True 
+  finally:
+    db.session.close()
+
+  if error:
+    flash('An error occurred. Venue ' + request.form['name'] + ' could not be listed.')
+  else:
+    flash('Venue ' + request.form['name'] + ' was successfully listed!')
+
+  return render_template('pages/home.html')
+
+@bp.route('/venues/<int:venue_id>', methods=['DELETE'])
+def delete_venue(venue_id):
+  # set-based: one DELETE per table, or a soft delete that hides the venue
+  # at once when it has too many shows to remove in one transaction
+  error = False
+  artist_ids = None
+  try:
+    if deletion.should_soft_delete(venue_id):
+      artist_ids = deletion.soft_delete_venue(venue_id)
+    else:
+      artist_ids = deletion.delete_venue(venue_id)
+    db.session.commit()
+    if artist_ids is not None:
+      invalidate_deleted_venue(venue_id, artist_ids)
+      unindex('venue', venue_id)
+  except:
+    db.session.rollback()
+    error = True
+  finally:
+    db.session.close()
+
+  if error:
+    flash('An error occurred. Venue could not be deleted.')
+    return jsonify({ 'success': False }), 500
+  if artist_ids is None:
+    abort(404)
+  flash('Venue was successfully deleted!')
+  return jsonify({ 'success': True })
+
+#  Update
+#  ----------------------------------------------------------------
+
+@bp.route('/venues/<int:venue_id>/edit', methods=['GET'])
+def edit_venue(venue_id):
+  from forms import VenueForm
+  form = VenueForm()
+  try:
+    venue = Venue.query.get(venue_id)
+    venue_details = {
+        "id": venue.id,
+        "name": venue.name,
+        "address": venue.address,
+        "genres": [genre.name for genre in venue.genres],
+        "city": venue.city,
+        "state": venue.state,
+        "phone": venue.phone,
+        "website": venue.website,
+        "facebook_link": venue.facebook_link,
+        "seeking_talent": venue.seeking_talent,
+        "seeking_description": venue.seeking_description,
+        "image_link": venue.image_link
+    }
+    
+    if venue_details:
+     form.name.data = venue_details['name']
+     form.genres.data = venue_details['genres']
+     form.city.data = venue_details['city']
+     form.state.data = venue_details['state']
+     form.address.data = venue_details['address']
+     form.phone.data = venue_details['phone']
+     form.website_link.data = venue_details['website']
+     form.facebook_link.data = venue_details['facebook_link']
+     form.seeking_talent.data = venue_details['seeking_talent']
+     form.seeking_description.data = venue_details['seeking_description']
+     form.image_link.data = venue_details['image_link']
+  except:
+    flash('Unable to edit Venue')
+    venue_details = {
+        "id": -1,
+        "name": '',
+        "genres": [],
+        "city": '',
+        "state": '',
+        "phone": '',
+        "address": '',
+        "website": '',
+        "facebook_link": '',
+        "seeking_talent": '',
+        "seeking_description": '',
+        "image_link": ''
+    }
+  return render_template('forms/edit_venue.html', form=form, venue=venue_details)
+
+@bp.route('/venues/<int:venue_id>/edit', methods=['POST'])
+def edit_venue_submission(venue_id):
+  error = False  
+  try:  
+   name = request.form['name']
+   city = request.form['city']
+   state = request.form['state']
+   phone = request.form['phone']
+   address = request.form['address']
+   image_link = request.form['image_link']
+   facebook_link = request.form['facebook_link']
+   website = request.form['website_link']
+   seeking_talent = True if request.form['seeking_talent'] == 'y' else False
+   seeking_description = request.form['seeking_description']
+   genres = Genre.get_or_create(request.form.getlist('genres'))
+   venue = Venue.query.get(venue_id) 
+   renamed = (venue.name, venue.image_link) != (name, image_link)
+   relisted = (venue.name, venue.city, venue.state) != (name, city, state) or set(venue.genres) != set(genres)
+   if (venue.city, venue.state, venue.address) != (city, state, address):
+     # the coordinates belong to the old place until `flask geocode` finds the
+     # new one; geo.place_venue clears grid_cell with them
+     venue.latitude = venue.longitude = None
+   venue.name = name
+   venue.city = city
+   venue.state = state
+   venue.phone = phone
+   venue.image_link = image_link
+   venue.facebook_link = facebook_link
+   venue.website = website
+   venue.seeking_talent = seeking_talent
+   venue.seeking_description = seeking_description
+   venue.genres = genres
+   venue.address = address
+   # genre links live in their own table, so the row may not change otherwise
+   venue.updated_at = utcnow()
+
+   db.session.commit()
+   invalidate_venue(venue_id, renamed=renamed, relisted=relisted)
+   index_name('venue', venue_id, name)
+  except:   
+    db.session.rollback() 
+    error = True 
+  finally:
+    db.session.close()
+
+  if error:
+    flash('An error occurred. Venue could not be updated.')
+  else:
+    flash('Venue was successfully updated!')
+  return redirect(url_for('venues.show_venue', venue_id=venue_id))